@@ -1,11 +1,21 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response
 from pydantic import BaseModel
 import json
 import asyncio
 
 from core.process import process_file_task
+from core.transcriber import model_pool
+from core.cache import transcription_cache
+from core.scheduler import scheduler, SchedulerFull
+from core.llm import close_http_client, llm_cache
+from core.longform import chunk_cache
+from core.media_cache import media_cache
 from websocket import websocket_manager, task_manager
+from metrics import registry, CONTENT_TYPE
+from tracing import tracer
+from config import transcription_backend, whisper_model, warm_on_startup
 from logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -30,10 +40,118 @@ class ProcessRequest(BaseModel):
     output_path: str
 
 
+# ----- METRICS -----#
+# Valeurs déjà tenues par le scheduler et les caches, lues au moment du scrape
+CACHES = {
+    "transcription": transcription_cache,
+    "llm": llm_cache,
+    "llm_chunks": chunk_cache,
+    "media": media_cache,
+}
+
+registry.collector(
+    "macscribe_scheduler_queue_depth", "Jobs waiting for a slot, per stage.", "gauge",
+    lambda: [({"stage": name}, stats["queued"]) for name, stats in scheduler.stats()["stages"].items()],
+)
+registry.collector(
+    "macscribe_scheduler_running", "Slots in use, per stage.", "gauge",
+    lambda: [({"stage": name}, stats["running"]) for name, stats in scheduler.stats()["stages"].items()],
+)
+registry.collector(
+    "macscribe_scheduler_jobs", "Admitted jobs.", "gauge",
+    lambda: [({}, scheduler.stats()["jobs"]["active"])],
+)
+registry.collector(
+    "macscribe_scheduler_rejected_total", "Jobs rejected by admission control.", "counter",
+    lambda: [({}, scheduler.stats()["jobs"]["rejected"])],
+)
+registry.collector(
+    "macscribe_cache_hits_total", "Cache hits, per cache.", "counter",
+    lambda: [({"cache": name}, cache.hits) for name, cache in CACHES.items()],
+)
+registry.collector(
+    "macscribe_cache_misses_total", "Cache misses, per cache.", "counter",
+    lambda: [({"cache": name}, cache.misses) for name, cache in CACHES.items()],
+)
+registry.collector(
+    "macscribe_cache_hit_ratio", "Hits / lookups since startup, per cache.", "gauge",
+    lambda: [({"cache": name}, cache.stats()["hit_rate"]) for name, cache in CACHES.items()],
+)
+registry.collector(
+    "macscribe_cache_size_bytes", "Disk space used, per cache.", "gauge",
+    lambda: [({"cache": name}, cache.stats()["size_bytes"]) for name, cache in CACHES.items()],
+)
+
+
+# ----- LIFECYCLE -----#
+@app.on_event("startup")
+async def warm_models():
+    """Précharge le modèle Whisper en arrière-plan pour que le premier job ne paie pas le chargement."""
+    if not warm_on_startup:
+        return
+
+    async def _warm():
+        try:
+            await asyncio.to_thread(model_pool.warm, transcription_backend, whisper_model)
+        except Exception as e:
+            logger.error(f"Error warming transcription model: {e}")
+
+    asyncio.create_task(_warm())
+
+
+@app.on_event("shutdown")
+async def release_models():
+    model_pool.clear()
+    await close_http_client()
+
+
 # ----- ENDPOINTS -----#
 @app.get("/health")
 async def get_health():
-    return {"message": "Online"}
+    return {
+        "message": "Online",
+        "models": model_pool.loaded(),
+        "transcription_cache": transcription_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "llm_chunk_cache": chunk_cache.stats(),
+        "media_cache": media_cache.stats(),
+    }
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Métriques au format texte Prometheus (durées par étape, LLM, files, caches)."""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/traces")
+async def list_traces():
+    """Traces disponibles : tâches en cours et dernières terminées."""
+    return tracer.list()
+
+
+@app.get("/traces/{task_id}")
+async def get_trace(task_id: str):
+    """Timeline de la tâche au format Chrome trace (chrome://tracing, Perfetto)."""
+    trace = tracer.chrome_trace(task_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"No trace for task {task_id}")
+    return trace
+
+
+@app.get("/traces/{task_id}/profile", response_class=PlainTextResponse)
+async def get_profile(task_id: str):
+    """Piles échantillonnées ("collapsed stacks") d'une tâche lancée avec "profile": true."""
+    profile = tracer.profile(task_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"No profile for task {task_id}")
+    return profile
+
+
+@app.get("/scheduler")
+async def get_scheduler_stats():
+    """Jobs admis, profondeur de file et temps d'attente de chaque étape."""
+    return scheduler.stats()
 
 
 @app.websocket("/ws/process")
@@ -43,14 +161,22 @@ async def websocket_process(websocket: WebSocket):
 
     Flux standard (fichier local):
     1. Client envoie: {"action": "create_course|create_summary", "file_path": "...", ...}
+       (champs optionnels "priority": "high|normal|low",
+       "outputs": ["create_course", "create_summary", "transcript_srt", ...],
+       "language": "fr" pour les sous-titres d'une URL et "profile": true pour
+       échantillonner les piles pendant le traitement, voir /traces/{task_id}/profile)
     2. Backend traite et envoie les mises à jour de progression
     3. Backend envoie "complete" à la fin
 
     Flux URL (download_video):
     1. Client envoie: {"action": "download_video", "file_path": "https://..."}
-    2. Backend télécharge et envoie "download_complete"
+    2. Backend lit les métadonnées (sans télécharger) et envoie "url_ready"
     3. Client envoie: {"continue_action": "create_course|create_summary|done", ...}
-    4. Backend continue la pipeline ou termine
+    4. Backend télécharge l'audio seul et lance la pipeline, ou la vidéo complète pour "done"
+
+    Flux URL avec action choisie d'emblée:
+    1. Client envoie: {"action": "create_course|create_summary", "file_path": "https://...", ...}
+    2. Backend transcrit l'audio par fenêtres pendant son téléchargement, puis continue la pipeline
     """
     task_id = None
 
@@ -65,21 +191,35 @@ async def websocket_process(websocket: WebSocket):
         file_path = data["file_path"]
         output_format = data.get("output_format", "")
         output_path = data.get("output_path", "")
+        priority = data.get("priority", "normal")
+        outputs = data.get("outputs")
+        language = data.get("language")
+        profile = bool(data.get("profile", False))
 
         task_id = task_manager.create_task(
             file_path=file_path,
             action=action,
             output_format=output_format,
-            output_path=output_path
+            output_path=output_path,
+            profile=profile
         )
 
-        websocket_manager.connections[task_id] = websocket
+        websocket_manager.register(task_id, websocket)
 
-        await websocket.send_json({
+        # Même file sortante que la suite du job : "connected" part toujours en premier
+        await websocket_manager.send_message(task_id, {
             "type": "connected",
             "task_id": task_id
         })
 
+        try:
+            scheduler.admit(task_id, priority)
+        except (SchedulerFull, ValueError) as e:
+            logger.warning(f"Task {task_id} rejected: {e}")
+            # Envoyé par drain() dans le finally, avant la fermeture
+            await websocket_manager.send_message(task_id, {"type": "error", "message": str(e)})
+            return
+
         try:
             await process_file_task(
                 task_id=task_id,
@@ -87,7 +227,9 @@ async def websocket_process(websocket: WebSocket):
                 file_path=file_path,
                 output_format=output_format,
                 output_path=output_path,
-                websocket=websocket
+                websocket=websocket,
+                outputs=outputs,
+                language=language,
             )
 
             await asyncio.sleep(2)
@@ -105,7 +247,10 @@ async def websocket_process(websocket: WebSocket):
             await task_manager.set_error(task_id, str(e))
     finally:
         if task_id:
+            scheduler.release_job(task_id)
+            await websocket_manager.drain(task_id)
             websocket_manager.disconnect(task_id)
+            task_manager.cleanup(task_id)
 
 
 if __name__ == "__main__":
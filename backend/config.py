@@ -22,23 +22,101 @@ logger = setup_logger(__name__)
 @dataclass
 class TranscriptionConfig:
     whisper_model: str
+    backend: str
+    pool_max_models: int
+    pool_max_memory_mb: int
+    warm_on_startup: bool
+    cache: bool
+    cache_max_mb: int
+    max_in_memory_mb: int
+    vad: bool
+    vad_min_silence_ms: int
+    chunked: bool
+    chunk_workers: int
+    chunk_window_seconds: float
+    chunk_overlap_seconds: float
+
+
+@dataclass
+class AudioConfig:
+    normalization: str
+    target_dbfs: float
+
+
+@dataclass
+class SchedulerConfig:
+    download_workers: int
+    decode_workers: int
+    transcription_workers: int
+    llm_workers: int
+    max_jobs: int
+
+
+@dataclass
+class WebSocketConfig:
+    send_queue_size: int
+
+
+@dataclass
+class DownloadConfig:
+    cache: bool
+    cache_max_mb: int
+    live: bool
+    live_window_seconds: float
+    playlist_concurrency: int
+    fragment_concurrency: int
+
+
+@dataclass
+class CaptionsConfig:
+    enabled: bool
+    languages: list
+    accept_auto: bool
+    min_coverage: float
+
+
+@dataclass
+class TracingConfig:
+    enabled: bool
+    max_traces: int
+    max_events: int
+    profile_interval_ms: float
 
 
 @dataclass
 class LLMConfig:
     provider: str
     model: str
+    timeout: float
+    idle_timeout: float
+    max_connections: int
+    stream_coalesce_ms: float
+    long_input_tokens: int
+    chunk_tokens: int
+    map_parallelism: int
+    compaction: bool
+    cache: bool
+    cache_ttl_hours: float
+    cache_max_mb: int
+    chunk_cache_max_mb: int
 
 
 @dataclass
 class PathsConfig:
     temp_folder: str
     output_folder: str
+    cache_folder: str
 
 
 @dataclass
 class Config:
     transcription: TranscriptionConfig
+    audio: AudioConfig
+    scheduler: SchedulerConfig
+    websocket: WebSocketConfig
+    download: DownloadConfig
+    captions: CaptionsConfig
+    tracing: TracingConfig
     llm: LLMConfig
     paths: PathsConfig
 
@@ -49,12 +127,65 @@ CONFIG_PATH = PROJECT_ROOT / "config.json"
 
 # Valeurs par défaut
 DEFAULT_CONFIG = {
-    "transcription": {"whisper_model": "large-v3-turbo"},
-    "llm": {"provider": "Kimi", "model": "k2.5"},
-    "paths": {"temp_folder": ".temp", "output_folder": "./output/"},
+    "transcription": {
+        "whisper_model": "large-v3-turbo",
+        "backend": "auto",
+        "pool_max_models": 2,
+        "pool_max_memory_mb": 8192,
+        "warm_on_startup": True,
+        "cache": True,
+        "cache_max_mb": 1024,
+        "max_in_memory_mb": 512,
+        "vad": True,
+        "vad_min_silence_ms": 700,
+        "chunked": False,
+        "chunk_workers": 0,
+        "chunk_window_seconds": 300,
+        "chunk_overlap_seconds": 2.0,
+    },
+    "audio": {"normalization": "peak", "target_dbfs": -20.0},
+    "scheduler": {
+        "download_workers": 2,
+        "decode_workers": 2,
+        "transcription_workers": 1,
+        "llm_workers": 4,
+        "max_jobs": 8,
+    },
+    "websocket": {"send_queue_size": 256},
+    "download": {
+        "cache": True,
+        "cache_max_mb": 8192,
+        "live": True,
+        "live_window_seconds": 120,
+        "playlist_concurrency": 2,
+        "fragment_concurrency": 4,
+    },
+    "captions": {"enabled": True, "languages": ["fr", "en"], "accept_auto": True, "min_coverage": 0.6},
+    "tracing": {"enabled": True, "max_traces": 50, "max_events": 20000, "profile_interval_ms": 10},
+    "llm": {
+        "provider": "Kimi",
+        "model": "k2.5",
+        "timeout": 600.0,
+        "idle_timeout": 60.0,
+        "max_connections": 20,
+        "stream_coalesce_ms": 50,
+        "long_input_tokens": 24000,
+        "chunk_tokens": 6000,
+        "map_parallelism": 4,
+        "compaction": True,
+        "cache": True,
+        "cache_ttl_hours": 168,
+        "cache_max_mb": 256,
+        "chunk_cache_max_mb": 128,
+    },
+    "paths": {"temp_folder": ".temp", "output_folder": "./output/", "cache_folder": ".cache"},
 }
 
-NORMALIZED_AUDIO_NAME = "normalized_audio.wav"
+# Débordement disque de l'audio normalisé (float32 brut) quand il dépasse max_in_memory_mb,
+# écrit dans le dossier de travail de la tâche
+NORMALIZED_AUDIO_NAME = "normalized_audio.f32"
+# Zones de parole (VAD) condensées à partir de cet audio débordé, dans le même dossier
+CONDENSED_AUDIO_NAME = "speech_audio.f32"
 
 
 def load_config() -> Config:
@@ -86,7 +217,124 @@ def load_config() -> Config:
         transcription=TranscriptionConfig(
             whisper_model=config_dict.get("transcription", {}).get(
                 "whisper_model", DEFAULT_CONFIG["transcription"]["whisper_model"]
-            )
+            ),
+            backend=config_dict.get("transcription", {}).get(
+                "backend", DEFAULT_CONFIG["transcription"]["backend"]
+            ),
+            pool_max_models=config_dict.get("transcription", {}).get(
+                "pool_max_models", DEFAULT_CONFIG["transcription"]["pool_max_models"]
+            ),
+            pool_max_memory_mb=config_dict.get("transcription", {}).get(
+                "pool_max_memory_mb", DEFAULT_CONFIG["transcription"]["pool_max_memory_mb"]
+            ),
+            warm_on_startup=config_dict.get("transcription", {}).get(
+                "warm_on_startup", DEFAULT_CONFIG["transcription"]["warm_on_startup"]
+            ),
+            cache=config_dict.get("transcription", {}).get(
+                "cache", DEFAULT_CONFIG["transcription"]["cache"]
+            ),
+            cache_max_mb=config_dict.get("transcription", {}).get(
+                "cache_max_mb", DEFAULT_CONFIG["transcription"]["cache_max_mb"]
+            ),
+            max_in_memory_mb=config_dict.get("transcription", {}).get(
+                "max_in_memory_mb", DEFAULT_CONFIG["transcription"]["max_in_memory_mb"]
+            ),
+            vad=config_dict.get("transcription", {}).get(
+                "vad", DEFAULT_CONFIG["transcription"]["vad"]
+            ),
+            vad_min_silence_ms=config_dict.get("transcription", {}).get(
+                "vad_min_silence_ms", DEFAULT_CONFIG["transcription"]["vad_min_silence_ms"]
+            ),
+            chunked=config_dict.get("transcription", {}).get(
+                "chunked", DEFAULT_CONFIG["transcription"]["chunked"]
+            ),
+            chunk_workers=config_dict.get("transcription", {}).get(
+                "chunk_workers", DEFAULT_CONFIG["transcription"]["chunk_workers"]
+            ),
+            chunk_window_seconds=config_dict.get("transcription", {}).get(
+                "chunk_window_seconds", DEFAULT_CONFIG["transcription"]["chunk_window_seconds"]
+            ),
+            chunk_overlap_seconds=config_dict.get("transcription", {}).get(
+                "chunk_overlap_seconds", DEFAULT_CONFIG["transcription"]["chunk_overlap_seconds"]
+            ),
+        ),
+        audio=AudioConfig(
+            normalization=config_dict.get("audio", {}).get(
+                "normalization", DEFAULT_CONFIG["audio"]["normalization"]
+            ),
+            target_dbfs=config_dict.get("audio", {}).get(
+                "target_dbfs", DEFAULT_CONFIG["audio"]["target_dbfs"]
+            ),
+        ),
+        scheduler=SchedulerConfig(
+            download_workers=config_dict.get("scheduler", {}).get(
+                "download_workers", DEFAULT_CONFIG["scheduler"]["download_workers"]
+            ),
+            decode_workers=config_dict.get("scheduler", {}).get(
+                "decode_workers", DEFAULT_CONFIG["scheduler"]["decode_workers"]
+            ),
+            transcription_workers=config_dict.get("scheduler", {}).get(
+                "transcription_workers", DEFAULT_CONFIG["scheduler"]["transcription_workers"]
+            ),
+            llm_workers=config_dict.get("scheduler", {}).get(
+                "llm_workers", DEFAULT_CONFIG["scheduler"]["llm_workers"]
+            ),
+            max_jobs=config_dict.get("scheduler", {}).get(
+                "max_jobs", DEFAULT_CONFIG["scheduler"]["max_jobs"]
+            ),
+        ),
+        websocket=WebSocketConfig(
+            send_queue_size=config_dict.get("websocket", {}).get(
+                "send_queue_size", DEFAULT_CONFIG["websocket"]["send_queue_size"]
+            ),
+        ),
+        download=DownloadConfig(
+            cache=config_dict.get("download", {}).get(
+                "cache", DEFAULT_CONFIG["download"]["cache"]
+            ),
+            cache_max_mb=config_dict.get("download", {}).get(
+                "cache_max_mb", DEFAULT_CONFIG["download"]["cache_max_mb"]
+            ),
+            live=config_dict.get("download", {}).get(
+                "live", DEFAULT_CONFIG["download"]["live"]
+            ),
+            live_window_seconds=config_dict.get("download", {}).get(
+                "live_window_seconds", DEFAULT_CONFIG["download"]["live_window_seconds"]
+            ),
+            playlist_concurrency=config_dict.get("download", {}).get(
+                "playlist_concurrency", DEFAULT_CONFIG["download"]["playlist_concurrency"]
+            ),
+            fragment_concurrency=config_dict.get("download", {}).get(
+                "fragment_concurrency", DEFAULT_CONFIG["download"]["fragment_concurrency"]
+            ),
+        ),
+        captions=CaptionsConfig(
+            enabled=config_dict.get("captions", {}).get(
+                "enabled", DEFAULT_CONFIG["captions"]["enabled"]
+            ),
+            languages=config_dict.get("captions", {}).get(
+                "languages", DEFAULT_CONFIG["captions"]["languages"]
+            ),
+            accept_auto=config_dict.get("captions", {}).get(
+                "accept_auto", DEFAULT_CONFIG["captions"]["accept_auto"]
+            ),
+            min_coverage=config_dict.get("captions", {}).get(
+                "min_coverage", DEFAULT_CONFIG["captions"]["min_coverage"]
+            ),
+        ),
+        tracing=TracingConfig(
+            enabled=config_dict.get("tracing", {}).get(
+                "enabled", DEFAULT_CONFIG["tracing"]["enabled"]
+            ),
+            max_traces=config_dict.get("tracing", {}).get(
+                "max_traces", DEFAULT_CONFIG["tracing"]["max_traces"]
+            ),
+            max_events=config_dict.get("tracing", {}).get(
+                "max_events", DEFAULT_CONFIG["tracing"]["max_events"]
+            ),
+            profile_interval_ms=config_dict.get("tracing", {}).get(
+                "profile_interval_ms", DEFAULT_CONFIG["tracing"]["profile_interval_ms"]
+            ),
         ),
         llm=LLMConfig(
             provider=config_dict.get("llm", {}).get(
@@ -95,6 +343,42 @@ def load_config() -> Config:
             model=config_dict.get("llm", {}).get(
                 "model", DEFAULT_CONFIG["llm"]["model"]
             ),
+            timeout=config_dict.get("llm", {}).get(
+                "timeout", DEFAULT_CONFIG["llm"]["timeout"]
+            ),
+            idle_timeout=config_dict.get("llm", {}).get(
+                "idle_timeout", DEFAULT_CONFIG["llm"]["idle_timeout"]
+            ),
+            max_connections=config_dict.get("llm", {}).get(
+                "max_connections", DEFAULT_CONFIG["llm"]["max_connections"]
+            ),
+            stream_coalesce_ms=config_dict.get("llm", {}).get(
+                "stream_coalesce_ms", DEFAULT_CONFIG["llm"]["stream_coalesce_ms"]
+            ),
+            long_input_tokens=config_dict.get("llm", {}).get(
+                "long_input_tokens", DEFAULT_CONFIG["llm"]["long_input_tokens"]
+            ),
+            chunk_tokens=config_dict.get("llm", {}).get(
+                "chunk_tokens", DEFAULT_CONFIG["llm"]["chunk_tokens"]
+            ),
+            map_parallelism=config_dict.get("llm", {}).get(
+                "map_parallelism", DEFAULT_CONFIG["llm"]["map_parallelism"]
+            ),
+            compaction=config_dict.get("llm", {}).get(
+                "compaction", DEFAULT_CONFIG["llm"]["compaction"]
+            ),
+            cache=config_dict.get("llm", {}).get(
+                "cache", DEFAULT_CONFIG["llm"]["cache"]
+            ),
+            cache_ttl_hours=config_dict.get("llm", {}).get(
+                "cache_ttl_hours", DEFAULT_CONFIG["llm"]["cache_ttl_hours"]
+            ),
+            cache_max_mb=config_dict.get("llm", {}).get(
+                "cache_max_mb", DEFAULT_CONFIG["llm"]["cache_max_mb"]
+            ),
+            chunk_cache_max_mb=config_dict.get("llm", {}).get(
+                "chunk_cache_max_mb", DEFAULT_CONFIG["llm"]["chunk_cache_max_mb"]
+            ),
         ),
         paths=PathsConfig(
             temp_folder=config_dict.get("paths", {}).get(
@@ -103,6 +387,9 @@ def load_config() -> Config:
             output_folder=config_dict.get("paths", {}).get(
                 "output_folder", DEFAULT_CONFIG["paths"]["output_folder"]
             ),
+            cache_folder=config_dict.get("paths", {}).get(
+                "cache_folder", DEFAULT_CONFIG["paths"]["cache_folder"]
+            ),
         ),
     )
 
@@ -127,14 +414,60 @@ config = load_config()
 
 # Variables individuelles pour import direct (optionnel)
 whisper_model = config.transcription.whisper_model
+transcription_backend = config.transcription.backend
+pool_max_models = config.transcription.pool_max_models
+pool_max_memory_mb = config.transcription.pool_max_memory_mb
+warm_on_startup = config.transcription.warm_on_startup
+transcription_cache_enabled = config.transcription.cache
+transcription_cache_max_mb = config.transcription.cache_max_mb
+max_in_memory_mb = config.transcription.max_in_memory_mb
+vad_enabled = config.transcription.vad
+vad_min_silence_ms = config.transcription.vad_min_silence_ms
+chunked_transcription = config.transcription.chunked
+chunk_workers = config.transcription.chunk_workers
+chunk_window_seconds = config.transcription.chunk_window_seconds
+chunk_overlap_seconds = config.transcription.chunk_overlap_seconds
+normalization_mode = config.audio.normalization
+normalization_target_dbfs = config.audio.target_dbfs
+download_workers = config.scheduler.download_workers
+decode_workers = config.scheduler.decode_workers
+transcription_workers = config.scheduler.transcription_workers
+llm_workers = config.scheduler.llm_workers
+max_jobs = config.scheduler.max_jobs
+send_queue_size = config.websocket.send_queue_size
+media_cache_enabled = config.download.cache
+media_cache_max_mb = config.download.cache_max_mb
+live_transcription = config.download.live
+live_window_seconds = config.download.live_window_seconds
+playlist_concurrency = config.download.playlist_concurrency
+fragment_concurrency = config.download.fragment_concurrency
+captions_enabled = config.captions.enabled
+captions_languages = config.captions.languages
+captions_accept_auto = config.captions.accept_auto
+captions_min_coverage = config.captions.min_coverage
+tracing_enabled = config.tracing.enabled
+max_traces = config.tracing.max_traces
+max_trace_events = config.tracing.max_events
+profile_interval_ms = config.tracing.profile_interval_ms
 llm_provider = config.llm.provider
 llm_model = config.llm.model
+llm_timeout = config.llm.timeout
+llm_idle_timeout = config.llm.idle_timeout
+llm_max_connections = config.llm.max_connections
+stream_coalesce_ms = config.llm.stream_coalesce_ms
+long_input_tokens = config.llm.long_input_tokens
+chunk_tokens = config.llm.chunk_tokens
+map_parallelism = config.llm.map_parallelism
+compaction_enabled = config.llm.compaction
+llm_cache_enabled = config.llm.cache
+llm_cache_ttl_hours = config.llm.cache_ttl_hours
+llm_cache_max_mb = config.llm.cache_max_mb
+chunk_cache_max_mb = config.llm.chunk_cache_max_mb
 
 # Chemins absolus résolus depuis la racine du projet
 temp_folder = str(PROJECT_ROOT / config.paths.temp_folder)
 output_folder = str(PROJECT_ROOT / config.paths.output_folder)
-
-NORMALIZED_AUDIO_PATH = f"{temp_folder}/{NORMALIZED_AUDIO_NAME}"
+cache_folder = str(PROJECT_ROOT / config.paths.cache_folder)
 
 if __name__ == "__main__":
     # Test du module
@@ -1,33 +1,63 @@
-import mlx_whisper
+import hashlib
 import os
-import shutil
+import time
+import wave
+import numpy as np
 from logger import setup_logger
-from pydub import AudioSegment, effects
-from config import whisper_model, temp_folder, NORMALIZED_AUDIO_PATH
+from metrics import STAGE_SECONDS
+from tracing import span, traced
+from config import (
+    whisper_model,
+    transcription_backend,
+    max_in_memory_mb,
+    vad_enabled,
+    vad_min_silence_ms,
+    chunked_transcription,
+    chunk_workers,
+    chunk_window_seconds,
+    chunk_overlap_seconds,
+    normalization_mode,
+    normalization_target_dbfs,
+    NORMALIZED_AUDIO_NAME,
+    CONDENSED_AUDIO_NAME,
+)
+from core.ingest import SAMPLE_RATE, stream_audio, probe_duration, float_to_pcm16
+from core.normalize import BlockNormalizer
+from core.vad import SpeechTimeline, VadReport, detect_speech
+from core.chunked import transcribe_chunked
+from core.transcriber import get_transcriber, resolve_backend
+from core.cache import make_key
+from core.workspace import Workspace
 
 logger = setup_logger(__name__)
 
 
+def _open_pcm16_wav(path: str) -> wave.Wave_write:
+    """Ouvre un WAV PCM 16 bits mono 16 kHz en écriture."""
+    wav = wave.open(path, "wb")
+    wav.setnchannels(1)
+    wav.setsampwidth(2)
+    wav.setframerate(SAMPLE_RATE)
+    return wav
+
+
 class MediaProcessor:
-    def __init__(self, file_path) -> None:
+    def __init__(self, file_path, workspace: Workspace = None) -> None:
         self.file_path = file_path
+        # Dossier propre à la tâche : aucun chemin intermédiaire n'est partagé entre jobs
+        self.workspace = workspace or Workspace()
+        self.audio = None
+        self.audio_path = None
+        self.duration = None
+        self.audio_hash = None
+        self.speech_timeline = None
 
     # ----- File ------ #
 
     def clean_temp(self):
-        for filename in os.listdir(temp_folder):
-            file_path = os.path.join(temp_folder, filename)
-            try:
-                if os.path.isfile(file_path) or os.path.islink(file_path):
-                    os.unlink(file_path)
-                    logger.info(f"File {file_path.split('/')[-1]} successfully removed")
-                elif os.path.isdir(file_path):
-                    shutil.rmtree(file_path)
-                    logger.info(
-                        f"Folder {file_path.split('/')[-1]} successfully removed"
-                    )
-            except Exception as e:
-                logger.error(f"Failed to delete {file_path}. Reasons : {e}")
+        """Supprime les fichiers intermédiaires de cette tâche uniquement."""
+        self.audio = None
+        self.workspace.cleanup()
 
     def detect_file_type(self):
         video_extension = [
@@ -68,93 +98,213 @@ class MediaProcessor:
             logger.error(f"{first_split[-1]} is not a video or audio file")
             return "error"
 
-    # ----- Video ----- #
+    # ----- Audio ------ #
 
-    def extract_audio(self, video_path: str = None) -> str:
+    @traced("media.ingest_audio")
+    def ingest_audio(self, progress_callback=None) -> np.ndarray:
         """
-        Extrait l'audio d'un fichier vidéo et l'exporte en WAV dans le dossier temp.
+        Décode la source en une seule passe (pipe ffmpeg → mono 16 kHz) puis
+        normalise par blocs (voir core.normalize). Remplace l'ancien enchaînement
+        extract_audio → normalize_audio qui décodait trois fois le fichier.
+
+        L'audio normalisé reste en mémoire (float32) tant qu'il tient dans
+        max_in_memory_mb ; au-delà, il déborde sur disque via un memmap.
 
         Args:
-            video_path: Chemin vers le fichier vidéo (défaut: self.file_path)
+            progress_callback: Callback appelé avec le pourcentage décodé (0-100)
 
         Returns:
-            str: Chemin du fichier audio extrait
+            np.ndarray: Audio normalisé float32, mono 16 kHz
         """
-        if video_path is None:
-            video_path = self.file_path
-
-        logger.info(f"Extracting audio from {video_path}")
-        audio = AudioSegment.from_file(video_path)
-
-        output_path = os.path.join(temp_folder, "extracted_audio.wav")
-        audio.export(output_path, format="wav")
-
-        logger.info(f"Audio extracted to {output_path}")
-
-        # Update file_path so normalize_audio() uses the extracted audio
-        self.file_path = output_path
-        return output_path
+        with span("ingest.probe"):
+            total_duration = probe_duration(self.file_path)
+        extracted_path = self.workspace.path_for("extracted_audio.wav")
+        max_in_memory_frames = max_in_memory_mb * 1024 * 1024 // 4
+
+        # On ne passe par le disque que si la durée annoncée dépasse le budget mémoire
+        in_memory = (
+            total_duration is not None
+            and total_duration * SAMPLE_RATE <= max_in_memory_frames
+        )
+        blocks = []
+        wav = None
+        # Empreinte du flux décodé, calculée au fil de l'eau pour le cache de transcription
+        hasher = hashlib.sha256()
+
+        # ----- Passe 1 : décodage + mesure du pic / de l'énergie ----- #
+        logger.info(f"Decoding audio from {self.file_path}")
+        decode_start = time.perf_counter()
+        with span("ingest.decode"):
+            normalizer = BlockNormalizer(
+                mode=normalization_mode, target_dbfs=normalization_target_dbfs
+            )
+            try:
+                for block in stream_audio(self.file_path):
+                    pcm = float_to_pcm16(block)
+                    normalizer.observe(pcm)
+                    hasher.update(pcm.tobytes())
+
+                    if in_memory and normalizer.frames > max_in_memory_frames:
+                        logger.info("Audio exceeds max_in_memory_mb, spilling to disk")
+                        in_memory = False
+
+                    if in_memory:
+                        blocks.append(pcm)
+                    else:
+                        if wav is None:
+                            wav = _open_pcm16_wav(extracted_path)
+                            for kept in blocks:
+                                wav.writeframes(kept.tobytes())
+                            blocks = []
+                        wav.writeframes(pcm.tobytes())
+
+                    if progress_callback and total_duration:
+                        decoded = normalizer.frames / SAMPLE_RATE
+                        progress_callback(min(decoded / total_duration * 100, 100))
+            finally:
+                if wav is not None:
+                    wav.close()
+
+        self.duration = normalizer.frames / SAMPLE_RATE
+        self.audio_hash = hasher.hexdigest()
+        logger.info(f"Audio decoded ({self.duration:.2f}s)")
+        STAGE_SECONDS.labels("extract").observe(time.perf_counter() - decode_start)
+
+        # ----- Passe 2 : gain appliqué par blocs ----- #
+        logger.info("Starting normalizing audio")
+        normalize_start = time.perf_counter()
+        with span("ingest.normalize", spilled=not in_memory):
+            if in_memory:
+                self.audio = normalizer.normalize_blocks(blocks)
+                self.audio_path = None
+            else:
+                self.audio_path = self.workspace.path_for(NORMALIZED_AUDIO_NAME)
+                self.audio = normalizer.normalize_wav_to_array(extracted_path, self.audio_path)
+                os.remove(extracted_path)
+        STAGE_SECONDS.labels("normalize").observe(time.perf_counter() - normalize_start)
+        logger.info("Audio normalized successfully")
 
-    # ----- Audio ------ #
+        return self.audio
 
-    def normalize_audio(self):
+    @traced("media.detect_speech")
+    def detect_speech(self) -> VadReport:
         """
-        Normalize the audio to prepare it for translation
-
-        Args:
-            file_path (str): Path to the audio file
+        Repère les zones de parole de l'audio normalisé pour que
+        transcribe_audio() ne transcrive que celles-ci.
 
         Returns:
-            Void: create temporary file audio.mp3
+            VadReport: Durées totale / parlée / ignorée
         """
-        # ----- Loading audio file ----- #
-        logger.info(f"Loading audio file from {self.file_path}")
-        rawsound = AudioSegment.from_file(self.file_path)
+        if self.audio is None:
+            raise RuntimeError("ingest_audio() must run before detect_speech()")
 
-        # ----- Normalize audio ----- #
-        logger.info("Starting normalizing audio")
-        normalized_sound = effects.normalize(rawsound)
-        logger.info("Audio normalized successfully")
+        with STAGE_SECONDS.labels("vad").time():
+            regions = detect_speech(self.audio, SAMPLE_RATE, min_silence_ms=vad_min_silence_ms)
+        self.speech_timeline = SpeechTimeline(regions, len(self.audio), SAMPLE_RATE)
 
-        normalized_sound.export(NORMALIZED_AUDIO_PATH, format="wav")
+        report = self.speech_timeline.report
+        logger.info(
+            f"VAD: {report.speech_duration:.1f}s of speech out of {report.total_duration:.1f}s "
+            f"({report.skipped_ratio * 100:.1f}% skipped)"
+        )
+        return report
+
+    def transcription_cache_key(self) -> str:
+        """
+        Clé du cache de transcription : empreinte de l'audio décodé + modèle
+        + toutes les options qui changent le résultat.
+        """
+        if self.audio_hash is None:
+            raise RuntimeError("ingest_audio() must run before transcription_cache_key()")
+
+        options = {
+            "backend": resolve_backend(transcription_backend),
+            "vad": vad_enabled,
+            "vad_min_silence_ms": vad_min_silence_ms if vad_enabled else None,
+            "normalization": normalization_mode,
+            "target_dbfs": normalization_target_dbfs if normalization_mode == "loudness" else None,
+            "chunked": chunked_transcription,
+            "chunk_window_seconds": chunk_window_seconds if chunked_transcription else None,
+            "chunk_overlap_seconds": chunk_overlap_seconds if chunked_transcription else None,
+        }
+        return make_key(self.audio_hash, whisper_model, options)
 
     def get_audio_duration(self):
         """
-        Get the duration of an audio file in seconds using PyDub
+        Get the duration of an audio file in seconds
 
-        Args:
-            file_path (str): Path to the audio file
+        Uses the decoded duration when ingest_audio() already ran, otherwise
+        asks ffprobe without decoding the file.
 
         Returns:
             float or None: Duration is seconds, or None if an error occurs
         """
+        if self.duration is not None:
+            return self.duration
+        return probe_duration(self.file_path)
 
-        try:
-            # ----- Loading audio file ----- #
-            audio = AudioSegment.from_file(self.file_path)
-
-            # ----- Get duration in milliseconds and convert to seconds ------ #
-            duration_seconds = len(audio) / 1000.0
-            return duration_seconds
-
-        except Exception as e:
-            logger.error(f"Error processing audio file: {e}")
-            return None
-
-    def transcribe_audio(self):
+    def transcribe_audio(self, progress_callback=None, segment_callback=None):
         """
-        Transcribe audio to text using mlx-whisper with Metal GPU acceleration
+        Transcribe audio to text with the configured backend (see core.transcriber),
+        using a model kept resident in the model pool
+
+        The normalized float32 buffer produced by ingest_audio() is handed
+        directly to the model, without re-encoding it to a file. When
+        detect_speech() ran, only the speech regions are transcribed and the
+        segment timestamps are mapped back to the original timeline.
 
         Args:
-            normalized_audio_path: Path to the normalized audio file
-            whisper_model: Model name (e.g., 'tiny', 'base', 'small', 'medium', 'large-v1', 'large-v2', 'large-v3')
+            progress_callback: Called with (transcribed_seconds, total_seconds),
+                driven by the end timestamp of each decoded segment
+            segment_callback: Called with each segment (id, start, end, text) as soon
+                as it is decoded, timestamps already on the original timeline
 
         Returns:
             dict: Transcription result with text, segments, and language info
         """
-        repo_id = f"mlx-community/whisper-{whisper_model}"
+        if self.audio is None:
+            raise RuntimeError("ingest_audio() must run before transcribe_audio()")
+
+        audio = self.audio
+        if self.speech_timeline is not None:
+            if not self.speech_timeline.regions:
+                logger.info("No speech detected, skipping transcription")
+                return {"text": "", "segments": [], "language": None}
+            # Audio débordé sur disque : les zones de parole sont condensées dans un memmap, pas en RAM
+            audio = self.speech_timeline.condense(self.audio, self.workspace.path_for(CONDENSED_AUDIO_NAME))
+
+        total_seconds = len(audio) / SAMPLE_RATE
+
+        def on_progress(done_seconds):
+            if progress_callback:
+                progress_callback(min(done_seconds, total_seconds), total_seconds)
+
+        def on_segment(segment):
+            if segment_callback is None:
+                return
+            if self.speech_timeline is not None:
+                segment["start"] = self.speech_timeline.to_original(segment["start"])
+                segment["end"] = self.speech_timeline.to_original(segment["end"], is_end=True)
+            segment_callback(segment)
+
+        if chunked_transcription and len(audio) > chunk_window_seconds * SAMPLE_RATE:
+            result = transcribe_chunked(
+                audio,
+                whisper_model,
+                backend=transcription_backend,
+                workers=chunk_workers or None,
+                window_seconds=chunk_window_seconds,
+                overlap_seconds=chunk_overlap_seconds,
+                progress_callback=on_progress,
+                segment_callback=on_segment,
+            )
+        else:
+            result = get_transcriber().transcribe(
+                audio, progress_callback=on_progress, segment_callback=on_segment
+            )
 
-        result = mlx_whisper.transcribe(NORMALIZED_AUDIO_PATH, path_or_hf_repo=repo_id)
+        if self.speech_timeline is not None:
+            result = self.speech_timeline.remap_result(result)
 
         logger.info(
             f"Transcription completed. Language: {result.get('language')}, Duration: {result.get('duration', 0):.2f}s"
@@ -167,7 +317,7 @@ class MediaProcessor:
 
 if __name__ == "__main__":
     media = MediaProcessor("/Users/alexfougeroux/Downloads/reinforcement2.m4a")
-    media.normalize_audio()
+    media.ingest_audio()
     transcribe = media.transcribe_audio()
     media.clean_temp()
     print(transcribe)
@@ -0,0 +1,148 @@
+"""
+Cache disque persistant, adressé par contenu, avec éviction LRU par taille.
+
+Chaque entrée est un fichier JSON nommé d'après sa clé ; la date de
+modification sert d'horodatage LRU (mise à jour à chaque lecture), ce qui
+évite de maintenir un index séparé. Avec `ttl_seconds`, la date de création
+est enregistrée avec la valeur et les entrées expirées sont ignorées puis
+supprimées.
+
+Usage:
+    from core.cache import transcription_cache, make_key
+
+    key = make_key(audio_hash, "large-v3-turbo", {"vad": True})
+    result = transcription_cache.get(key)
+    if result is None:
+        result = transcribe(...)
+        transcription_cache.set(key, result)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Optional
+
+from logger import setup_logger
+from config import cache_folder, transcription_cache_max_mb
+
+logger = setup_logger(__name__)
+
+
+def make_key(*parts: Any) -> str:
+    """Clé SHA-256 stable à partir de valeurs sérialisables en JSON."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _to_json(value: Any) -> Any:
+    """Convertit les scalaires numpy (float32...) renvoyés par les modèles."""
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+class DiskCache:
+    """Cache clé → dict JSON sur disque, borné en taille (LRU) et optionnellement en durée (TTL)."""
+
+    def __init__(self, folder: str, max_bytes: int, ttl_seconds: Optional[float] = None) -> None:
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.expired = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(folder, exist_ok=True)
+        self._size = sum(
+            entry.stat().st_size for entry in os.scandir(folder) if entry.name.endswith(".json")
+        )
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    value = json.load(f)
+                os.utime(path)
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            except (json.JSONDecodeError, OSError) as e:
+                logger.error(f"Corrupted cache entry {path}: {e}")
+                self._remove(path)
+                self.misses += 1
+                return None
+            if self.ttl_seconds is not None:
+                if time.time() - value.get("created_at", 0) > self.ttl_seconds:
+                    self._remove(path)
+                    self.expired += 1
+                    self.misses += 1
+                    return None
+                value = value["value"]
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: dict) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        if self.ttl_seconds is not None:
+            value = {"created_at": time.time(), "value": value}
+        with self._lock:
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(value, f, ensure_ascii=False, default=_to_json)
+                if os.path.exists(path):
+                    self._size -= os.path.getsize(path)
+                os.replace(tmp_path, path)
+                self._size += os.path.getsize(path)
+            except Exception as e:
+                logger.error(f"Error writing cache entry {path}: {e}")
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                return
+            self._evict()
+
+    def _remove(self, path: str) -> None:
+        try:
+            size = os.path.getsize(path)
+            os.unlink(path)
+            self._size -= size
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> None:
+        if self._size <= self.max_bytes:
+            return
+        entries = sorted(
+            (entry for entry in os.scandir(self.folder) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries:
+            if self._size <= self.max_bytes:
+                break
+            self._remove(entry.path)
+            logger.info(f"Evicted cache entry {entry.name}")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+transcription_cache = DiskCache(
+    os.path.join(cache_folder, "transcriptions"), transcription_cache_max_mb * 1024 * 1024
+)
@@ -0,0 +1,203 @@
+"""
+Sous-titres de la source utilisés à la place de Whisper.
+
+Beaucoup de vidéos ont déjà des sous-titres, ajoutés par l'auteur ou générés
+automatiquement par la plateforme. Récupérés en VTT ou SRT, ils sont convertis
+dans la structure renvoyée par MediaProcessor.transcribe_audio() (text,
+segments, language) : la génération peut démarrer en quelques secondes, sans
+téléchargement ni transcription.
+
+Politique de qualité (section `captions` de config.json) :
+    - sous-titres de l'auteur préférés aux sous-titres automatiques, acceptés
+      seulement avec `accept_auto` et jamais s'il s'agit d'une traduction
+      automatique (langue différente de celle de la vidéo) ;
+    - la part de la durée couverte par les sous-titres doit atteindre
+      `min_coverage`, et le débit de parole MIN_WORDS_PER_MINUTE, sinon la
+      pipeline Whisper prend le relais.
+
+Usage:
+    from core.captions import select_caption_track, parse_captions, evaluate_captions
+
+    track = select_caption_track(info, ["fr", "en"])      # info : extract_info() de yt-dlp
+    result = parse_captions(content, track["ext"], track["language"])
+    accepted, report = evaluate_captions(result, duration)
+"""
+
+import html
+import re
+from typing import List, Optional, Tuple
+
+from logger import setup_logger
+from config import captions_accept_auto, captions_min_coverage
+
+logger = setup_logger(__name__)
+
+CAPTION_FORMATS = ("vtt", "srt")
+# En dessous, la piste ne contient guère que des annotations ("[Musique]"...)
+MIN_WORDS_PER_MINUTE = 30
+
+_TIMING = re.compile(
+    r"(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{3})\s*-->\s*(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{3})"
+)
+_TAG = re.compile(r"<[^>]*>")
+# Annotations non parlées : [Musique], [Applause], (rires)...
+_ANNOTATION = re.compile(r"\[[^\]]*\]|\([^)]*\)|♪+")
+
+
+# ----- Choix de la piste ----- #
+
+def _matches(track_language: str, language: str) -> bool:
+    """'fr' accepte 'fr', 'fr-FR', 'fr-CA'..."""
+    return track_language == language or track_language.split("-")[0] == language
+
+
+def _pick_format(tracks: List[dict]) -> Optional[dict]:
+    for ext in CAPTION_FORMATS:
+        for track in tracks:
+            if track.get("ext") == ext and track.get("url"):
+                return track
+    return None
+
+
+def select_caption_track(
+    info: dict, languages: List[str], accept_auto: bool = captions_accept_auto
+) -> Optional[dict]:
+    """
+    Choisit la meilleure piste de sous-titres dans l'info yt-dlp.
+
+    Args:
+        info: Résultat de extract_info(download=False)
+        languages: Langues acceptées par ordre de préférence ; vide = langue de la vidéo
+
+    Returns:
+        dict avec url, ext, language, source ("manual" ou "auto"), ou None
+    """
+    original = info.get("language")
+    languages = list(languages) or ([original] if original else [])
+    manual = info.get("subtitles") or {}
+    automatic = info.get("automatic_captions") or {}
+
+    for language in languages:
+        for track_language, tracks in manual.items():
+            if _matches(track_language, language):
+                track = _pick_format(tracks)
+                if track:
+                    return {"url": track["url"], "ext": track["ext"], "language": language, "source": "manual"}
+
+    if not accept_auto:
+        return None
+    for language in languages:
+        # Piste générée dans la langue parlée ("xx-orig" chez YouTube), jamais une traduction automatique
+        spoken = f"{language}-orig" in automatic or (original and _matches(original, language))
+        if not spoken:
+            continue
+        for key in (f"{language}-orig", language):
+            track = _pick_format(automatic.get(key, []))
+            if track:
+                return {"url": track["url"], "ext": track["ext"], "language": language, "source": "auto"}
+    return None
+
+
+# ----- Conversion ----- #
+
+def _seconds(hours: Optional[str], minutes: str, seconds: str, millis: str) -> float:
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds) + int(millis) / 1000
+
+
+def _clean(line: str) -> str:
+    text = html.unescape(_TAG.sub("", line))
+    text = _ANNOTATION.sub("", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _cues(content: str) -> List[Tuple[float, float, List[str]]]:
+    """Blocs (début, fin, lignes) d'un fichier VTT ou SRT."""
+    cues = []
+    # Séparateur = ligne vide ; une ligne faite d'espaces fait partie du bloc (sous-titres YouTube)
+    for block in re.split(r"\n{2,}", content.replace("\r\n", "\n").replace("\r", "\n")):
+        lines = block.strip("\n").split("\n")
+        for index, line in enumerate(lines):
+            match = _TIMING.search(line)
+            if match:
+                groups = match.groups()
+                start = _seconds(*groups[:4])
+                end = _seconds(*groups[4:])
+                text = [cleaned for cleaned in map(_clean, lines[index + 1:]) if cleaned]
+                cues.append((start, end, text))
+                break
+    return cues
+
+
+def parse_captions(content: str, ext: str = "vtt", language: Optional[str] = None) -> dict:
+    """
+    Convertit un fichier VTT/SRT en résultat de transcription.
+
+    Les sous-titres automatiques de YouTube sont "déroulants" : chaque bloc
+    répète la ligne du bloc précédent avant d'ajouter la suivante, et des blocs
+    de quelques millisecondes servent de transition. Seules les lignes nouvelles
+    sont gardées.
+
+    Returns:
+        dict: text, segments (id, start, end, text), language
+    """
+    if ext not in CAPTION_FORMATS:
+        raise ValueError(f"Unsupported caption format: {ext}")
+
+    segments: List[dict] = []
+    previous: List[str] = []
+    for start, end, lines in _cues(content):
+        if end - start < 0.05:
+            previous = lines or previous
+            continue
+        new_lines = [line for line in lines if line not in previous]
+        previous = lines
+        if not new_lines:
+            # Même texte prolongé : on étend le segment précédent
+            if segments and lines:
+                segments[-1]["end"] = max(segments[-1]["end"], end)
+            continue
+        segments.append(
+            {"id": len(segments), "start": start, "end": end, "text": " " + " ".join(new_lines)}
+        )
+
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": language,
+    }
+
+
+# ----- Qualité ----- #
+
+def evaluate_captions(
+    result: dict, duration: Optional[float], min_coverage: float = captions_min_coverage
+) -> Tuple[bool, dict]:
+    """
+    Applique la politique de qualité.
+
+    Returns:
+        (sous-titres utilisables, rapport : couverture, débit, nombre de segments)
+    """
+    segments = result.get("segments", [])
+    words = sum(len(segment["text"].split()) for segment in segments)
+    covered = 0.0
+    covered_until = 0.0
+    for segment in segments:
+        start = max(segment["start"], covered_until)
+        if segment["end"] > start:
+            covered += segment["end"] - start
+            covered_until = segment["end"]
+
+    if not duration:
+        duration = segments[-1]["end"] if segments else 0.0
+    coverage = covered / duration if duration else 0.0
+    words_per_minute = words / (duration / 60) if duration else 0.0
+
+    report = {
+        "segments": len(segments),
+        "coverage": round(coverage, 3),
+        "words_per_minute": round(words_per_minute, 1),
+    }
+    accepted = bool(segments) and coverage >= min_coverage and words_per_minute >= MIN_WORDS_PER_MINUTE
+    return accepted, report
+
@@ -0,0 +1,256 @@
+"""
+Transcription parallèle par fenêtres, répartie sur un pool de processus.
+
+L'audio normalisé est découpé en fenêtres d'environ `window_seconds`, coupées
+dans le passage le plus silencieux autour de la cible, avec un léger
+recouvrement. La première fenêtre fixe la langue, les suivantes sont
+transcrites en parallèle puis recollées en supprimant les mots répétés dans
+la zone de recouvrement.
+
+Fonctionne avec tous les backends de core.transcriber, y compris sur CPU (Linux).
+
+Usage:
+    from core.chunked import transcribe_chunked
+
+    result = transcribe_chunked(audio, "large-v3-turbo", workers=8)
+"""
+
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, List, NamedTuple, Optional
+
+import numpy as np
+from logger import setup_logger
+from core.vad import FRAME_MS, frame_energies
+from core.transcriber import get_transcriber, resolve_backend
+
+logger = setup_logger(__name__)
+
+SAMPLE_RATE = 16000
+DEFAULT_WINDOW_SECONDS = 300
+DEFAULT_OVERLAP_SECONDS = 2.0
+# Plage (de part et d'autre de la cible) dans laquelle on cherche le silence de coupe
+CUT_SEARCH_SECONDS = 20
+OVERLAP_MAX_WORDS = 20
+
+
+class Window(NamedTuple):
+    start: int  # Premier échantillon transcrit (recouvrement inclus)
+    end: int
+    cut: int  # Point de coupe : ce qui précède appartient à la fenêtre précédente
+
+
+# ----- Découpage ----- #
+
+def plan_windows(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    window_seconds: float = DEFAULT_WINDOW_SECONDS,
+    overlap_seconds: float = DEFAULT_OVERLAP_SECONDS,
+) -> List[Window]:
+    """
+    Découpe l'audio en fenêtres coupées sur les silences.
+
+    Chaque coupe est placée sur la trame la moins énergétique à
+    ±CUT_SEARCH_SECONDS de la taille cible.
+    """
+    total = len(audio)
+    window_frames = int(window_seconds * sample_rate)
+    if total <= window_frames:
+        return [Window(0, total, 0)]
+
+    frame_length = sample_rate * FRAME_MS // 1000
+    energies = frame_energies(audio, frame_length)
+    search = int(CUT_SEARCH_SECONDS * sample_rate)
+
+    cuts = []
+    position = 0
+    while total - position > window_frames:
+        target = position + window_frames
+        low = max(position + window_frames // 2, target - search) // frame_length
+        high = min(total - 1, target + search) // frame_length
+        candidates = energies[low:high]
+        if len(candidates):
+            cut = (low + int(np.argmin(candidates))) * frame_length
+        else:
+            cut = target
+        cuts.append(cut)
+        position = cut
+
+    overlap = int(overlap_seconds * sample_rate)
+    bounds = [0] + cuts + [total]
+    return [
+        Window(max(0, bounds[i] - overlap) if i else 0, bounds[i + 1], bounds[i])
+        for i in range(len(bounds) - 1)
+    ]
+
+
+# ----- Workers ----- #
+
+def transcribe_window(audio: np.ndarray, backend: str, model_name: str, language: Optional[str]) -> dict:
+    """
+    Transcrit une fenêtre (exécuté dans un processus du pool).
+
+    Chaque processus a son propre model_pool : le modèle reste chargé d'un job à l'autre.
+    """
+    return get_transcriber(backend, model_name).transcribe(audio, language)
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    """Pool partagé entre les jobs, créé à la demande ("spawn" : mlx et torch ne supportent pas fork)."""
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        _executor_workers = workers
+        logger.info(f"Started transcription process pool with {workers} workers")
+    return _executor
+
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+# ----- Recollage ----- #
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def strip_overlap(previous_text: str, text: str, max_words: int = OVERLAP_MAX_WORDS) -> str:
+    """Retire du début de `text` les mots qui terminent déjà `previous_text`."""
+    previous = [w for w in map(_normalize_word, previous_text.split()) if w][-max_words:]
+    words = text.split()
+    normalized = [_normalize_word(w) for w in words]
+    for size in range(min(len(previous), len(normalized)), 0, -1):
+        if previous[-size:] == normalized[:size]:
+            return " ".join(words[size:])
+    return text.strip()
+
+
+def stitch_windows(windows: List[Window], results: List[dict], sample_rate: int = SAMPLE_RATE) -> List[dict]:
+    """
+    Fusionne les segments des fenêtres sur une timeline unique.
+
+    Les segments entièrement situés avant la coupe d'une fenêtre ont déjà été
+    transcrits par la précédente ; pour celui qui chevauche la coupe, les mots
+    en double sont retirés.
+    """
+    segments: List[dict] = []
+    for window, result in zip(windows, results):
+        offset = window.start / sample_rate
+        cut = window.cut / sample_rate
+        for raw in result.get("segments", []):
+            segment = dict(raw)
+            segment["start"] = float(raw["start"]) + offset
+            segment["end"] = float(raw["end"]) + offset
+
+            if window.cut and segment["end"] <= cut:
+                continue
+            if window.cut and segment["start"] < cut and segments:
+                previous_text = " ".join(s["text"] for s in segments[-3:])
+                text = strip_overlap(previous_text, segment["text"])
+                if not text:
+                    continue
+                segment["text"] = " " + text
+                segment["start"] = max(segment["start"], segments[-1]["end"])
+                if segment.get("words"):
+                    segment["words"] = [
+                        w for w in segment["words"] if float(w["end"]) + offset > cut
+                    ]
+
+            if segment.get("words"):
+                segment["words"] = [
+                    {**w, "start": float(w["start"]) + offset, "end": float(w["end"]) + offset}
+                    for w in segment["words"]
+                ]
+            segment["id"] = len(segments)
+            segments.append(segment)
+    return segments
+
+
+def transcribe_chunked(
+    audio: np.ndarray,
+    model_name: str,
+    backend: str = "auto",
+    workers: Optional[int] = None,
+    window_seconds: float = DEFAULT_WINDOW_SECONDS,
+    overlap_seconds: float = DEFAULT_OVERLAP_SECONDS,
+    language: Optional[str] = None,
+    progress_callback: Optional[Callable[[float], None]] = None,
+    segment_callback: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Transcrit l'audio par fenêtres en parallèle.
+
+    Args:
+        progress_callback: Appelé avec le nombre de secondes d'audio transcrites
+            à chaque fenêtre terminée
+        segment_callback: Appelé avec chaque segment recollé, dans l'ordre, dès que
+            toutes les fenêtres qui le précèdent sont terminées
+
+    Returns:
+        dict: Même structure que mlx_whisper.transcribe (text, segments, language)
+    """
+    backend = resolve_backend(backend)
+    workers = workers or default_workers()
+    windows = plan_windows(audio, SAMPLE_RATE, window_seconds, overlap_seconds)
+    logger.info(f"Chunked transcription: {len(windows)} windows on {workers} {backend} workers")
+
+    executor = _get_executor(workers)
+
+    # La première fenêtre détecte la langue, qui est ensuite imposée aux autres
+    first = windows[0]
+    first_result = executor.submit(
+        transcribe_window, np.asarray(audio[first.start:first.end]), backend, model_name, language
+    ).result()
+    language = language or first_result.get("language")
+
+    results = [first_result] + [None] * (len(windows) - 1)
+    emitted = 0
+
+    def emit_ready_segments() -> None:
+        # Les fenêtres finissent dans le désordre : on ne recolle que le préfixe complet
+        nonlocal emitted
+        ready = next((i for i, result in enumerate(results) if result is None), len(results))
+        segments = stitch_windows(windows[:ready], results[:ready])
+        for segment in segments[emitted:]:
+            segment_callback(dict(segment))
+        emitted = len(segments)
+
+    done_frames = first.end
+    if progress_callback:
+        progress_callback(done_frames / SAMPLE_RATE)
+    if segment_callback:
+        emit_ready_segments()
+
+    futures = {
+        executor.submit(
+            transcribe_window, np.asarray(audio[w.start:w.end]), backend, model_name, language
+        ): index
+        for index, w in enumerate(windows[1:], start=1)
+    }
+    for future in as_completed(futures):
+        index = futures[future]
+        results[index] = future.result()
+        done_frames += windows[index].end - windows[index].cut
+        if progress_callback:
+            progress_callback(done_frames / SAMPLE_RATE)
+        if segment_callback:
+            emit_ready_segments()
+
+    segments = stitch_windows(windows, results)
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": language,
+    }
@@ -0,0 +1,292 @@
+"""
+Compaction déterministe de la transcription avant la génération LLM.
+
+La sortie brute de Whisper sur un cours contient beaucoup de tokens sans
+valeur pour le LLM : hésitations ("euh", "ben"), marqueurs de discours en
+début de phrase ("donc", "voilà", "du coup"), mots ou groupes de mots répétés
+("on va on va"), boucles de répétition propres à Whisper (le même segment
+plusieurs fois de suite) et une multitude de segments très courts.
+
+Cette passe les retire sans reformuler quoi que ce soit : le contenu couvert
+par le cours reste identique, seule la taille du prompt diminue.
+
+Usage:
+    from core.compaction import compact_transcript
+
+    compacted, report = compact_transcript(transcription_result)
+    prompt = create_course_prompt(compacted["text"])
+    report.as_dict()   # tokens avant / après
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from logger import setup_logger
+from core.tokens import estimate_tokens
+
+logger = setup_logger(__name__)
+
+# Hésitations : supprimées seulement quand elles sont isolées entre deux pauses
+# (début ou fin de segment, ponctuation), jamais au milieu d'une phrase ("12 mm")
+FILLERS = {
+    "fr": ["euh", "euhh", "heu", "hum", "hmm", "bah", "ben", "mmh"],
+    "en": ["uh", "uhm", "um", "umm", "erm", "hmm", "mhm"],
+}
+# Marqueurs de discours : supprimés seulement en début de phrase ou entre virgules,
+# là où ils ne portent pas de sens
+DISCOURSE_MARKERS = {
+    "fr": ["donc", "voilà", "du coup", "en fait", "bon", "alors", "bref", "quoi", "genre"],
+    "en": ["so", "well", "you know", "i mean", "basically", "like", "okay so"],
+}
+# Mots légitimement doublés ("nous nous sommes", "had had"), jamais réduits par collapse_repeats
+KEEP_DOUBLED = {
+    "fr": ["nous", "vous"],
+    "en": ["that", "had"],
+}
+# Mots de contenu qui doivent suivre un marqueur dans sa phrase pour qu'il soit retiré
+MIN_WORDS_AFTER_MARKER = 2
+MAX_REPEAT_NGRAM = 6
+# Un mot seul répété n'est réduit qu'à partir de ce nombre d'occurrences,
+# ou à 2 quand la première occurrence se termine par une ponctuation d'hésitation
+WORD_RUN_MIN = 3
+DISFLUENCY_ENDINGS = (",", "…", "...", "-")
+# Segments plus courts que ceci (en mots) fusionnés avec le précédent si l'écart est faible
+MIN_SEGMENT_WORDS = 8
+MAX_MERGE_GAP_SECONDS = 1.0
+MAX_MERGED_WORDS = 60
+
+
+@dataclass
+class CompactionReport:
+    tokens_before: int
+    tokens_after: int
+    segments_before: int
+    segments_after: int
+    fillers_removed: int
+    repeats_removed: int
+    loops_removed: int
+
+    @property
+    def saved_ratio(self) -> float:
+        if self.tokens_before == 0:
+            return 0.0
+        return 1 - self.tokens_after / self.tokens_before
+
+    def as_dict(self) -> dict:
+        return {
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "saved_percent": round(self.saved_ratio * 100, 1),
+            "segments_before": self.segments_before,
+            "segments_after": self.segments_after,
+            "fillers_removed": self.fillers_removed,
+            "repeats_removed": self.repeats_removed,
+            "loops_removed": self.loops_removed,
+        }
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def _word_pattern(words) -> str:
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+def _filler_patterns(language: str) -> Tuple[re.Pattern, re.Pattern, re.Pattern]:
+    fillers = FILLERS.get(language, FILLERS["en"])
+    markers = DISCOURSE_MARKERS.get(language, DISCOURSE_MARKERS["en"])
+    # Hésitation en début de texte ou après une ponctuation, suivie d'une ponctuation ou de la fin
+    filler = re.compile(
+        rf"(^|[,.!?;:…]\s*)(?:{_word_pattern(fillers)})(?!\w)\s*(?:[,.…]+\s*|(?=[!?;:]|$))",
+        re.IGNORECASE,
+    )
+    # Marqueur en début de texte, après une ponctuation forte, ou isolé entre deux virgules.
+    # Jamais devant "?" ou "!" : "Quoi ?", "Tu viens, quoi ?" portent le sens de la phrase
+    marker = re.compile(
+        rf"(^|[.!?;:]\s+|,\s*)(?:{_word_pattern(markers)})(?!\w)\s*(?:,\s*|(?=[.;:]))",
+        re.IGNORECASE,
+    )
+    # N'importe quelle hésitation ou marqueur, pour compter les mots qui portent du contenu
+    noise = re.compile(rf"(?<!\w)(?:{_word_pattern(fillers + markers)})(?!\w)", re.IGNORECASE)
+    return filler, marker, noise
+
+
+def _content_words(text: str, noise: re.Pattern) -> int:
+    return sum(1 for w in noise.sub(" ", text).split() if _normalize(w))
+
+
+# ----- Nettoyage d'un segment ----- #
+
+def remove_fillers(text: str, language: str = "fr") -> Tuple[str, int]:
+    """
+    Retire hésitations et marqueurs de discours vides. Renvoie (texte, nombre retiré).
+
+    Un segment qui ne contient que des hésitations ou des marqueurs ("Donc.",
+    "Well, well, well.") est laissé tel quel, et un marqueur n'est retiré que si
+    sa phrase continue avec au moins MIN_WORDS_AFTER_MARKER mots ("Bon, appétit." reste).
+    """
+    filler, marker, noise = _filler_patterns(language)
+    if not _content_words(text, noise):
+        return text.strip(), 0
+
+    removed = 0
+
+    def drop_marker(match: re.Match) -> str:
+        nonlocal removed
+        sentence = re.split(r"[.!?…]", match.string[match.end():], maxsplit=1)[0]
+        if _content_words(sentence, noise) < MIN_WORDS_AFTER_MARKER:
+            return match.group(0)
+        removed += 1
+        return match.group(1)
+
+    # Plusieurs hésitations ou marqueurs qui se suivent ("euh, donc, voilà, ...") : une passe par mot
+    while True:
+        before = removed
+        text, count = filler.subn(lambda m: m.group(1), text)
+        removed += count
+        text = marker.sub(drop_marker, text)
+        if removed == before:
+            break
+
+    # Ponctuation orpheline laissée par les suppressions
+    text = re.sub(r"\s+([,.])", r"\1", text)
+    text = re.sub(r"([,;:])(?:\s*[,;:])+", r"\1", text)
+    text = re.sub(r"[,;:]+\s*([.!?…])", r"\1", text)
+    text = re.sub(r"([.!?…])\s*\.", r"\1", text)
+    text = re.sub(r"^[\s,;:.?!]+", "", text)
+    text = re.sub(r"[\s,;:]+$", "", text)
+    return re.sub(r"\s{2,}", " ", text).strip(), removed
+
+
+def collapse_repeats(text: str, max_n: int = MAX_REPEAT_NGRAM, language: str = "fr") -> Tuple[str, int]:
+    """
+    Réduit les n-grammes répétés consécutivement ("on va on va voir" → "on va voir").
+
+    Un mot seul n'est réduit que s'il apparaît au moins WORD_RUN_MIN fois de suite
+    ("le le le") ou si la reprise suit une ponctuation ("le, le chat", "la- la") :
+    "C plus plus", "bye bye" sont conservés. Les nombres ("0 0") et les mots de
+    KEEP_DOUBLED ("nous nous") ne sont jamais réduits.
+    Renvoie (texte, nombre de mots retirés).
+    """
+    keep = set(KEEP_DOUBLED.get(language, []))
+    words = text.split()
+    normalized = [_normalize(w) for w in words]
+    removed = 0
+    n = max_n
+    while n >= 2:
+        i = 0
+        changed = False
+        while i + 2 * n <= len(words):
+            ngram = normalized[i:i + n]
+            legitimate = all(w.isdigit() or w in keep for w in ngram)
+            if ngram == normalized[i + n:i + 2 * n] and any(ngram) and not legitimate:
+                # Conserve la 2e occurrence (porte la ponctuation de fin éventuelle)
+                del words[i:i + n]
+                del normalized[i:i + n]
+                removed += n
+                changed = True
+            else:
+                i += 1
+        if not changed:
+            n -= 1
+
+    i = 0
+    while i < len(words):
+        word = normalized[i]
+        run = 1
+        while i + run < len(words) and normalized[i + run] == word:
+            run += 1
+        legitimate = not word or word.isdigit() or word in keep
+        if not legitimate and run >= WORD_RUN_MIN:
+            drop = run - 1
+        elif not legitimate and run == 2 and words[i].endswith(DISFLUENCY_ENDINGS):
+            drop = 1
+        else:
+            drop = 0
+        # Conserve la dernière occurrence
+        del words[i:i + drop]
+        del normalized[i:i + drop]
+        removed += drop
+        i += 1
+    return " ".join(words), removed
+
+
+# ----- Passe complète ----- #
+
+def compact_segments(segments: List[dict], language: str = "fr") -> Tuple[List[dict], CompactionReport]:
+    """Compacte une liste de segments Whisper (start, end, text)."""
+    tokens_before = sum(estimate_tokens(s.get("text", "")) for s in segments)
+    fillers_removed = repeats_removed = loops_removed = 0
+
+    cleaned: List[dict] = []
+    previous_key = None
+    for segment in segments:
+        text, count = remove_fillers(segment.get("text", ""), language)
+        fillers_removed += count
+        text, count = collapse_repeats(text, language=language)
+        repeats_removed += count
+        if not text or not any(_normalize(w) for w in text.split()):
+            continue
+
+        # Boucle de répétition : même contenu que le segment précédent
+        key = " ".join(_normalize(w) for w in text.split())
+        if key == previous_key:
+            loops_removed += 1
+            continue
+        previous_key = key
+
+        cleaned.append({"start": segment.get("start", 0.0), "end": segment.get("end", 0.0), "text": text})
+
+    merged: List[dict] = []
+    for segment in cleaned:
+        if merged:
+            last = merged[-1]
+            short = len(segment["text"].split()) < MIN_SEGMENT_WORDS or len(last["text"].split()) < MIN_SEGMENT_WORDS
+            close = segment["start"] - last["end"] <= MAX_MERGE_GAP_SECONDS
+            fits = len(last["text"].split()) + len(segment["text"].split()) <= MAX_MERGED_WORDS
+            if short and close and fits:
+                last["text"] = f"{last['text']} {segment['text']}"
+                last["end"] = segment["end"]
+                continue
+        merged.append(dict(segment))
+
+    # Les répétitions peuvent chevaucher deux segments fusionnés
+    for segment in merged:
+        segment["text"], count = collapse_repeats(segment["text"], language=language)
+        repeats_removed += count
+
+    for index, segment in enumerate(merged):
+        segment["id"] = index
+
+    report = CompactionReport(
+        tokens_before=tokens_before,
+        tokens_after=sum(estimate_tokens(s["text"]) for s in merged),
+        segments_before=len(segments),
+        segments_after=len(merged),
+        fillers_removed=fillers_removed,
+        repeats_removed=repeats_removed,
+        loops_removed=loops_removed,
+    )
+    return merged, report
+
+
+def compact_transcript(result: dict) -> Tuple[dict, CompactionReport]:
+    """
+    Compacte un résultat de transcription (text, segments, language).
+
+    Le résultat d'origine n'est pas modifié (il reste tel quel dans le cache).
+    """
+    language = result.get("language") or "fr"
+    segments = result.get("segments") or [{"start": 0.0, "end": 0.0, "text": result.get("text", "")}]
+    compacted, report = compact_segments(segments, language)
+    logger.info(
+        f"Compaction: {report.tokens_before} → {report.tokens_after} tokens "
+        f"(-{report.saved_ratio * 100:.1f}%), {report.segments_before} → {report.segments_after} segments"
+    )
+    return {
+        "text": " ".join(s["text"] for s in compacted),
+        "segments": compacted,
+        "language": result.get("language"),
+    }, report
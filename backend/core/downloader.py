@@ -1,12 +1,275 @@
+import json
 import os
+import subprocess
+import sys
+import time
+from typing import Generator
+from urllib.parse import parse_qs, urlparse
+
 import yt_dlp
 from logger import setup_logger
-from config import temp_folder
+from metrics import STAGE_SECONDS
+from tracing import span, traced
+from core.media_cache import media_cache, resolve_media_id, format_metadata
+from core.captions import select_caption_track
+from config import temp_folder, media_cache_enabled, fragment_concurrency
 
 logger = setup_logger(__name__)
 
+VIDEO_FORMAT = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
+# Plus petit flux audio seul encore exploitable pour la parole (Whisper travaille en
+# 16 kHz mono), sans fusion ni ré-encodage ; à défaut le meilleur flux disponible
+AUDIO_FORMAT = "worstaudio[abr>=?48][vcodec=none]/bestaudio[vcodec=none]/bestaudio/best"
+# Options communes : une URL de vidéo dans une playlist ne désigne que la vidéo
+# (les playlists passent par expand_playlist)
+BASE_OPTS = {"quiet": True, "no_warnings": True, "noplaylist": True}
+# Extracteurs yt-dlp dont les URLs désignent une liste de vidéos
+PLAYLIST_EXTRACTOR_HINTS = ("playlist", "tab", "channel", "user", "album", "series", "course", "collection")
+
+
+def _cache_id(url: str):
+    """(extracteur, id) si le cache des médias est actif et reconnaît l'URL."""
+    if not media_cache_enabled:
+        return None
+    try:
+        return resolve_media_id(url)
+    except Exception as e:
+        logger.error(f"Could not resolve media id for {url}: {e}")
+        return None
+
+
+def is_playlist_url(url: str) -> bool:
+    """
+    Reconnaît sans accès réseau une URL de playlist, chaîne, album... d'après son extracteur.
+
+    Une URL qui désigne une vidéo dans une playlist (watch?v=X&list=Y) reste
+    une vidéo seule. Parcourt tous les extracteurs : à appeler hors de l'event loop.
+    """
+    if parse_qs(urlparse(url).query).get("v"):
+        return False
+    for extractor in yt_dlp.extractor.gen_extractor_classes():
+        if extractor.suitable(url):
+            key = extractor.ie_key().lower()
+            return key != "generic" and any(hint in key for hint in PLAYLIST_EXTRACTOR_HINTS)
+    return False
+
 
-def download_video(url: str, output_path: str = None, progress_callback=None) -> dict:
+@traced("download.expand_playlist", "download")
+def expand_playlist(url: str) -> dict:
+    """
+    Liste les vidéos d'une playlist sans les extraire une à une (extract_flat).
+
+    Les onglets d'une chaîne (Vidéos, Lives...) sont eux-mêmes développés.
+
+    Returns:
+        dict avec title et entries [{url, title, duration}] (vide si l'URL n'est
+        finalement pas une playlist)
+    """
+    # noplaylist : une vidéo désignée dans une playlist n'est jamais développée
+    opts = {**BASE_OPTS, "extract_flat": "in_playlist"}
+    try:
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            if info.get("_type") not in ("playlist", "multi_video"):
+                return {"title": info.get("title", "unknown"), "entries": []}
+
+            entries = []
+            for entry in info.get("entries") or []:
+                if not entry:
+                    continue
+                entry_url = entry.get("url") or entry.get("webpage_url")
+                if entry.get("ie_key") == info.get("extractor_key"):
+                    # Onglet de chaîne : un niveau de plus
+                    tab = ydl.extract_info(entry_url, download=False)
+                    entries += [
+                        {"url": e.get("url") or e.get("webpage_url"), "title": e.get("title"), "duration": e.get("duration")}
+                        for e in tab.get("entries") or []
+                        if e
+                    ]
+                    continue
+                entries.append({"url": entry_url, "title": entry.get("title"), "duration": entry.get("duration")})
+    except yt_dlp.utils.DownloadError as e:
+        logger.error(f"Playlist expansion error: {e}")
+        raise ValueError(f"Playlist inaccessible: {e}")
+
+    entries = [entry for entry in entries if entry["url"]]
+    logger.info(f"Playlist {info.get('title')}: {len(entries)} entries")
+    return {"title": info.get("title", "playlist"), "entries": entries}
+
+
+@traced("download.probe", "download")
+def probe_url(url: str, audio_only: bool = False) -> dict:
+    """
+    Récupère les métadonnées d'une URL sans rien télécharger.
+
+    Le cache des médias est consulté d'abord ; sinon, c'est la seule extraction
+    yt-dlp du job : son résultat (`info`) est transmis à fetch_captions,
+    download_video et stream_download.
+
+    Args:
+        audio_only: Sélectionner le flux audio seul (son extension est renvoyée)
+
+    Returns:
+        dict avec title, duration, ext, cached (média déjà présent dans le cache)
+        et info (résultat de extract_info, None pour un média en cache)
+    """
+    media_id = _cache_id(url)
+    if media_id:
+        entry = media_cache.lookup_any(*media_id)
+        if entry is not None:
+            return {
+                "title": entry["title"],
+                "duration": entry["duration"],
+                "ext": entry.get("format", {}).get("ext"),
+                "cached": True,
+                "info": None,
+            }
+
+    ydl_opts = dict(BASE_OPTS)
+    if audio_only:
+        ydl_opts["format"] = AUDIO_FORMAT
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+    except yt_dlp.utils.DownloadError as e:
+        logger.error(f"Probe error: {e}")
+        raise ValueError(f"URL inaccessible: {e}")
+
+    return {
+        "title": info.get("title", "unknown"),
+        "duration": info.get("duration", 0),
+        "ext": info.get("ext"),
+        "cached": False,
+        "info": info,
+    }
+
+
+@traced("download.captions", "download")
+def fetch_captions(url: str, languages: list, info: dict = None) -> dict:
+    """
+    Cherche une piste de sous-titres (VTT/SRT) sans télécharger la vidéo.
+
+    Args:
+        languages: Langues acceptées par ordre de préférence (voir select_caption_track)
+        info: Résultat de probe_url()["info"] ; sans lui, l'URL est extraite ici
+
+    Returns:
+        dict avec title, duration et, si une piste convient, caption
+        {language, source, ext, content} (None sinon)
+    """
+    try:
+        with yt_dlp.YoutubeDL(BASE_OPTS) as ydl:
+            if info is None:
+                info = ydl.extract_info(url, download=False)
+            track = select_caption_track(info, languages)
+            content = None
+            if track is not None:
+                try:
+                    content = ydl.urlopen(track["url"]).read().decode("utf-8", errors="replace")
+                except Exception as e:
+                    # Piste inaccessible : Whisper prendra le relais
+                    logger.error(f"Unable to fetch captions: {e}")
+                    track = None
+    except yt_dlp.utils.DownloadError as e:
+        logger.error(f"Captions lookup error: {e}")
+        raise ValueError(f"URL inaccessible: {e}")
+
+    caption = None
+    if track is not None:
+        logger.info(f"Found {track['source']} captions ({track['language']}, {track['ext']}) for {url}")
+        caption = {
+            "language": track["language"],
+            "source": track["source"],
+            "ext": track["ext"],
+            "content": content,
+        }
+    return {
+        "title": info.get("title", "unknown"),
+        "duration": info.get("duration", 0),
+        "caption": caption,
+    }
+
+
+def safe_name(title: str) -> str:
+    """Nom de fichier ou de dossier sûr dérivé d'un titre, comme celui choisi par yt-dlp."""
+    return yt_dlp.utils.sanitize_filename(title)
+
+
+def media_filename(title: str, ext: str = None) -> str:
+    return f"{safe_name(title)}.{ext or 'audio'}"
+
+
+def stream_download(
+    url: str, file_path: str, metadata: dict, info: dict = None, chunk_bytes: int = 1 << 16
+) -> Generator[bytes, None, None]:
+    """
+    Télécharge le flux audio seul en renvoyant les octets au fil de l'eau.
+
+    yt-dlp écrit sur sa sortie standard (`-o -`) : les octets sont recopiés
+    dans `file_path` et transmis à l'appelant (typiquement l'entrée de ffmpeg),
+    ce qui permet de décoder et transcrire pendant le téléchargement. Une fois
+    le flux complet, le fichier rejoint le cache des médias.
+
+    Args:
+        metadata: title, duration... conservés avec l'entrée du cache
+        info: Résultat de probe_url()["info"], repris par yt-dlp (--load-info-json)
+            au lieu d'extraire l'URL une seconde fois
+
+    Yields:
+        bytes: Blocs d'au plus `chunk_bytes` octets
+    """
+    if info is not None:
+        info_path = f"{file_path}.info.json"
+        with open(info_path, "w", encoding="utf-8") as f:
+            json.dump(yt_dlp.YoutubeDL.sanitize_info(info, True), f)
+        source = ["--load-info-json", info_path]
+    else:
+        source = [url]
+    cmd = [
+        sys.executable, "-m", "yt_dlp",
+        "--quiet", "--no-warnings", "--no-part", "--no-playlist",
+        "--concurrent-fragments", str(fragment_concurrency),
+        "-f", AUDIO_FORMAT,
+        "-o", "-",
+        *source,
+    ]
+    logger.info(f"Streaming audio download from {url}")
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    completed = False
+    try:
+        with open(file_path, "wb") as f:
+            while True:
+                chunk = process.stdout.read(chunk_bytes)
+                if not chunk:
+                    break
+                f.write(chunk)
+                yield chunk
+        completed = True
+    finally:
+        if not completed:
+            process.kill()
+        process.stdout.close()
+        stderr = process.stderr.read().decode(errors="replace").strip()
+        process.stderr.close()
+        returncode = process.wait()
+
+    if returncode != 0:
+        logger.error(f"Download error: {stderr}")
+        raise ValueError(f"Impossible de télécharger la vidéo: {stderr}")
+
+    # Inclut l'attente du consommateur (décodage) : le flux avance à son rythme
+    STAGE_SECONDS.labels("download").observe(time.perf_counter() - start)
+    logger.info(f"Audio downloaded: {file_path} ({os.path.getsize(file_path) / 1e6:.1f} MB)")
+    media_id = _cache_id(url)
+    if media_id:
+        media_cache.store(*media_id, True, file_path, metadata)
+
+
+@traced("download.download_video", "download")
+def download_video(
+    url: str, output_path: str = None, progress_callback=None, audio_only: bool = False, info: dict = None
+) -> dict:
     """
     Télécharge une vidéo depuis une URL en utilisant yt-dlp.
 
@@ -14,15 +277,37 @@ def download_video(url: str, output_path: str = None, progress_callback=None) ->
         url: URL de la vidéo (YouTube, etc.)
         output_path: Dossier de destination (défaut: temp_folder)
         progress_callback: Callback appelé avec (percent, speed) à chaque update
+        audio_only: Ne télécharger que le plus petit flux audio adéquat (pas de
+            vidéo, pas de fusion) pour les jobs qui ne font que transcrire
+        info: Résultat de probe_url()["info"] : téléchargement sans nouvelle extraction
 
     Returns:
-        dict avec file_path, title, duration
+        dict avec file_path, title, duration, cached
     """
     if output_path is None:
         output_path = temp_folder
 
     os.makedirs(output_path, exist_ok=True)
 
+    # Cache des médias consulté avant tout accès réseau
+    media_id = _cache_id(url)
+    if media_id:
+        entry = media_cache.lookup(*media_id, audio_only)
+        if entry is not None:
+            try:
+                filename = media_cache.materialize(entry, output_path)
+            except OSError as e:
+                logger.error(f"Could not reuse cached media, downloading again: {e}")
+            else:
+                if progress_callback:
+                    progress_callback(100, None)
+                return {
+                    "file_path": filename,
+                    "title": entry["title"],
+                    "duration": entry["duration"],
+                    "cached": True,
+                }
+
     outtmpl = os.path.join(output_path, "%(title)s.%(ext)s")
 
     def _progress_hook(d):
@@ -41,34 +326,52 @@ def download_video(url: str, output_path: str = None, progress_callback=None) ->
             progress_callback(100, None)
 
     ydl_opts = {
-        "format": "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
+        **BASE_OPTS,
+        "format": AUDIO_FORMAT if audio_only else VIDEO_FORMAT,
         "outtmpl": outtmpl,
-        "merge_output_format": "mp4",
-        "quiet": True,
-        "no_warnings": True,
+        # Fragments DASH/HLS téléchargés en parallèle à l'intérieur de la vidéo
+        "concurrent_fragment_downloads": fragment_concurrency,
         "progress_hooks": [_progress_hook],
     }
+    if not audio_only:
+        ydl_opts["merge_output_format"] = "mp4"
 
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            logger.info(f"Downloading video from {url}")
-            info = ydl.extract_info(url, download=True)
+            logger.info(f"Downloading {'audio' if audio_only else 'video'} from {url}")
+            with span("download.fetch", "download", audio_only=audio_only):
+                with STAGE_SECONDS.labels("download").time():
+                    if info is not None:
+                        # Même traitement que --load-info-json : formats re-sélectionnés, puis téléchargés
+                        info = ydl.process_ie_result(ydl.sanitize_info(info, True), download=True)
+                    else:
+                        info = ydl.extract_info(url, download=True)
 
             title = info.get("title", "unknown")
             duration = info.get("duration", 0)
             filename = ydl.prepare_filename(info)
 
-            # Ensure .mp4 extension
-            if not filename.endswith(".mp4"):
+            if audio_only:
+                # Flux téléchargé tel quel : son extension réelle (m4a, webm, opus...)
+                downloads = info.get("requested_downloads") or []
+                if downloads and downloads[0].get("filepath"):
+                    filename = downloads[0]["filepath"]
+            elif not filename.endswith(".mp4"):
+                # Ensure .mp4 extension
                 base = os.path.splitext(filename)[0]
                 filename = base + ".mp4"
 
-            logger.info(f"Video downloaded: {filename} ({duration}s)")
+            logger.info(f"{'Audio' if audio_only else 'Video'} downloaded: {filename} ({duration}s)")
+
+            # Une playlist n'est pas un média : rien à mettre en cache
+            if media_id and info.get("_type", "video") == "video" and os.path.exists(filename):
+                media_cache.store(*media_id, audio_only, filename, format_metadata(info))
 
             return {
                 "file_path": filename,
                 "title": title,
                 "duration": duration,
+                "cached": False,
             }
 
     except yt_dlp.utils.DownloadError as e:
@@ -0,0 +1,49 @@
+"""
+Exports de la transcription brute (sans passage par le LLM).
+
+Usage:
+    from core.exports import TRANSCRIPT_EXPORTS
+
+    extension, render = TRANSCRIPT_EXPORTS["transcript_srt"]
+    content = render(transcription_result["segments"])
+"""
+
+from typing import Callable, Dict, List, Tuple
+
+
+def _timestamp(seconds: float, separator: str) -> str:
+    milliseconds = int(round(max(seconds, 0.0) * 1000))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{milliseconds:03d}"
+
+
+def format_srt(segments: List[dict]) -> str:
+    blocks = []
+    for index, segment in enumerate(segments, start=1):
+        start = _timestamp(float(segment["start"]), ",")
+        end = _timestamp(float(segment["end"]), ",")
+        blocks.append(f"{index}\n{start} --> {end}\n{segment['text'].strip()}\n")
+    return "\n".join(blocks)
+
+
+def format_vtt(segments: List[dict]) -> str:
+    blocks = ["WEBVTT\n"]
+    for segment in segments:
+        start = _timestamp(float(segment["start"]), ".")
+        end = _timestamp(float(segment["end"]), ".")
+        blocks.append(f"{start} --> {end}\n{segment['text'].strip()}\n")
+    return "\n".join(blocks)
+
+
+def format_txt(segments: List[dict]) -> str:
+    return "\n".join(segment["text"].strip() for segment in segments) + "\n"
+
+
+# Sortie → (extension du fichier, rendu à partir des segments)
+TRANSCRIPT_EXPORTS: Dict[str, Tuple[str, Callable[[List[dict]], str]]] = {
+    "transcript_srt": ("srt", format_srt),
+    "transcript_vtt": ("vtt", format_vtt),
+    "transcript_txt": ("txt", format_txt),
+}
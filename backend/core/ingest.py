@@ -0,0 +1,147 @@
+"""
+Décodage audio en streaming via un pipe ffmpeg.
+
+La source (audio ou vidéo) est décodée une seule fois, convertie en mono
+16 kHz float32 (format attendu par Whisper) et lue par blocs de taille fixe :
+la mémoire consommée ne dépend pas de la durée du fichier.
+
+La source peut aussi être un flux d'octets (téléchargement en cours) :
+ffmpeg le lit sur son entrée standard et décode au fur et à mesure.
+
+Usage:
+    from core.ingest import stream_audio, SAMPLE_RATE
+
+    for block in stream_audio("cours.mp4"):
+        ...  # np.ndarray float32, mono, 16 kHz
+
+    for block in stream_audio(source=chunks):   # chunks: itérable de bytes
+        ...
+"""
+
+import json
+import subprocess
+import threading
+from typing import Generator, Iterable, Optional
+
+import numpy as np
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SAMPLE_RATE = 16000
+BLOCK_SECONDS = 30
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """
+    Récupère la durée d'un fichier média via ffprobe, sans le décoder.
+
+    Returns:
+        float or None: Durée en secondes, ou None si ffprobe échoue
+    """
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "json",
+        path,
+    ]
+    try:
+        output = subprocess.run(cmd, capture_output=True, check=True).stdout
+        return float(json.loads(output)["format"]["duration"])
+    except Exception as e:
+        logger.error(f"Unable to probe duration of {path}: {e}")
+        return None
+
+
+def stream_audio(
+    path: str = "pipe:0",
+    sample_rate: int = SAMPLE_RATE,
+    block_seconds: float = BLOCK_SECONDS,
+    source: Optional[Iterable[bytes]] = None,
+) -> Generator[np.ndarray, None, None]:
+    """
+    Décode un fichier média en blocs mono float32 rééchantillonnés.
+
+    ffmpeg se charge du downmix et du rééchantillonnage en sortie de décodeur,
+    on ne lit donc jamais l'audio à sa fréquence d'origine.
+
+    Args:
+        path: Chemin du fichier audio/vidéo
+        sample_rate: Fréquence d'échantillonnage de sortie
+        block_seconds: Durée de chaque bloc renvoyé
+        source: Octets du média, écrits sur l'entrée de ffmpeg par un thread dédié
+            (au lieu de lire `path`)
+
+    Yields:
+        np.ndarray: Bloc float32 de `block_seconds` secondes (le dernier peut être plus court)
+    """
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-v", "error",
+        "-i", path,
+        "-vn",
+        "-ac", "1",
+        "-ar", str(sample_rate),
+        "-f", "f32le",
+        "-",
+    ]
+    block_bytes = int(sample_rate * block_seconds) * 4
+
+    logger.info(f"Streaming decode of {path} at {sample_rate} Hz mono")
+    process = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if source is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    feed_error = []
+
+    def feed() -> None:
+        try:
+            for chunk in source:
+                process.stdin.write(chunk)
+        except BrokenPipeError:
+            pass
+        except Exception as e:
+            feed_error.append(e)
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            # Lecture interrompue (ffmpeg arrêté) : libérer aussi la source (ex: processus yt-dlp)
+            close = getattr(source, "close", None)
+            if close:
+                close()
+
+    feeder = None
+    if source is not None:
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            usable = len(data) - len(data) % 4
+            yield np.frombuffer(data[:usable], dtype=np.float32)
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read().decode(errors="replace").strip()
+        process.stderr.close()
+        returncode = process.wait()
+        if feeder is not None:
+            feeder.join()
+
+    if feed_error:
+        raise feed_error[0]
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode {path}: {stderr}")
+
+
+def float_to_pcm16(block: np.ndarray) -> np.ndarray:
+    """Convertit un bloc float32 [-1, 1] en PCM 16 bits signé."""
+    return np.clip(block * 32768.0, -32768, 32767).astype(np.int16)
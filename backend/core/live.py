@@ -0,0 +1,223 @@
+"""
+Transcription au fil du téléchargement.
+
+Quand l'action est connue dès l'envoi de l'URL, inutile d'attendre la fin du
+téléchargement : les blocs décodés par ffmpeg à partir du flux yt-dlp (voir
+core.downloader.stream_download et core.ingest.stream_audio) sont accumulés,
+et dès qu'une fenêtre d'environ `window_seconds` est disponible elle est
+coupée sur un silence puis transcrite pendant que le téléchargement continue.
+À la fin du téléchargement, il ne reste que la dernière fenêtre à transcrire.
+
+L'audio complet n'étant jamais disponible, la normalisation et la VAD sont
+appliquées fenêtre par fenêtre ; le découpage et le recollage sont ceux de
+la transcription par fenêtres (core.chunked). Seul l'audio pas encore
+transcrit reste en mémoire : au-delà de MAX_WINDOWS_AHEAD fenêtres d'avance,
+le décodage attend la transcription, et ffmpeg puis yt-dlp avec lui.
+
+Usage:
+    from core.live import LiveTranscription
+
+    live = LiveTranscription(segment_callback=on_segment)
+    threading.Thread(target=live.decode, args=(stream_audio(source=chunks),)).start()
+    while (window := live.next_window()) is not None:
+        live.transcribe(*window)
+    result = live.result()
+"""
+
+import math
+import queue
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+from logger import setup_logger
+from core.chunked import CUT_SEARCH_SECONDS, Window, plan_windows, stitch_windows
+from core.ingest import BLOCK_SECONDS, SAMPLE_RATE, float_to_pcm16
+from core.normalize import BlockNormalizer
+from core.transcriber import get_transcriber
+from core.vad import SpeechTimeline, detect_speech
+from tracing import traced
+from config import (
+    live_window_seconds,
+    chunk_overlap_seconds,
+    normalization_mode,
+    normalization_target_dbfs,
+    vad_enabled,
+    vad_min_silence_ms,
+)
+
+logger = setup_logger(__name__)
+
+# Marqueur de fin du flux décodé dans la file des blocs
+_END = None
+# Audio décodé d'avance, en fenêtres, avant que le décodage n'attende la transcription
+MAX_WINDOWS_AHEAD = 2
+
+
+class LiveTranscription:
+    """Découpe et transcrit un flux audio décodé au fur et à mesure de son arrivée."""
+
+    def __init__(
+        self,
+        window_seconds: float = live_window_seconds,
+        overlap_seconds: float = chunk_overlap_seconds,
+        decode_callback: Optional[Callable[[float], None]] = None,
+        progress_callback: Optional[Callable[[float], None]] = None,
+        segment_callback: Optional[Callable[[dict], None]] = None,
+    ) -> None:
+        self.window_seconds = window_seconds
+        self.window_frames = int(window_seconds * SAMPLE_RATE)
+        self.overlap_frames = int(overlap_seconds * SAMPLE_RATE)
+        # Une fenêtre n'est coupée que lorsque toute la zone de recherche du silence est arrivée
+        self.ready_frames = self.window_frames + int(CUT_SEARCH_SECONDS * SAMPLE_RATE)
+        self.decode_callback = decode_callback
+        self.progress_callback = progress_callback
+        self.segment_callback = segment_callback
+
+        self.decoded_frames = 0
+        # Temps passé à transcrire (hors attente du flux), pour le facteur temps réel
+        self.transcription_seconds = 0.0
+        self.language: Optional[str] = None
+        self.windows: List[Window] = []
+        self.results: List[dict] = []
+
+        max_blocks = max(2, math.ceil(MAX_WINDOWS_AHEAD * window_seconds / BLOCK_SECONDS))
+        self._blocks: "queue.Queue" = queue.Queue(maxsize=max_blocks)
+        self._buffer = np.zeros(0, dtype=np.int16)
+        self._buffer_start = 0  # Position (échantillons) du début du buffer sur la timeline
+        self._next_cut = 0
+        self._ended = False
+        self.stopped = False
+        self._emitted = 0
+
+    @property
+    def duration(self) -> float:
+        return self.decoded_frames / SAMPLE_RATE
+
+    # ----- Décodage (thread producteur) ----- #
+
+    @traced("live.decode")
+    def decode(self, blocks: Iterable[np.ndarray]) -> None:
+        """Consomme les blocs float32 décodés ; les erreurs sont relayées à next_window()."""
+        try:
+            for block in blocks:
+                if self.stopped:
+                    break
+                pcm = float_to_pcm16(block)
+                self.decoded_frames += len(pcm)
+                self._put(pcm)
+                if self.decode_callback:
+                    self.decode_callback(self.duration)
+        except Exception as e:
+            self._put(e)
+        finally:
+            self._put(_END)
+
+    def _put(self, item) -> None:
+        """Attend une place dans la file des blocs, sauf si plus personne ne la vide (stop)."""
+        while not self.stopped:
+            try:
+                self._blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def stop(self) -> None:
+        """Interrompt le décodage (et donc le téléchargement) au prochain bloc."""
+        self.stopped = True
+
+    # ----- Découpage ----- #
+
+    def next_window(self) -> Optional[Tuple[Window, np.ndarray]]:
+        """
+        Attend qu'une fenêtre complète soit décodée et la renvoie avec son audio PCM.
+
+        Returns:
+            (Window, audio PCM 16 bits) sur la timeline du flux, ou None une fois
+            tout le flux transcrit
+        """
+        while not self._ended and self._buffered() < self.ready_frames:
+            item = self._blocks.get()
+            if item is _END:
+                self._ended = True
+            elif isinstance(item, Exception):
+                self._ended = True
+                raise item
+            else:
+                self._buffer = np.concatenate([self._buffer, item])
+
+        buffer_end = self._buffer_start + len(self._buffer)
+        if buffer_end <= self._next_cut:
+            return None
+
+        if self._ended and self._buffered() <= self.ready_frames:
+            end = buffer_end
+        else:
+            pending = self._buffer[self._next_cut - self._buffer_start:].astype(np.float32) / 32768.0
+            end = self._next_cut + plan_windows(pending, SAMPLE_RATE, self.window_seconds, 0)[0].end
+
+        start = max(0, self._next_cut - self.overlap_frames) if self._next_cut else 0
+        window = Window(start, end, self._next_cut)
+        audio = self._buffer[start - self._buffer_start:end - self._buffer_start].copy()
+
+        # Seul le recouvrement de la fenêtre suivante est gardé
+        keep_from = max(self._buffer_start, end - self.overlap_frames)
+        self._buffer = self._buffer[keep_from - self._buffer_start:]
+        self._buffer_start = keep_from
+        self._next_cut = end
+        return window, audio
+
+    def _buffered(self) -> int:
+        """Échantillons décodés pas encore attribués à une fenêtre."""
+        return self._buffer_start + len(self._buffer) - self._next_cut
+
+    # ----- Transcription ----- #
+
+    @traced("live.transcribe_window")
+    def transcribe(self, window: Window, audio: np.ndarray) -> None:
+        """Normalise, filtre (VAD) et transcrit une fenêtre, puis émet les segments recollés."""
+        start = time.perf_counter()
+        normalizer = BlockNormalizer(mode=normalization_mode, target_dbfs=normalization_target_dbfs)
+        normalizer.observe(audio)
+        samples = normalizer.apply_float(audio)
+
+        timeline = None
+        if vad_enabled:
+            regions = detect_speech(samples, SAMPLE_RATE, min_silence_ms=vad_min_silence_ms)
+            timeline = SpeechTimeline(regions, len(samples), SAMPLE_RATE)
+            samples = timeline.condense(samples)
+
+        if len(samples):
+            # La première fenêtre fixe la langue, imposée ensuite aux suivantes
+            result = get_transcriber().transcribe(samples, self.language)
+            if timeline is not None:
+                result = timeline.remap_result(result)
+            self.language = self.language or result.get("language")
+        else:
+            result = {"text": "", "segments": [], "language": self.language}
+
+        self.windows.append(window)
+        self.results.append(result)
+        self.transcription_seconds += time.perf_counter() - start
+        logger.info(
+            f"Live window {len(self.windows)} transcribed "
+            f"({window.cut / SAMPLE_RATE:.0f}s → {window.end / SAMPLE_RATE:.0f}s)"
+        )
+
+        if self.segment_callback:
+            segments = stitch_windows(self.windows, self.results)
+            for segment in segments[self._emitted:]:
+                self.segment_callback(dict(segment))
+            self._emitted = len(segments)
+        if self.progress_callback:
+            self.progress_callback(window.end / SAMPLE_RATE)
+
+    def result(self) -> dict:
+        """Résultat complet, même structure que MediaProcessor.transcribe_audio()."""
+        segments = stitch_windows(self.windows, self.results)
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": self.language,
+            "duration": self.duration,
+        }
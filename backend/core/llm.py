@@ -1,8 +1,26 @@
 import os
+import asyncio
+import hashlib
 import logging
-from litellm import completion
+import threading
+import time
+import httpx
+import litellm
+from litellm import completion, acompletion
 from dotenv import load_dotenv
-from typing import Generator
+from typing import AsyncGenerator, Generator, Optional
+from core.cache import DiskCache, make_key
+from metrics import LLM_FIRST_TOKEN_SECONDS, LLM_SECONDS, LLM_TOKENS, LLM_TOKENS_PER_SECOND
+from tracing import span
+from config import (
+    cache_folder,
+    llm_timeout,
+    llm_idle_timeout,
+    llm_max_connections,
+    llm_cache_enabled,
+    llm_cache_ttl_hours,
+    llm_cache_max_mb,
+)
 
 load_dotenv()
 
@@ -103,3 +121,186 @@ def generate(provider: str, model_name: str, prompt: str):
 
     except Exception as e:
         logging.error(f"Error while trying to connect to llm : {e}")
+
+
+# ----- Async streaming ----- #
+
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Shared async HTTP client (connection pool reused across generations).
+    Registered as litellm's async session so every provider call goes through it.
+
+    Building it loads the SSL context (~100 ms): call it from a worker thread,
+    not from the event loop (see _astream_completion).
+    """
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None or _http_client.is_closed:
+            _http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(llm_timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=llm_max_connections,
+                    max_keepalive_connections=llm_max_connections,
+                ),
+            )
+            litellm.aclient_session = _http_client
+        return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (called on application shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        litellm.aclient_session = None
+
+
+def _provider_kwargs(provider: str) -> dict:
+    """Provider-specific litellm arguments (API key or local endpoint)."""
+    if provider == "ollama":
+        return {"api_base": "http://localhost:11434"}
+    return {"api_key": os.getenv(f"{provider.upper()}_API_KEY")}
+
+
+# ----- Response cache ----- #
+
+# Size of the pieces a cached response is replayed in
+REPLAY_CHUNK_CHARS = 16
+
+llm_cache = DiskCache(
+    os.path.join(cache_folder, "llm_responses"),
+    llm_cache_max_mb * 1024 * 1024,
+    ttl_seconds=llm_cache_ttl_hours * 3600,
+)
+
+
+def response_cache_key(provider: str, model_name: str, prompt: str, params: dict) -> str:
+    """Cache key: provider, model, prompt hash and sampling parameters."""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return make_key(provider, model_name, prompt_hash, params)
+
+
+async def _replay(content: str) -> AsyncGenerator[str, None]:
+    """Replay a cached response as a fast token stream (same client behaviour as a live one)."""
+    for start in range(0, len(content), REPLAY_CHUNK_CHARS):
+        yield content[start:start + REPLAY_CHUNK_CHARS]
+        await asyncio.sleep(0)
+
+
+async def agenerate_stream(
+    provider: str,
+    model_name: str,
+    prompt: str,
+    timeout: float = llm_timeout,
+    idle_timeout: float = llm_idle_timeout,
+    use_cache: bool = llm_cache_enabled,
+    **kwargs,
+) -> AsyncGenerator[str, None]:
+    """
+    Generate content with native async streaming (litellm acompletion).
+
+    Network reads never block the event loop. `timeout` is handed to litellm
+    as a per-request timeout (connection and each network read), not a bound
+    on the whole generation: only `idle_timeout`, enforced here with
+    asyncio.wait_for, limits the time between two chunks, so a long
+    generation runs as long as chunks keep arriving. Cancelling the consuming
+    task (or closing the generator) closes the upstream stream.
+
+    With `use_cache`, complete responses are stored in llm_cache (keyed on
+    provider, model, prompt hash and sampling kwargs) and replayed on a hit.
+
+    Raises:
+        TimeoutError: No chunk received within `idle_timeout`
+    """
+    if not use_cache:
+        async for token in _astream_completion(provider, model_name, prompt, timeout, idle_timeout, **kwargs):
+            yield token
+        return
+
+    key = response_cache_key(provider, model_name, prompt, kwargs)
+    with span("llm.cache_lookup", "llm"):
+        cached = await asyncio.to_thread(llm_cache.get, key)
+    if cached is not None:
+        logging.info(f"LLM cache hit for {provider}/{model_name}")
+        with span("llm.replay", "llm", chars=len(cached["content"])):
+            async for token in _replay(cached["content"]):
+                yield token
+        return
+
+    tokens = []
+    async for token in _astream_completion(provider, model_name, prompt, timeout, idle_timeout, **kwargs):
+        tokens.append(token)
+        yield token
+
+    # Only reached when the stream completed (not on error or cancellation)
+    await asyncio.to_thread(
+        llm_cache.set, key, {"provider": provider, "model": model_name, "content": "".join(tokens)}
+    )
+
+
+async def _astream_completion(
+    provider: str, model_name: str, prompt: str, timeout: float, idle_timeout: float, **kwargs
+) -> AsyncGenerator[str, None]:
+    if _http_client is None or _http_client.is_closed:
+        await asyncio.to_thread(get_http_client)
+    start = time.perf_counter()
+    first_token_at = None
+    tokens = 0
+    with span("llm.request", "llm", provider=provider, model=model_name):
+        response = await acompletion(
+            model=f"{provider}/{model_name}",
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            timeout=timeout,
+            **_provider_kwargs(provider),
+            **kwargs,
+        )
+
+    with span("llm.stream", "llm", provider=provider, model=model_name) as span_args:
+        chunks = response.__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), idle_timeout)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    raise TimeoutError(
+                        f"No token received from {provider}/{model_name} for {idle_timeout:.0f}s"
+                    )
+
+                if chunk and hasattr(chunk, "choices") and chunk.choices:
+                    delta = chunk.choices[0].delta
+                    if hasattr(delta, "content") and delta.content:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                            LLM_FIRST_TOKEN_SECONDS.labels(provider, model_name).observe(first_token_at - start)
+                            span_args["first_token_ms"] = round((first_token_at - start) * 1000, 1)
+                        tokens += 1
+                        LLM_TOKENS.labels(provider, model_name).inc()
+                        yield delta.content
+
+            # Generation completed (not cancelled nor failed)
+            end = time.perf_counter()
+            LLM_SECONDS.labels(provider, model_name).observe(end - start)
+            if tokens > 1 and end > first_token_at:
+                LLM_TOKENS_PER_SECOND.labels(provider, model_name).observe((tokens - 1) / (end - first_token_at))
+        finally:
+            span_args["chunks"] = tokens
+            close = getattr(response, "aclose", None)
+            if close is not None:
+                try:
+                    await close()
+                except Exception as e:
+                    logging.debug(f"Error closing llm stream: {e}")
+
+
+async def agenerate(provider: str, model_name: str, prompt: str, **kwargs) -> str:
+    """Async generation returning the full text (same timeouts as agenerate_stream)."""
+    return "".join([token async for token in agenerate_stream(provider, model_name, prompt, **kwargs)])
+
@@ -0,0 +1,274 @@
+"""
+Génération map-reduce pour les transcriptions longues.
+
+Au-delà de `long_input_tokens`, la transcription n'est plus envoyée d'un bloc :
+elle est découpée aux frontières de segments en morceaux d'environ
+`chunk_tokens`, chaque morceau est résumé (map) en parallèle avec au plus
+`map_parallelism` appels simultanés, puis un appel final (reduce) assemble le
+cours ou le résumé à partir de ces notes.
+
+Chaque appel map occupe son propre créneau "llm" du scheduler (`slot`), en
+plus de la limite `map_parallelism` propre au job : la somme des appels de
+tous les jobs ne dépasse jamais `llm_workers`.
+
+Les notes de chaque morceau sont mises en cache sur disque (cache distinct de
+celui des réponses, borné par `chunk_cache_max_mb`, même durée de validité) :
+si l'étape reduce échoue, relancer le job ne refait pas les appels map.
+
+Usage:
+    from core.longform import is_long_input, map_transcript, create_reduce_prompt
+
+    if is_long_input(text):
+        notes = await map_transcript(
+            provider, model, "create_course", segments,
+            slot=lambda: scheduler.slot("llm", task_id),
+        )
+        prompt = create_reduce_prompt("create_course", notes)
+"""
+
+import asyncio
+import os
+import re
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, Awaitable, Callable, List, Optional
+
+from logger import setup_logger
+from core.cache import DiskCache, make_key
+from core.llm import agenerate
+from core.tokens import estimate_tokens
+from config import (
+    cache_folder,
+    long_input_tokens,
+    chunk_tokens,
+    map_parallelism,
+    llm_cache_ttl_hours,
+    chunk_cache_max_mb,
+)
+
+logger = setup_logger(__name__)
+
+ChunkProgress = Callable[[int, int], Awaitable[None]]
+# Créneau réservé autour de chaque appel LLM (ex: scheduler.slot("llm", task_id))
+Slot = Callable[[], AsyncContextManager]
+
+chunk_cache = DiskCache(
+    os.path.join(cache_folder, "llm_chunks"),
+    chunk_cache_max_mb * 1024 * 1024,
+    ttl_seconds=llm_cache_ttl_hours * 3600,
+)
+
+
+def is_long_input(text: str, threshold: int = long_input_tokens) -> bool:
+    return estimate_tokens(text) > threshold
+
+
+def _format_timestamp(seconds: float) -> str:
+    total = int(seconds)
+    return f"{total // 3600:02d}:{total % 3600 // 60:02d}:{total % 60:02d}"
+
+
+# ----- Découpage ----- #
+
+def split_transcript(
+    segments: List[dict], max_tokens: int = chunk_tokens, with_timestamps: bool = True
+) -> List[str]:
+    """
+    Regroupe les segments en morceaux d'au plus `max_tokens` (estimés).
+
+    Un morceau n'est jamais coupé au milieu d'un segment ; chacun est préfixé
+    par sa plage horaire pour que le reduce garde l'ordre du cours.
+    """
+    chunks: List[str] = []
+    texts: List[str] = []
+    tokens = 0
+    start = end = 0.0
+
+    def flush() -> None:
+        text = " ".join(texts)
+        if with_timestamps:
+            text = f"[{_format_timestamp(start)} - {_format_timestamp(end)}]\n{text}"
+        chunks.append(text)
+
+    for segment in segments:
+        text = segment.get("text", "").strip()
+        if not text:
+            continue
+        segment_tokens = estimate_tokens(text)
+        if texts and tokens + segment_tokens > max_tokens:
+            flush()
+            texts, tokens = [], 0
+        if not texts:
+            start = float(segment.get("start", 0.0))
+        texts.append(text)
+        tokens += segment_tokens
+        end = float(segment.get("end", start))
+
+    if texts:
+        flush()
+    return chunks
+
+
+def sentences_as_segments(text: str) -> List[dict]:
+    """Segments de repli quand la transcription n'a pas de timestamps."""
+    return [{"text": sentence} for sentence in re.split(r"(?<=[.!?])\s+", text) if sentence]
+
+
+# ----- Prompts ----- #
+
+def create_map_prompt(action: str, chunk: str, index: int, total: int) -> str:
+    """Prompt appliqué à chaque morceau de la transcription."""
+    if action == "create_course":
+        goal = (
+            "Rédige des notes de cours détaillées et structurées de cette partie : concepts, "
+            "définitions, explications, exemples concrets et questions d'élèves pertinentes avec leur réponse."
+        )
+    else:
+        goal = "Liste les idées essentielles et les conclusions de cette partie, sous forme de puces concises."
+
+    return f"""Tu traites la partie {index} sur {total} de la transcription d'un enregistrement.
+
+Partie à traiter :
+{chunk}
+
+Directives :
+1. {goal}
+2. Ignore les bavardages, remarques administratives et digressions sans rapport avec le sujet.
+3. Ne rédige ni introduction ni conclusion : ces notes seront assemblées avec celles des autres parties.
+4. Format Markdown, sans emoji.
+
+Rédige les notes de cette partie maintenant :"""
+
+
+def create_merge_prompt(action: str, notes: str) -> str:
+    """Prompt de condensation quand les notes elles-mêmes dépassent le budget du reduce."""
+    return f"""Voici des notes consécutives extraites d'un même enregistrement.
+
+Notes :
+{notes}
+
+Fusionne-les en un seul ensemble de notes, sans perdre de concept ni d'exemple important, en supprimant les redondances. Conserve l'ordre chronologique. Format Markdown, sans emoji.
+
+Notes fusionnées :"""
+
+
+def create_reduce_prompt(action: str, notes: List[str]) -> str:
+    """Prompt final qui assemble le cours ou le résumé à partir des notes de chaque partie."""
+    joined = "\n\n---\n\n".join(notes)
+    if action == "create_course":
+        return f"""Tu es un ingénieur pédagogique expert. Voici les notes, partie par partie et dans l'ordre chronologique, d'un long enregistrement. Ton objectif est d'en faire un cours académique structuré, clair et professionnel.
+
+Notes à assembler :
+{joined}
+
+Directives strictes de rédaction :
+1. Unité : Produis un cours unique et cohérent, pas une succession de parties. Fusionne les notions abordées à plusieurs reprises.
+2. Structure des titres : Utilise des titres et sous-titres Markdown (## et ###). Ne mets JAMAIS de numérotation devant les titres (pas de "1.", "I.", "A.", etc.).
+3. Interactions : Conserve les questions d'élèves pertinentes suivies de la réponse détaillée du professeur.
+4. Contenu : Développe les concepts, explique les termes techniques et garde les exemples concrets.
+5. Style : Professionnel et didactique. N'utilise aucun emoji.
+6. Conclusion : Termine obligatoirement par une section intitulée "Points importants à retenir".
+
+Génère le cours structuré maintenant :"""
+
+    return f"""Tu es un expert en synthèse d'informations. Voici les points clés, partie par partie et dans l'ordre chronologique, d'un long enregistrement. Rédige un résumé percutant et fidèle de l'ensemble.
+
+Points clés à assembler :
+{joined}
+
+Directives de rédaction :
+1. Titre : Donne un titre principal unique et explicite au résumé (sans numéro).
+2. Points clés : Utilise une liste à puces pour énumérer les idées essentielles et les conclusions majeures, sans doublons entre parties.
+3. Synthèse : Rédige une conclusion synthétique qui reprend l'aboutissement de la réflexion ou du cours.
+4. Contraintes de forme : Format Markdown pur. N'utilise aucun emoji. Ne numérote pas les sections.
+
+Génère le résumé maintenant :"""
+
+
+# ----- Map ----- #
+
+@asynccontextmanager
+async def _no_slot():
+    yield
+
+
+async def _map_prompts(
+    provider: str,
+    model_name: str,
+    prompts: List[str],
+    parallelism: int,
+    progress_callback: Optional[ChunkProgress] = None,
+    slot: Optional[Slot] = None,
+) -> List[str]:
+    """
+    Exécute les prompts en parallèle (au plus `parallelism` à la fois), avec cache par prompt.
+
+    Chaque appel attend en plus un créneau `slot` (aucun par défaut).
+    """
+    semaphore = asyncio.Semaphore(max(1, parallelism))
+    done = 0
+
+    async def run(prompt: str) -> str:
+        nonlocal done
+        key = make_key(provider, model_name, prompt)
+        cached = await asyncio.to_thread(chunk_cache.get, key)
+        if cached is not None:
+            content = cached["content"]
+        else:
+            async with semaphore, (slot or _no_slot)():
+                # Déjà en cache ici : inutile de passer par le cache de réponses
+                content = await agenerate(provider, model_name, prompt, use_cache=False)
+            await asyncio.to_thread(chunk_cache.set, key, {"content": content})
+
+        done += 1
+        if progress_callback:
+            await progress_callback(done, len(prompts))
+        return content
+
+    return list(await asyncio.gather(*(run(prompt) for prompt in prompts)))
+
+
+async def map_transcript(
+    provider: str,
+    model_name: str,
+    action: str,
+    segments: List[dict],
+    max_chunk_tokens: int = chunk_tokens,
+    parallelism: int = map_parallelism,
+    reduce_budget: int = long_input_tokens,
+    progress_callback: Optional[ChunkProgress] = None,
+    slot: Optional[Slot] = None,
+) -> List[str]:
+    """
+    Étape map : notes de chaque morceau de la transcription.
+
+    `slot` est réservé autour de chaque appel LLM : l'appelant ne doit pas déjà
+    tenir un créneau "llm" pendant le map.
+
+    Si les notes réunies dépassent encore `reduce_budget`, elles sont fusionnées
+    par groupes consécutifs jusqu'à tenir dans un seul appel reduce.
+
+    Returns:
+        Notes dans l'ordre chronologique, prêtes pour create_reduce_prompt()
+    """
+    chunks = split_transcript(segments, max_chunk_tokens)
+    logger.info(f"Long input: {len(chunks)} chunks, {parallelism} parallel map calls")
+
+    prompts = [
+        create_map_prompt(action, chunk, index, len(chunks))
+        for index, chunk in enumerate(chunks, start=1)
+    ]
+    notes = await _map_prompts(provider, model_name, prompts, parallelism, progress_callback, slot)
+
+    while len(notes) > 1 and estimate_tokens("\n\n".join(notes)) > reduce_budget:
+        groups = split_transcript(
+            [{"text": note} for note in notes], max_chunk_tokens, with_timestamps=False
+        )
+        if len(groups) >= len(notes):
+            break
+        logger.info(f"Merging {len(notes)} chunk notes into {len(groups)} groups")
+        notes = await _map_prompts(
+            provider, model_name, [create_merge_prompt(action, group) for group in groups], parallelism,
+            slot=slot,
+        )
+
+    return notes
@@ -0,0 +1,232 @@
+"""
+Cache persistant des médias téléchargés, indexé par extracteur et identifiant de vidéo.
+
+Le dossier temporaire est vidé à la fin de chaque tâche : sans ce cache, une
+même conférence YouTube serait téléchargée à chaque demande. Les médias sont
+rangés sous `cache_folder/media`, une entrée par (extracteur yt-dlp, id de la
+vidéo, mode audio/vidéo) :
+
+    <clé>.json   métadonnées (titre, durée, format, codecs, taille...)
+    <clé>.<ext>  le fichier téléchargé
+
+L'identifiant est déduit de l'URL par les extracteurs yt-dlp, sans requête
+réseau : le cache est consulté avant tout accès au réseau. Comme pour
+DiskCache, la date de modification des métadonnées sert d'horodatage LRU et
+les entrées les plus anciennes sont supprimées au-delà de `max_bytes`.
+
+Les fichiers sont exposés aux tâches par lien physique (copie à défaut) :
+une éviction ou le nettoyage d'un dossier de travail ne touche jamais un
+fichier encore utilisé par l'autre.
+
+Usage:
+    from core.media_cache import media_cache, resolve_media_id
+
+    media_id = resolve_media_id(url)            # ("Youtube", "dQw4w9WgXcQ") ou None
+    entry = media_cache.lookup(*media_id, audio_only=True)
+    if entry is None:
+        ...                                      # téléchargement
+        media_cache.store(*media_id, True, file_path, metadata)
+    else:
+        file_path = media_cache.materialize(entry, workspace.path)
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Optional, Tuple
+
+import yt_dlp
+
+from logger import setup_logger
+from core.cache import make_key
+from config import cache_folder, media_cache_max_mb
+
+logger = setup_logger(__name__)
+
+# Champs du format téléchargé conservés avec l'entrée
+FORMAT_FIELDS = ("format_id", "ext", "vcodec", "acodec", "abr", "asr", "height", "filesize")
+
+
+def resolve_media_id(url: str) -> Optional[Tuple[str, str]]:
+    """
+    (extracteur, id de la vidéo) déduits de l'URL seule, sans accès réseau.
+
+    Pour l'extracteur générique (lien direct vers un fichier), l'URL elle-même
+    sert d'identifiant. None si aucun extracteur ne reconnaît l'URL.
+    """
+    for extractor in yt_dlp.extractor.gen_extractor_classes():
+        if not extractor.suitable(url):
+            continue
+        if extractor.ie_key() == "Generic":
+            return "Generic", make_key(url)[:16]
+        video_id = extractor.get_temp_id(url)
+        return (extractor.ie_key(), video_id) if video_id else None
+    return None
+
+
+class MediaCache:
+    """Médias téléchargés sur disque, bornés en taille (LRU)."""
+
+    def __init__(self, folder: str, max_bytes: int) -> None:
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(folder, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in os.scandir(folder) if entry.is_file())
+
+    def _key(self, extractor: str, video_id: str, audio_only: bool) -> str:
+        return make_key(extractor, video_id, "audio" if audio_only else "video")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.folder, f"{key}.json")
+
+    def _read(self, key: str) -> Optional[dict]:
+        meta_path = self._meta_path(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error(f"Corrupted media cache entry {meta_path}: {e}")
+            self._remove(key)
+            return None
+        if not os.path.exists(entry.get("file_path", "")):
+            # Média supprimé à la main : l'entrée n'a plus de sens
+            self._remove(key)
+            return None
+        os.utime(meta_path)
+        return entry
+
+    def lookup(self, extractor: str, video_id: str, audio_only: bool) -> Optional[dict]:
+        """
+        Entrée en cache pour cette vidéo, ou None.
+
+        Une demande audio seul est aussi servie par la vidéo complète (qui contient
+        la piste audio) ; l'inverse n'est pas vrai.
+        """
+        modes = [True, False] if audio_only else [False]
+        with self._lock:
+            for mode in modes:
+                entry = self._read(self._key(extractor, video_id, mode))
+                if entry is not None:
+                    self.hits += 1
+                    logger.info(f"Media cache hit: {extractor} {video_id} ({entry['mode']})")
+                    return entry
+            self.misses += 1
+            return None
+
+    def lookup_any(self, extractor: str, video_id: str) -> Optional[dict]:
+        """Entrée audio ou vidéo, pour les métadonnées seules (pas de statistique)."""
+        with self._lock:
+            for mode in (True, False):
+                entry = self._read(self._key(extractor, video_id, mode))
+                if entry is not None:
+                    return entry
+            return None
+
+    def store(self, extractor: str, video_id: str, audio_only: bool, source_path: str, metadata: dict) -> None:
+        """Ajoute le fichier téléchargé au cache (lien physique, copie à défaut)."""
+        key = self._key(extractor, video_id, audio_only)
+        extension = os.path.splitext(source_path)[1]
+        media_path = os.path.join(self.folder, f"{key}{extension}")
+        tmp_path = f"{media_path}.{threading.get_ident()}.tmp"
+        entry = {
+            **metadata,
+            "extractor": extractor,
+            "id": video_id,
+            "mode": "audio" if audio_only else "video",
+            "filename": os.path.basename(source_path),
+            "file_path": media_path,
+            "size_bytes": os.path.getsize(source_path),
+            "created_at": time.time(),
+        }
+
+        with self._lock:
+            self._remove(key)
+            try:
+                _link_or_copy(source_path, tmp_path)
+                os.replace(tmp_path, media_path)
+                with open(self._meta_path(key), "w", encoding="utf-8") as f:
+                    json.dump(entry, f, ensure_ascii=False)
+                self._size += os.path.getsize(media_path) + os.path.getsize(self._meta_path(key))
+            except Exception as e:
+                logger.error(f"Error writing media cache entry {key}: {e}")
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                self._remove(key)
+                return
+            logger.info(f"Media cached: {extractor} {video_id} ({entry['mode']}, {entry['size_bytes'] / 1e6:.1f} MB)")
+            self._evict()
+
+    def materialize(self, entry: dict, output_path: str) -> str:
+        """Expose le média en cache dans `output_path` sous son nom d'origine."""
+        os.makedirs(output_path, exist_ok=True)
+        file_path = os.path.join(output_path, entry["filename"])
+        if os.path.exists(file_path):
+            os.unlink(file_path)
+        _link_or_copy(entry["file_path"], file_path)
+        return file_path
+
+    def _remove(self, key: str) -> None:
+        """Supprime le média et les métadonnées d'une entrée (appelé sous verrou)."""
+        for entry in os.scandir(self.folder):
+            if entry.name.startswith(key) and entry.is_file():
+                size = entry.stat().st_size
+                try:
+                    os.unlink(entry.path)
+                    self._size -= size
+                except FileNotFoundError:
+                    pass
+
+    def _evict(self) -> None:
+        if self._size <= self.max_bytes:
+            return
+        entries = sorted(
+            (entry for entry in os.scandir(self.folder) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries:
+            if self._size <= self.max_bytes:
+                break
+            self._remove(entry.name[: -len(".json")])
+            logger.info(f"Evicted media cache entry {entry.name}")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": sum(1 for entry in os.scandir(self.folder) if entry.name.endswith(".json")),
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def _link_or_copy(source: str, destination: str) -> None:
+    try:
+        os.link(source, destination)
+    except OSError:
+        # Systèmes de fichiers différents ou liens non supportés
+        shutil.copy2(source, destination)
+
+
+def format_metadata(info: dict) -> dict:
+    """Métadonnées à conserver à partir de l'info yt-dlp d'un téléchargement."""
+    downloads = info.get("requested_downloads") or [info]
+    fmt = downloads[0]
+    return {
+        "title": info.get("title", "unknown"),
+        "duration": info.get("duration", 0),
+        "webpage_url": info.get("webpage_url"),
+        "format": {field: fmt.get(field) for field in FORMAT_FIELDS},
+    }
+
+
+media_cache = MediaCache(os.path.join(cache_folder, "media"), media_cache_max_mb * 1024 * 1024)
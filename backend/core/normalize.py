@@ -0,0 +1,301 @@
+"""
+Normalisation audio en deux passes à mémoire constante.
+
+Passe 1 : les blocs PCM 16 bits sont observés au fil du décodage (pic et
+énergie RMS), sans jamais garder le signal complet en mémoire.
+Passe 2 : le gain est appliqué bloc par bloc, soit sur les blocs gardés en
+mémoire, soit sur le WAV intermédiaire relu via un memmap. En mode "peak" le résultat est identique, échantillon par
+échantillon, à pydub.effects.normalize().
+
+Usage:
+    from core.normalize import BlockNormalizer
+
+    normalizer = BlockNormalizer(mode="peak")
+    for block in pcm_blocks:
+        normalizer.observe(block)
+    normalizer.normalize_wav("extracted.wav", "normalized.wav")
+
+Benchmark (depuis backend/):
+    python -m core.normalize 10 60 180
+"""
+
+import math
+import struct
+import wave
+from typing import Generator, List
+
+import numpy as np
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+PCM16_MAX_AMPLITUDE = 32768
+DEFAULT_HEADROOM_DB = 0.1  # Valeur par défaut de pydub.effects.normalize
+DEFAULT_TARGET_DBFS = -20.0
+DEFAULT_BLOCK_FRAMES = 16000 * 30
+
+
+def open_wav_memmap(path: str) -> np.memmap:
+    """
+    Ouvre le chunk "data" d'un WAV PCM 16 bits mono en lecture via memmap.
+
+    Le fichier n'est jamais chargé en entier : seules les pages effectivement
+    lues sont ramenées en mémoire par le système.
+    """
+    with open(path, "rb") as f:
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError(f"{path} is not a RIFF/WAVE file")
+
+        offset = 12
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"No data chunk found in {path}")
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+            offset += 8
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack("<HHIIHH", f.read(16))
+                audio_format, channels, _, _, _, bits = fmt
+                if audio_format != 1 or channels != 1 or bits != 16:
+                    raise ValueError(f"{path} must be 16-bit PCM mono")
+                f.seek(chunk_size - 16 + (chunk_size & 1), 1)
+            elif chunk_id == b"data":
+                frames = chunk_size // 2
+                break
+            else:
+                f.seek(chunk_size + (chunk_size & 1), 1)
+            offset += chunk_size + (chunk_size & 1)
+
+    if frames == 0:
+        return np.zeros(0, dtype=np.int16)
+    return np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(frames,))
+
+
+def iter_blocks(samples: np.ndarray, block_frames: int) -> Generator[np.ndarray, None, None]:
+    """Découpe un tableau (ou un memmap) en vues successives de `block_frames`."""
+    for start in range(0, len(samples), block_frames):
+        yield samples[start:start + block_frames]
+
+
+class BlockNormalizer:
+    """
+    Normaliseur bloc par bloc pour de l'audio PCM 16 bits.
+
+    Modes:
+        peak: amène le pic à -headroom dBFS (équivalent pydub)
+        loudness: amène le niveau RMS à target_dbfs, sans dépasser -headroom dBFS en crête
+    """
+
+    def __init__(
+        self,
+        mode: str = "peak",
+        headroom: float = DEFAULT_HEADROOM_DB,
+        target_dbfs: float = DEFAULT_TARGET_DBFS,
+        block_frames: int = DEFAULT_BLOCK_FRAMES,
+    ) -> None:
+        if mode not in ("peak", "loudness"):
+            raise ValueError(f"Unknown normalization mode: {mode}")
+        self.mode = mode
+        self.headroom = headroom
+        self.target_dbfs = target_dbfs
+        self.block_frames = block_frames
+
+        self.peak = 0
+        self.sum_squares = 0.0
+        self.frames = 0
+
+    # ----- Passe 1 ----- #
+
+    def observe(self, block: np.ndarray) -> None:
+        """Accumule le pic et l'énergie d'un bloc PCM 16 bits."""
+        if not len(block):
+            return
+        samples = block.astype(np.float64)
+        self.peak = max(self.peak, int(np.abs(samples).max()))
+        self.sum_squares += float(np.dot(samples, samples))
+        self.frames += len(block)
+
+    @property
+    def rms_dbfs(self) -> float:
+        """Niveau RMS observé, en dBFS (-inf pour un silence)."""
+        if self.frames == 0 or self.sum_squares == 0:
+            return -math.inf
+        rms = math.sqrt(self.sum_squares / self.frames)
+        return 20 * math.log10(rms / PCM16_MAX_AMPLITUDE)
+
+    @property
+    def gain(self) -> float:
+        """Facteur de gain linéaire à appliquer lors de la passe 2."""
+        if self.peak == 0:
+            return 1.0
+
+        # Même enchaînement de calculs que pydub pour obtenir un résultat bit à bit identique
+        target_peak = PCM16_MAX_AMPLITUDE * 10 ** (-self.headroom / 20)
+        peak_boost_db = 20 * math.log10(target_peak / self.peak)
+
+        if self.mode == "loudness":
+            loudness_boost_db = self.target_dbfs - self.rms_dbfs
+            return 10 ** (min(loudness_boost_db, peak_boost_db) / 20)
+        return 10 ** (peak_boost_db / 20)
+
+    # ----- Passe 2 ----- #
+
+    def apply(self, block: np.ndarray) -> np.ndarray:
+        """Applique le gain à un bloc (arrondi vers -inf et saturation, comme audioop.mul)."""
+        scaled = np.floor(block.astype(np.float64) * self.gain)
+        return np.clip(scaled, -32768, 32767).astype(np.int16)
+
+    def apply_float(self, block: np.ndarray) -> np.ndarray:
+        """Applique le gain et renvoie du float32 [-1, 1], le format attendu par Whisper."""
+        return self.apply(block).astype(np.float32) / 32768.0
+
+    def normalize_blocks(self, blocks: List[np.ndarray]) -> np.ndarray:
+        """
+        Passe 2 en mémoire : construit le buffer float32 normalisé à partir des blocs PCM.
+
+        Les blocs sont retirés de la liste au fur et à mesure pour ne jamais
+        garder les deux représentations complètes en même temps.
+        """
+        audio = np.empty(sum(len(block) for block in blocks), dtype=np.float32)
+        position = 0
+        blocks.reverse()
+        while blocks:
+            block = blocks.pop()
+            audio[position:position + len(block)] = self.apply_float(block)
+            position += len(block)
+
+        self._log_gain()
+        return audio
+
+    def normalize_wav_to_array(self, src_path: str, dst_path: str) -> np.memmap:
+        """
+        Passe 2 avec débordement disque : relit `src_path` via memmap et écrit
+        le float32 normalisé dans un memmap `dst_path`.
+
+        Returns:
+            np.memmap: Buffer float32 en lecture seule, utilisable comme un ndarray
+        """
+        samples = open_wav_memmap(src_path)
+        frames = len(samples)
+        if frames == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        audio = np.memmap(dst_path, dtype=np.float32, mode="w+", shape=(frames,))
+        for start in range(0, frames, self.block_frames):
+            block = samples[start:start + self.block_frames]
+            audio[start:start + len(block)] = self.apply_float(block)
+        audio.flush()
+        del audio, samples
+
+        self._log_gain()
+        return np.memmap(dst_path, dtype=np.float32, mode="r", shape=(frames,))
+
+    def scan_wav(self, path: str) -> None:
+        """Passe 1 autonome : observe un WAV déjà écrit via memmap."""
+        for block in iter_blocks(open_wav_memmap(path), self.block_frames):
+            self.observe(block)
+
+    def normalize_wav(self, src_path: str, dst_path: str) -> float:
+        """
+        Passe 2 : relit `src_path` via memmap et écrit la version normalisée.
+
+        Returns:
+            float: Gain appliqué
+        """
+        gain = self.gain
+        with wave.open(src_path, "rb") as src:
+            params = src.getparams()
+
+        samples = open_wav_memmap(src_path)
+        with wave.open(dst_path, "wb") as dst:
+            dst.setparams(params)
+            for block in iter_blocks(samples, self.block_frames):
+                dst.writeframes(self.apply(block).tobytes())
+        del samples
+
+        self._log_gain()
+        return gain
+
+    def _log_gain(self) -> None:
+        logger.info(
+            f"Audio normalized ({self.mode}): peak={self.peak}, "
+            f"rms={self.rms_dbfs:.1f} dBFS, gain={20 * math.log10(self.gain):+.2f} dB"
+        )
+
+
+# ----- Benchmark ----- #
+
+def _write_synthetic_wav(path: str, minutes: int, sample_rate: int = 16000) -> None:
+    """Génère un WAV de parole synthétique (sinus modulés + bruit) bloc par bloc."""
+    rng = np.random.default_rng(0)
+    block = sample_rate * 60
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        for minute in range(minutes):
+            t = (np.arange(block) + minute * block) / sample_rate
+            signal = 0.2 * np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 0.3 * t))
+            signal += 0.02 * rng.standard_normal(block)
+            wav.writeframes((signal * 32767).astype(np.int16).tobytes())
+
+
+def _bench_worker(method: str, src: str, dst: str, queue) -> None:
+    import resource
+    import sys
+    import time
+
+    start = time.perf_counter()
+    if method == "pydub":
+        from pydub import AudioSegment, effects
+
+        effects.normalize(AudioSegment.from_file(src)).export(dst, format="wav")
+    else:
+        normalizer = BlockNormalizer()
+        normalizer.scan_wav(src)
+        normalizer.normalize_wav(src, dst)
+    elapsed = time.perf_counter() - start
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sur macOS, en kilo-octets sur Linux
+    rss_mb = max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+    queue.put((elapsed, rss_mb))
+
+
+def run_benchmark(durations_minutes=(10, 60, 180)) -> None:
+    """Compare pic de RSS et temps écoulé entre pydub et BlockNormalizer."""
+    import multiprocessing
+    import os
+    import tempfile
+
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'minutes':>8} {'method':>8} {'wall (s)':>10} {'peak RSS (MB)':>14}")
+        for minutes in durations_minutes:
+            src = os.path.join(tmp, f"bench_{minutes}.wav")
+            _write_synthetic_wav(src, minutes)
+
+            outputs = {}
+            for method in ("pydub", "blocks"):
+                dst = os.path.join(tmp, f"bench_{minutes}_{method}.wav")
+                queue = ctx.Queue()
+                process = ctx.Process(target=_bench_worker, args=(method, src, dst, queue))
+                process.start()
+                process.join()
+                if process.exitcode != 0:
+                    raise RuntimeError(f"Benchmark worker failed for {method}")
+                elapsed, rss_mb = queue.get()
+                outputs[method] = dst
+                print(f"{minutes:>8} {method:>8} {elapsed:>10.2f} {rss_mb:>14.1f}")
+
+            identical = np.array_equal(
+                open_wav_memmap(outputs["pydub"]), open_wav_memmap(outputs["blocks"])
+            )
+            print(f"{minutes:>8} {'output':>8} {'identical' if identical else 'DIFFERENT':>10}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    run_benchmark(tuple(int(arg) for arg in sys.argv[1:]) or (10, 60, 180))
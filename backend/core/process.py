@@ -1,11 +1,49 @@
 import asyncio
+import time
 from core.MediaProcessor import MediaProcessor
-from core.downloader import download_video
-from core.llm import generate_stream
-from websocket import task_manager
-from config import llm_provider, llm_model, temp_folder
+from core.downloader import (
+    download_video,
+    probe_url,
+    stream_download,
+    media_filename,
+    safe_name,
+    fetch_captions,
+    is_playlist_url,
+    expand_playlist,
+)
+from core.captions import parse_captions, evaluate_captions
+from core.ingest import stream_audio
+from core.live import LiveTranscription
+from core.llm import agenerate_stream
+from core.longform import (
+    is_long_input,
+    map_transcript,
+    create_reduce_prompt,
+    sentences_as_segments,
+)
+from websocket import task_manager, TaskStatus
+from core.cache import transcription_cache
+from core.scheduler import scheduler
+from core.compaction import compact_transcript
+from core.streaming import DeltaStream
+from core.exports import TRANSCRIPT_EXPORTS
+from config import (
+    llm_provider,
+    llm_model,
+    output_folder,
+    vad_enabled,
+    transcription_cache_enabled,
+    compaction_enabled,
+    live_transcription,
+    captions_enabled,
+    captions_languages,
+    playlist_concurrency,
+)
 from logger import setup_logger
+from metrics import STAGE_SECONDS, TRANSCRIPTION_REALTIME_FACTOR
+from tracing import span
 import os
+import shutil
 
 logger = setup_logger(__name__)
 
@@ -15,6 +53,72 @@ def is_url(path: str) -> bool:
     return path.startswith("http://") or path.startswith("https://")
 
 
+# Sorties générées par le LLM → libellé de leur sous-tâche
+GENERATION_OUTPUTS = {"create_course": "cours", "create_summary": "résumé"}
+OUTPUTS = set(GENERATION_OUTPUTS) | set(TRANSCRIPT_EXPORTS)
+# Suffixe du fichier exporté quand un job produit plusieurs sorties
+OUTPUT_SUFFIXES = {
+    "create_course": "course",
+    "create_summary": "summary",
+    "transcript_srt": "transcript",
+    "transcript_vtt": "transcript",
+    "transcript_txt": "transcript",
+}
+
+
+def validate_outputs(outputs: list) -> list:
+    """Vérifie et dédoublonne la liste des sorties demandées (ordre conservé)."""
+    unknown = [output for output in outputs if output not in OUTPUTS]
+    if not outputs or unknown:
+        raise ValueError(f"Sorties inconnues: {unknown or outputs}")
+    return list(dict.fromkeys(outputs))
+
+
+def pipeline_task_names(outputs: list, mode: str = "file") -> list:
+    """
+    Sous-tâches affichées pour la pipeline audio → export.
+
+    `mode` : "file" (fichier local ou audio téléchargé), "live" (transcription
+    pendant le téléchargement) ou "captions" (sous-titres de la source, sans Whisper).
+    """
+    if mode == "captions":
+        names = ["Récupération des sous-titres"]
+    elif mode == "live":
+        names = ["Téléchargement et décodage de l'audio", "Transcription"]
+    else:
+        names = ["Décodage et normalisation audio"]
+        if vad_enabled:
+            names.append("Détection de la parole")
+        names.append("Transcription")
+    generations = [output for output in outputs if output in GENERATION_OUTPUTS]
+    if len(generations) == 1:
+        names.append("Génération du contenu")
+    else:
+        names += [f"Génération : {GENERATION_OUTPUTS[output]}" for output in generations]
+    names.append("Export")
+    return names
+
+
+def resolve_output_file(
+    source_path: str, output_path: str, extension: str, suffix: str = "generated", distinct: bool = False
+) -> str:
+    """
+    Chemin du fichier exporté.
+
+    `output_path` peut être un dossier (fichier nommé d'après la source) ou un
+    chemin de fichier ; avec `distinct`, le suffixe est ajouté pour que
+    plusieurs sorties d'un même job ne s'écrasent pas.
+    """
+    if os.path.isdir(output_path):
+        source_name = os.path.splitext(os.path.basename(source_path))[0]
+        return os.path.join(output_path, f"{source_name}_{suffix}.{extension}")
+    if output_path.endswith(f".{extension}"):
+        output_path = output_path[: -len(extension) - 1]
+    if distinct:
+        output_path = f"{output_path}_{suffix}"
+    return f"{output_path}.{extension}"
+
+
 def create_course_prompt(transcription: str) -> str:
     """Crée le prompt pour la génération d'un cours structuré sans numérotation."""
     return f"""Tu es un ingénieur pédagogique expert. Ton objectif est de transformer une transcription brute en un cours académique structuré, clair et professionnel.
@@ -52,57 +156,39 @@ Génère le résumé maintenant :"""
 
 async def process_file_task(
     task_id: str, action: str, file_path: str, output_format: str, output_path: str,
-    websocket=None
+    websocket=None, outputs: list = None, language: str = None
 ):
     """
     Traite un fichier avec suivi de progression en temps réel via WebSocket.
     Gère les fichiers locaux (audio/vidéo) et les URLs (téléchargement + choix utilisateur).
+
+    `outputs` liste les sorties à produire à partir d'une seule transcription
+    (ex: ["create_course", "create_summary", "transcript_srt"]) ; par défaut [action].
+    `language` restreint les sous-titres acceptés pour une URL (par défaut : config).
     """
     try:
         # ----- Détection URL vs fichier local -----
         if is_url(file_path):
-            await _process_url(task_id, file_path, websocket)
+            await _process_url(
+                task_id, file_path, websocket, action, outputs, output_format, output_path, language
+            )
             return
 
         # ----- Flux fichier local (existant) -----
-        media = MediaProcessor(file_path)
+        task_state = task_manager.get_task(task_id)
+        media = MediaProcessor(file_path, task_state.workspace)
         file_type = media.detect_file_type()
 
         if file_type == "error":
             await task_manager.set_error(task_id, "Format de fichier non supporté")
             return
 
-        # Définir les tâches selon le type de fichier
-        if file_type == "video":
-            task_names = [
-                "Extraction de l'audio",
-                "Normalisation audio",
-                "Transcription",
-                "Génération du contenu",
-                "Export",
-            ]
-        else:  # audio
-            task_names = [
-                "Normalisation audio",
-                "Transcription",
-                "Génération du contenu",
-                "Export",
-            ]
-
-        task_manager.initialize_tasks(task_id, task_names)
+        outputs = validate_outputs(outputs or [action])
+        task_manager.initialize_tasks(task_id, pipeline_task_names(outputs))
         await asyncio.sleep(0.3)
 
-        current_task = 0
-
-        # ----- Extraction audio (si vidéo locale) -----
-        if file_type == "video":
-            await task_manager.start_task(task_id, current_task)
-            media.extract_audio()
-            await task_manager.complete_task(task_id, current_task)
-            current_task += 1
-
-        # ----- Pipeline commune : normalisation → transcription → génération → export -----
-        await _run_pipeline(task_id, media, action, file_path, output_format, output_path, current_task)
+        # ----- Pipeline commune : décodage → transcription → génération → export -----
+        await _run_pipeline(task_id, media, outputs, file_path, output_format, output_path, 0)
 
     except Exception as e:
         logger.error(f"Error in process_file_task: {e}")
@@ -110,70 +196,93 @@ async def process_file_task(
         raise
 
 
-async def _process_url(task_id: str, url: str, websocket=None):
+async def _download(task_id: str, url: str, task_index: int, audio_only: bool, info: dict = None) -> dict:
     """
-    Phase 1 : Télécharger la vidéo, envoyer download_complete, attendre le choix utilisateur.
-    Phase 2 : Si cours/résumé, extraire audio et lancer la pipeline.
-    """
-    # Phase 1 : Téléchargement
-    task_names = ["Téléchargement de la vidéo"]
-    task_manager.initialize_tasks(task_id, task_names)
-    await asyncio.sleep(0.3)
+    Télécharge sous un créneau "download" sans bloquer l'event loop.
 
-    await task_manager.start_task(task_id, 0)
-
-    # Télécharger dans un thread pour ne pas bloquer l'event loop
-    import threading
-    download_result = None
-    download_error = None
-    download_done = threading.Event()
+    `info` (probe_url()["info"]) évite une nouvelle extraction de l'URL.
+    """
+    workspace = task_manager.get_task(task_id).workspace
     loop = asyncio.get_event_loop()
 
     def on_download_progress(percent, speed):
         """Callback appelé depuis le thread de download."""
         asyncio.run_coroutine_threadsafe(
-            task_manager.update_download_progress(task_id, 0, percent, speed),
+            task_manager.update_download_progress(task_id, task_index, percent, speed),
             loop,
         )
 
-    def download_worker():
-        nonlocal download_result, download_error
-        try:
-            download_result = download_video(url, progress_callback=on_download_progress)
-            download_done.set()
-        except Exception as e:
-            download_error = e
-            download_done.set()
+    await task_manager.start_task(task_id, task_index)
+    async with scheduler.slot("download", task_id):
+        with span("download", audio_only=audio_only):
+            result = await asyncio.to_thread(
+                download_video, url, workspace.path, on_download_progress, audio_only, info
+            )
+    await task_manager.update_progress(task_id, task_index, 100)
+    await task_manager.complete_task(task_id, task_index)
+    return result
 
-    thread = threading.Thread(target=download_worker)
-    thread.start()
 
-    while not download_done.is_set():
-        await asyncio.sleep(0.3)
+async def _process_url(
+    task_id: str, url: str, websocket=None, action: str = "download_video",
+    outputs: list = None, output_format: str = "md", output_path: str = "", language: str = None
+):
+    """
+    Phase 1 : Analyser l'URL (sans téléchargement), envoyer url_ready, attendre le choix utilisateur.
+    Phase 2 : Si "done", télécharger la vidéo complète ; si cours/résumé, ne télécharger
+              que l'audio et le passer directement à la pipeline.
 
-    thread.join()
+    Si l'action est choisie d'emblée (action autre que "download_video"), il n'y a
+    pas de choix à attendre : l'audio est transcrit pendant son téléchargement.
 
-    if download_error:
-        await task_manager.set_error(task_id, str(download_error))
+    Dans les deux cas, des sous-titres de qualité suffisante sur la source
+    remplacent téléchargement et transcription. Une URL de playlist ou de chaîne
+    est développée en un sous-job par vidéo.
+    """
+    if await asyncio.to_thread(is_playlist_url, url) and await _process_playlist(
+        task_id, url, action, outputs, output_format, output_path, language
+    ):
         return
 
-    await task_manager.update_progress(task_id, 0, 100)
-    await task_manager.complete_task(task_id, 0)
+    if action != "download_video":
+        try:
+            outputs = validate_outputs(outputs or [action])
+        except ValueError:
+            await task_manager.set_error(task_id, f"Action inconnue: {action}")
+            return
+        # Cache des médias d'abord, sinon une seule extraction partagée par sous-titres et téléchargement
+        try:
+            info = await asyncio.to_thread(probe_url, url, True)
+        except ValueError as e:
+            await task_manager.set_error(task_id, str(e))
+            return
+        if await _use_captions(task_id, url, info, outputs, output_format or "md", output_path, language):
+            return
+        await _process_url_live(task_id, url, info, outputs, output_format or "md", output_path)
+        return
 
-    video_path = download_result["file_path"]
-    video_title = download_result["title"]
+    # Phase 1 : Métadonnées
+    task_manager.initialize_tasks(task_id, ["Analyse de l'URL"])
+    await asyncio.sleep(0.3)
+
+    await task_manager.start_task(task_id, 0)
+    try:
+        info = await asyncio.to_thread(probe_url, url)
+    except ValueError as e:
+        await task_manager.set_error(task_id, str(e))
+        return
+    await task_manager.complete_task(task_id, 0)
 
-    # Envoyer download_complete au client
     await task_manager.websocket_manager.send_message(
         task_id,
         {
-            "type": "download_complete",
-            "video_path": video_path,
-            "title": video_title,
+            "type": "url_ready",
+            "title": info["title"],
+            "duration": info["duration"],
         },
     )
 
-    logger.info(f"Download complete, waiting for user choice for task {task_id}")
+    logger.info(f"URL analysed, waiting for user choice for task {task_id}")
 
     # Phase d'attente : recevoir le choix de l'utilisateur via WebSocket
     if websocket is None:
@@ -193,170 +302,627 @@ async def _process_url(task_id: str, url: str, websocket=None):
     output_format = data.get("output_format", "md")
     output_path = data.get("output_path", "")
 
-    # Si "done", terminer avec le chemin de la vidéo
+    # Si "done" : vidéo complète, sortie du dossier de travail (supprimé en fin de tâche)
     if continue_action == "done":
+        task_manager.initialize_tasks(task_id, ["Téléchargement de la vidéo"])
+        await asyncio.sleep(0.3)
+        try:
+            download_result = await _download(task_id, url, 0, audio_only=False)
+        except ValueError as e:
+            await task_manager.set_error(task_id, str(e))
+            return
+
+        video_path = download_result["file_path"]
+        os.makedirs(output_folder, exist_ok=True)
+        kept_path = os.path.join(output_folder, os.path.basename(video_path))
+        await asyncio.to_thread(shutil.move, video_path, kept_path)
+
         await task_manager.websocket_manager.send_message(
             task_id,
             {
                 "type": "complete",
-                "output_path": video_path,
+                "output_path": kept_path,
             },
         )
         logger.info(f"Task {task_id} completed (download only)")
         return
 
-    # Phase 2 : Extraction audio + pipeline
-    if continue_action in ("create_course", "create_summary"):
-        pipeline_task_names = [
-            "Extraction de l'audio",
-            "Normalisation audio",
-            "Transcription",
-            "Génération du contenu",
-            "Export",
-        ]
-        task_manager.initialize_tasks(task_id, pipeline_task_names)
-        await asyncio.sleep(0.3)
+    # Phase 2 : audio seul → pipeline
+    try:
+        outputs = validate_outputs(data.get("outputs") or [continue_action])
+    except ValueError:
+        await task_manager.set_error(task_id, f"Action inconnue: {continue_action}")
+        return
 
-        media = MediaProcessor(video_path)
-        current_task = 0
+    if await _use_captions(
+        task_id, url, info, outputs, output_format, output_path, data.get("language") or language
+    ):
+        return
 
-        # Extraction audio
-        await task_manager.start_task(task_id, current_task)
-        media.extract_audio()
-        await task_manager.complete_task(task_id, current_task)
-        current_task += 1
+    task_manager.initialize_tasks(task_id, ["Téléchargement de l'audio"] + pipeline_task_names(outputs))
+    await asyncio.sleep(0.3)
 
-        await _run_pipeline(
-            task_id, media, continue_action, video_path,
-            output_format, output_path, current_task
-        )
-    else:
-        await task_manager.set_error(task_id, f"Action inconnue: {continue_action}")
+    # Nouvelle extraction : l'attente du choix a pu dépasser la validité des liens de la phase 1
+    try:
+        download_result = await _download(task_id, url, 0, audio_only=True)
+    except ValueError as e:
+        await task_manager.set_error(task_id, str(e))
+        return
 
+    audio_path = download_result["file_path"]
+    media = MediaProcessor(audio_path, task_manager.get_task(task_id).workspace)
 
-async def _run_pipeline(
-    task_id: str, media: MediaProcessor, action: str,
-    source_path: str, output_format: str, output_path: str,
-    current_task: int
-):
-    """
-    Pipeline commune : normalisation → transcription → génération LLM → export.
-    """
-    # ----- Normalisation -----
-    await task_manager.start_task(task_id, current_task)
-    media.normalize_audio()
-    await task_manager.complete_task(task_id, current_task)
-    current_task += 1
-    await asyncio.sleep(0.2)
+    # Le flux audio porte le titre de la vidéo : les fichiers générés en héritent
+    await _run_pipeline(
+        task_id, media, outputs, audio_path,
+        output_format, output_path, 1
+    )
 
-    # ----- Transcription -----
-    await task_manager.start_task(task_id, current_task)
 
-    import threading
+def _job_fraction(task_state) -> float:
+    """Avancement global (0-1) d'un job d'après ses sous-tâches."""
+    if task_state is None or not task_state.tasks:
+        return 0.0
+    done = sum(1 for task in task_state.tasks if task.status == TaskStatus.COMPLETED)
+    running = sum(task.progress for task in task_state.tasks if task.status == TaskStatus.RUNNING) / 100
+    return min((done + running) / len(task_state.tasks), 1.0)
 
-    transcription_result = None
-    transcription_done = threading.Event()
 
-    def transcribe_worker():
-        nonlocal transcription_result
+async def _process_playlist(
+    task_id: str, url: str, action: str, outputs: list,
+    output_format: str, output_path: str, language: str = None
+) -> bool:
+    """
+    Développe une playlist en un sous-job par vidéo, au plus `playlist_concurrency` à la fois.
+
+    Chaque vidéo suit la pipeline URL habituelle (sous-titres, transcription
+    pendant le téléchargement, génération, export) dès que son tour vient ; la
+    tâche parente a une sous-tâche par vidéo et reçoit l'avancement agrégé.
+
+    Returns:
+        False si l'URL n'est finalement pas une playlist (traitement normal)
+    """
+    try:
+        playlist = await asyncio.to_thread(expand_playlist, url)
+    except ValueError as e:
+        await task_manager.set_error(task_id, str(e))
+        return True
+    entries = playlist["entries"]
+    if not entries:
+        return False
+
+    if action != "download_video":
         try:
-            transcription_result = media.transcribe_audio()
-            transcription_done.set()
-        except Exception as e:
-            logger.error(f"Transcription error: {e}")
-            transcription_done.set()
-            raise
+            outputs = validate_outputs(outputs or [action])
+        except ValueError:
+            await task_manager.set_error(task_id, f"Action inconnue: {action}")
+            return True
+
+    # Un fichier par vidéo : la destination est toujours un dossier
+    folder = output_path or os.path.join(output_folder, safe_name(playlist["title"]))
+    os.makedirs(folder, exist_ok=True)
+
+    total = len(entries)
+    task_manager.initialize_tasks(
+        task_id, [f"{index}/{total} {entry['title'] or entry['url']}" for index, entry in enumerate(entries, start=1)]
+    )
+    await task_manager.websocket_manager.send_message(
+        task_id, {"type": "playlist", "title": playlist["title"], "total": total}
+    )
+
+    semaphore = asyncio.Semaphore(max(1, playlist_concurrency))
+    children = {}
+    fractions = [0.0] * total
+    output_files = {}
+    failed = 0
+
+    async def run_entry(index: int, entry: dict):
+        nonlocal failed
+        async with semaphore:
+            child_id = task_manager.create_task(entry["url"], action, output_format, folder)
+            scheduler.attach(child_id, task_id)
+            children[index] = child_id
+            await task_manager.start_task(task_id, index)
+            try:
+                if action == "download_video":
+                    result = await _download(child_id, entry["url"], 0, audio_only=False)
+                    kept_path = os.path.join(folder, os.path.basename(result["file_path"]))
+                    await asyncio.to_thread(shutil.move, result["file_path"], kept_path)
+                    output_files[index] = kept_path
+                else:
+                    await _process_url(
+                        child_id, entry["url"], None, action, outputs, output_format, folder, language
+                    )
+                    child = task_manager.get_task(child_id)
+                    if child.error:
+                        raise RuntimeError(child.error)
+                    output_files[index] = child.output_path
+                fractions[index] = 1.0
+                await task_manager.complete_task(task_id, index)
+            except Exception as e:
+                failed += 1
+                await task_manager.fail_task(task_id, index, str(e))
+            finally:
+                children.pop(index, None)
+                scheduler.release_job(child_id)
+                task_manager.cleanup(child_id)
+
+    async def report_progress():
+        last = None
+        while True:
+            for index, child_id in list(children.items()):
+                fraction = _job_fraction(task_manager.get_task(child_id))
+                if fraction > fractions[index]:
+                    fractions[index] = fraction
+                    await task_manager.update_progress(task_id, index, int(fraction * 100))
+            done = len(output_files)
+            snapshot = (done, failed, int(sum(fractions) / total * 100))
+            if snapshot != last:
+                last = snapshot
+                await task_manager.websocket_manager.send_message(
+                    task_id,
+                    {
+                        "type": "playlist_progress",
+                        "done": done,
+                        "failed": failed,
+                        "running": len(children),
+                        "total": total,
+                        "percent": snapshot[2],
+                    },
+                )
+            await asyncio.sleep(1)
+
+    reporter = asyncio.create_task(report_progress())
+    try:
+        await asyncio.gather(*(run_entry(index, entry) for index, entry in enumerate(entries)))
+    finally:
+        reporter.cancel()
 
-    thread = threading.Thread(target=transcribe_worker)
-    thread.start()
+    await task_manager.websocket_manager.send_message(
+        task_id,
+        {
+            "type": "playlist_progress",
+            "done": len(output_files),
+            "failed": failed,
+            "running": 0,
+            "total": total,
+            "percent": 100,
+        },
+    )
+    if not output_files:
+        await task_manager.set_error(task_id, "Aucune vidéo de la playlist n'a pu être traitée")
+        return True
 
-    progress = 0
-    while not transcription_done.is_set():
-        await asyncio.sleep(0.5)
-        progress = min(progress + 5, 95)
-        await task_manager.update_progress(task_id, current_task, progress)
+    logger.info(f"Playlist {playlist['title']}: {len(output_files)}/{total} videos processed, {failed} failed")
+    # Indexés par position dans la playlist : deux vidéos de même titre ne se confondent pas
+    await task_manager.complete_all(task_id, folder, dict(sorted(output_files.items())))
+    return True
 
-    thread.join()
 
-    await task_manager.update_progress(task_id, current_task, 100)
-    await task_manager.complete_task(task_id, current_task)
-    current_task += 1
-    await asyncio.sleep(0.2)
+async def _use_captions(
+    task_id: str, url: str, info: dict, outputs: list, output_format: str, output_path: str,
+    language: str = None
+) -> bool:
+    """
+    Utilise les sous-titres de la source à la place de Whisper si la politique de qualité l'accepte.
 
-    # ----- Génération LLM -----
-    await task_manager.start_task(task_id, current_task)
+    `info` est le résultat de probe_url() : ses métadonnées yt-dlp servent au
+    choix de la piste. Un média déjà en cache n'est pas concerné (aucun accès
+    réseau, la transcription est elle-même en cache le plus souvent).
 
-    transcription_text = transcription_result.get("text", "")
-    if action == "create_course":
-        prompt = create_course_prompt(transcription_text)
-    else:
-        prompt = create_summary_prompt(transcription_text)
+    Returns:
+        True si la tâche a été traitée à partir des sous-titres, False pour
+        continuer avec la pipeline audio
+    """
+    if not captions_enabled or info["cached"]:
+        return False
 
+    try:
+        found = await asyncio.to_thread(
+            fetch_captions, url, [language] if language else captions_languages, info["info"]
+        )
+    except ValueError as e:
+        # L'erreur sera signalée (ou non) par le téléchargement
+        logger.error(f"Captions lookup failed for task {task_id}: {e}")
+        return False
+
+    caption = found["caption"]
+    if caption is None:
+        logger.info(f"No suitable captions for task {task_id}, using Whisper")
+        return False
+
+    with span("captions.parse", source=caption["source"], language=caption["language"]):
+        transcription_result = parse_captions(caption["content"], caption["ext"], caption["language"])
+        accepted, report = evaluate_captions(transcription_result, found["duration"])
     await task_manager.websocket_manager.send_message(
         task_id,
         {
-            "type": "generation_start",
-            "prompt": "Génération en cours avec DeepSeek...",
+            "type": "captions_report",
+            "used": accepted,
+            "source": caption["source"],
+            "language": caption["language"],
+            **report,
         },
     )
+    if not accepted:
+        logger.info(f"Captions rejected for task {task_id} ({report}), using Whisper")
+        return False
 
-    logger.info(f"Starting LLM generation with {llm_provider}/{llm_model}")
+    logger.info(f"Using {caption['source']} captions for task {task_id} ({report})")
+    task_manager.initialize_tasks(task_id, pipeline_task_names(outputs, mode="captions"))
+    await asyncio.sleep(0.3)
+    await task_manager.start_task(task_id, 0)
 
-    generated_content = ""
-    token_count = 0
+    # Le fichier de sous-titres porte le titre de la vidéo : les fichiers générés en héritent
+    workspace = task_manager.get_task(task_id).workspace
+    caption_path = workspace.path_for(media_filename(found["title"], caption["ext"]))
+    with open(caption_path, "w", encoding="utf-8") as f:
+        f.write(caption["content"])
+
+    await task_manager.update_progress(task_id, 0, 100)
+    await task_manager.complete_task(task_id, 0)
 
-    for token in generate_stream(llm_provider, llm_model, prompt):
-        generated_content += token
-        token_count += 1
+    media = MediaProcessor(caption_path, workspace)
+    media.duration = found["duration"]
+    await _finish_pipeline(
+        task_id, media, outputs, transcription_result,
+        caption_path, output_format, output_path, 1
+    )
+    return True
 
-        if token_count % 3 == 0:
-            await task_manager.websocket_manager.send_message(
-                task_id,
-                {
-                    "type": "generation_token",
-                    "token": token,
-                    "content": generated_content,
-                },
+
+async def _process_url_live(
+    task_id: str, url: str, info: dict, outputs: list, output_format: str, output_path: str
+):
+    """
+    Téléchargement de l'audio, décodage et transcription qui se chevauchent.
+
+    yt-dlp écrit le flux audio dans le pipe de ffmpeg ; chaque fenêtre décodée
+    est transcrite pendant que la suite se télécharge (voir core.live). Un média
+    déjà en cache, ou le mode désactivé, passe par la pipeline habituelle.
+
+    `info` (probe_url() en audio seul) est repris par le téléchargement : l'URL
+    n'est pas extraite une seconde fois.
+    """
+    workspace = task_manager.get_task(task_id).workspace
+
+    if info["cached"] or not live_transcription:
+        task_manager.initialize_tasks(task_id, ["Téléchargement de l'audio"] + pipeline_task_names(outputs))
+        await asyncio.sleep(0.3)
+        try:
+            download_result = await _download(task_id, url, 0, audio_only=True, info=info["info"])
+        except ValueError as e:
+            await task_manager.set_error(task_id, str(e))
+            return
+        audio_path = download_result["file_path"]
+        media = MediaProcessor(audio_path, workspace)
+        await _run_pipeline(task_id, media, outputs, audio_path, output_format, output_path, 1)
+        return
+
+    task_manager.initialize_tasks(task_id, pipeline_task_names(outputs, mode="live"))
+    await asyncio.sleep(0.3)
+
+    loop = asyncio.get_event_loop()
+    duration = info["duration"] or 0
+    audio_path = workspace.path_for(media_filename(info["title"], info["ext"]))
+
+    def on_decoded(decoded_seconds):
+        """Callback appelé depuis le thread de décodage : avancement du téléchargement."""
+        if duration:
+            asyncio.run_coroutine_threadsafe(
+                task_manager.update_progress(task_id, 0, min(int(decoded_seconds / duration * 100), 99)),
+                loop,
             )
-            await asyncio.sleep(0.01)
 
-    await task_manager.websocket_manager.send_message(
-        task_id, {"type": "generation_content", "content": generated_content}
+    def on_transcribed(done_seconds):
+        """Callback appelé à chaque fenêtre transcrite."""
+        percent = int(done_seconds / duration * 100) if duration else 0
+        asyncio.run_coroutine_threadsafe(
+            task_manager.update_progress(
+                task_id, 1, min(percent, 99), {"transcribed_seconds": round(done_seconds, 1)}
+            ),
+            loop,
+        )
+
+    live = LiveTranscription(
+        decode_callback=on_decoded,
+        progress_callback=on_transcribed,
+        segment_callback=lambda segment: _send_segment(task_id, loop, segment),
+    )
+    chunks = stream_download(
+        url, audio_path, {"title": info["title"], "duration": duration, "format": {"ext": info["ext"]}},
+        info["info"],
     )
 
-    await task_manager.update_progress(task_id, current_task, 100)
-    await task_manager.complete_task(task_id, current_task)
-    current_task += 1
+    async def decode():
+        await asyncio.to_thread(live.decode, stream_audio(source=chunks))
+        if not live.stopped:
+            await task_manager.update_progress(task_id, 0, 100)
+            await task_manager.complete_task(task_id, 0)
+
+    await task_manager.start_task(task_id, 0)
+    await task_manager.start_task(task_id, 1)
+    async with scheduler.slot("download", task_id):
+        decoder = asyncio.create_task(decode())
+        try:
+            while True:
+                window = await asyncio.to_thread(live.next_window)
+                if window is None:
+                    break
+                # Le créneau de transcription n'est tenu que le temps d'une fenêtre
+                async with scheduler.slot("transcription", task_id):
+                    await asyncio.to_thread(live.transcribe, *window)
+        except BaseException:
+            live.stop()
+            raise
+        finally:
+            await decoder
+
+    transcription_result = live.result()
+    logger.info(
+        f"Live transcription done for task {task_id}: {live.duration:.1f}s of audio, "
+        f"{len(live.windows)} windows"
+    )
+    STAGE_SECONDS.labels("transcribe").observe(live.transcription_seconds)
+    if live.duration:
+        TRANSCRIPTION_REALTIME_FACTOR.labels("live").observe(live.transcription_seconds / live.duration)
+    await task_manager.update_progress(task_id, 1, 100)
+    await task_manager.complete_task(task_id, 1)
     await asyncio.sleep(0.2)
 
-    # ----- Export -----
+    media = MediaProcessor(audio_path, workspace)
+    media.duration = live.duration
+    await _finish_pipeline(
+        task_id, media, outputs, transcription_result,
+        audio_path, output_format, output_path, 2
+    )
+
+
+def _send_segment(task_id: str, loop, segment: dict) -> None:
+    """Envoie un segment dès son décodage, avant la fin de la transcription (appelé depuis un thread)."""
+    asyncio.run_coroutine_threadsafe(
+        task_manager.websocket_manager.send_message(
+            task_id,
+            {
+                "type": "transcript_segment",
+                "index": segment["id"],
+                "start": round(float(segment["start"]), 2),
+                "end": round(float(segment["end"]), 2),
+                "text": segment["text"].strip(),
+            },
+        ),
+        loop,
+    )
+
+
+async def _run_pipeline(
+    task_id: str, media: MediaProcessor, outputs: list,
+    source_path: str, output_format: str, output_path: str,
+    current_task: int
+):
+    """
+    Pipeline commune : décodage/normalisation → VAD → transcription → génération LLM → export.
+
+    L'audio est décodé et transcrit une seule fois ; les générations LLM de
+    `outputs` tournent en parallèle, chacune sur son propre canal.
+    """
+    # ----- Décodage + normalisation (une seule passe ffmpeg) -----
     await task_manager.start_task(task_id, current_task)
 
-    source_filename = os.path.basename(source_path)
-    source_name = os.path.splitext(source_filename)[0]
+    loop = asyncio.get_event_loop()
+    decode_task_index = current_task
 
-    if os.path.isdir(output_path):
-        output_file = os.path.join(
-            output_path, f"{source_name}_generated.{output_format}"
+    def on_decode_progress(percent):
+        """Callback appelé depuis le thread de décodage."""
+        asyncio.run_coroutine_threadsafe(
+            task_manager.update_progress(task_id, decode_task_index, int(percent)),
+            loop,
         )
-    elif not output_path.endswith(f".{output_format}"):
-        output_file = f"{output_path}.{output_format}"
+
+    async with scheduler.slot("decode", task_id):
+        await asyncio.to_thread(media.ingest_audio, on_decode_progress)
+    await task_manager.complete_task(task_id, current_task)
+    current_task += 1
+    await asyncio.sleep(0.2)
+
+    # ----- Cache de transcription -----
+    cache_key = media.transcription_cache_key()
+    transcription_result = None
+    if transcription_cache_enabled:
+        with span("cache.lookup", "cache"):
+            transcription_result = await asyncio.to_thread(transcription_cache.get, cache_key)
+
+    if transcription_result is not None:
+        logger.info(f"Transcription cache hit for task {task_id}, skipping to generation")
+        skipped_tasks = 2 if vad_enabled else 1
+        for _ in range(skipped_tasks):
+            await task_manager.start_task(task_id, current_task)
+            await task_manager.complete_task(task_id, current_task)
+            current_task += 1
     else:
-        output_file = output_path
+        # ----- Détection de la parole (VAD) -----
+        if vad_enabled:
+            await task_manager.start_task(task_id, current_task)
+            async with scheduler.slot("decode", task_id):
+                vad_report = await asyncio.to_thread(media.detect_speech)
+            await task_manager.websocket_manager.send_message(
+                task_id, {"type": "vad_report", **vad_report.as_dict()}
+            )
+            await task_manager.complete_task(task_id, current_task)
+            current_task += 1
+
+        # ----- Transcription -----
+        await task_manager.start_task(task_id, current_task)
+
+        transcription_task_index = current_task
+
+        def on_transcription_progress(done_seconds, total_seconds):
+            """Callback appelé depuis le thread de transcription à chaque segment décodé."""
+            elapsed = time.perf_counter() - transcription_start
+            details = {"transcribed_seconds": round(done_seconds, 1)}
+            if done_seconds > 0:
+                realtime_factor = elapsed / done_seconds
+                details["realtime_factor"] = round(realtime_factor, 3)
+                details["eta_seconds"] = round(realtime_factor * (total_seconds - done_seconds), 1)
+            percent = int(done_seconds / total_seconds * 100) if total_seconds else 0
+            asyncio.run_coroutine_threadsafe(
+                task_manager.update_progress(
+                    task_id, transcription_task_index, min(percent, 99), details
+                ),
+                loop,
+            )
+
+        def on_transcript_segment(segment):
+            _send_segment(task_id, loop, segment)
+
+        async with scheduler.slot("transcription", task_id):
+            transcription_start = time.perf_counter()
+            transcription_result = await asyncio.to_thread(
+                media.transcribe_audio, on_transcription_progress, on_transcript_segment
+            )
+
+        if transcription_result is None:
+            raise RuntimeError("La transcription a échoué")
+
+        transcription_time = time.perf_counter() - transcription_start
+        STAGE_SECONDS.labels("transcribe").observe(transcription_time)
+        if media.duration:
+            TRANSCRIPTION_REALTIME_FACTOR.labels("file").observe(transcription_time / media.duration)
+            logger.info(
+                f"Transcription real-time factor: {transcription_time / media.duration:.3f} "
+                f"({transcription_time:.1f}s for {media.duration:.1f}s of audio)"
+            )
+
+        if transcription_cache_enabled:
+            with span("cache.store", "cache"):
+                await asyncio.to_thread(transcription_cache.set, cache_key, transcription_result)
+
+        await task_manager.update_progress(task_id, current_task, 100)
+        await task_manager.complete_task(task_id, current_task)
+        current_task += 1
+        await asyncio.sleep(0.2)
+
+    await _finish_pipeline(
+        task_id, media, outputs, transcription_result,
+        source_path, output_format, output_path, current_task
+    )
+
 
-    output_dir = os.path.dirname(output_file)
-    if output_dir:
-        os.makedirs(output_dir, exist_ok=True)
+async def _finish_pipeline(
+    task_id: str, media: MediaProcessor, outputs: list, transcription_result: dict,
+    source_path: str, output_format: str, output_path: str, current_task: int
+):
+    """Compaction → générations LLM en parallèle → export, à partir d'une transcription terminée."""
+    # ----- Compaction (hésitations, répétitions) avant envoi au LLM -----
+    generations = [output for output in outputs if output in GENERATION_OUTPUTS]
+    llm_input = transcription_result
+    if compaction_enabled and generations:
+        with span("compaction"), STAGE_SECONDS.labels("compaction").time():
+            llm_input, compaction_report = await asyncio.to_thread(compact_transcript, transcription_result)
+        await task_manager.websocket_manager.send_message(
+            task_id, {"type": "compaction_report", **compaction_report.as_dict()}
+        )
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(generated_content)
+    # ----- Génération LLM (une sous-tâche et un canal par sortie) -----
+    logger.info(f"Starting LLM generation with {llm_provider}/{llm_model} for {generations}")
+    contents = await asyncio.gather(
+        *(
+            _generate(task_id, current_task + index, action, llm_input)
+            for index, action in enumerate(generations)
+        )
+    )
+    generated = dict(zip(generations, contents))
+    current_task += len(generations)
+    await asyncio.sleep(0.2)
 
-    logger.info(f"File saved to {output_file}")
+    # ----- Export -----
+    await task_manager.start_task(task_id, current_task)
 
+    export_start = time.perf_counter()
+    with span("export", outputs=len(outputs)):
+        distinct = len(outputs) > 1
+        output_files = {}
+        for output in outputs:
+            if output in GENERATION_OUTPUTS:
+                extension, content = output_format, generated[output]
+                suffix = OUTPUT_SUFFIXES[output] if distinct else "generated"
+            else:
+                # Les exports de transcription partent du texte brut, pas de la version compactée
+                extension, render = TRANSCRIPT_EXPORTS[output]
+                content = render(transcription_result.get("segments", []))
+                suffix = OUTPUT_SUFFIXES[output]
+
+            output_file = resolve_output_file(source_path, output_path, extension, suffix, distinct)
+            output_dir = os.path.dirname(output_file)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+
+            with open(output_file, "w", encoding="utf-8") as f:
+                f.write(content)
+
+            logger.info(f"File saved to {output_file}")
+            output_files[output] = output_file
+
+    STAGE_SECONDS.labels("export").observe(time.perf_counter() - export_start)
     media.clean_temp()
 
     await task_manager.complete_task(task_id, current_task)
     await asyncio.sleep(1)
-    await task_manager.complete_all(task_id, output_file)
+    await task_manager.complete_all(task_id, output_files[outputs[0]], output_files)
 
     logger.info(f"Task {task_id} completed successfully")
+
+
+async def _generate(task_id: str, task_index: int, action: str, transcription_result: dict) -> str:
+    """Génère un cours ou un résumé, diffusé au client sur le canal `action`."""
+    await task_manager.start_task(task_id, task_index)
+
+    transcription_text = transcription_result.get("text", "")
+
+    await task_manager.websocket_manager.send_message(
+        task_id,
+        {
+            "type": "generation_start",
+            "prompt": "Génération en cours avec DeepSeek...",
+            "channel": action,
+        },
+    )
+
+    generated_content = ""
+
+    with span("generate", "llm", output=action):
+        if is_long_input(transcription_text):
+            # Transcription longue : notes par morceau en parallèle (map), puis assemblage (reduce).
+            # Chaque appel map prend son propre créneau "llm"
+            async def on_chunk_done(done, total):
+                await task_manager.update_progress(
+                    task_id, task_index, int(done / total * 50),
+                    {"chunks_done": done, "chunks_total": total},
+                )
+
+            segments = transcription_result.get("segments") or sentences_as_segments(transcription_text)
+            notes = await map_transcript(
+                llm_provider, llm_model, action, segments, progress_callback=on_chunk_done,
+                slot=lambda: scheduler.slot("llm", task_id),
+            )
+            prompt = create_reduce_prompt(action, notes)
+        elif action == "create_course":
+            prompt = create_course_prompt(transcription_text)
+        else:
+            prompt = create_summary_prompt(transcription_text)
+
+        async def send(message):
+            await task_manager.websocket_manager.send_message(task_id, message)
+
+        # Seul le texte ajouté est envoyé, regroupé par fenêtres de stream_coalesce_ms
+        stream = DeltaStream(send, extra={"channel": action})
+        async with scheduler.slot("llm", task_id):
+            async for token in agenerate_stream(llm_provider, llm_model, prompt):
+                generated_content += token
+                await stream.push(token)
+
+    await stream.close()
+
+    await task_manager.update_progress(task_id, task_index, 100)
+    await task_manager.complete_task(task_id, task_index)
+    return generated_content
@@ -0,0 +1,179 @@
+"""
+Ordonnanceur central des jobs : un nombre de créneaux borné par étape.
+
+Chaque job (une connexion WebSocket) réserve un créneau de l'étape qu'il
+s'apprête à exécuter — téléchargement réseau, décodage CPU, transcription,
+appel LLM — puis le libère aussitôt l'étape terminée. Les étapes de jobs
+différents se chevauchent donc : le décodage du job B tourne pendant la
+transcription du job A, et l'appel LLM du job C pendant les deux.
+
+Les créneaux libérés sont attribués par priorité puis par ordre d'arrivée.
+Au-delà de `max_jobs` jobs admis simultanément, les nouveaux sont refusés
+(contrôle d'admission) plutôt que d'empiler des threads.
+
+Usage:
+    from core.scheduler import scheduler, SchedulerFull
+
+    scheduler.admit(task_id, priority="high")   # lève SchedulerFull si saturé
+    async with scheduler.slot("transcription", task_id):
+        result = await asyncio.to_thread(media.transcribe_audio)
+    scheduler.release_job(task_id)
+
+    scheduler.stats()                           # profondeur de file et attente par étape
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Tuple
+
+from logger import setup_logger
+from metrics import SCHEDULER_WAIT_SECONDS
+from tracing import span
+from config import (
+    download_workers,
+    decode_workers,
+    transcription_workers,
+    llm_workers,
+    max_jobs,
+)
+
+logger = setup_logger(__name__)
+
+# Plus la valeur est basse, plus le job est servi tôt
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+DEFAULT_PRIORITY = "normal"
+
+
+class SchedulerFull(Exception):
+    """Levée quand le nombre maximal de jobs simultanés est atteint."""
+
+
+class Stage:
+    """Étape de la pipeline avec `workers` créneaux et une file d'attente à priorité."""
+
+    def __init__(self, name: str, workers: int) -> None:
+        self.name = name
+        self.workers = max(1, workers)
+        self.running = 0
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future in self._queue if not future.done())
+
+    async def acquire(self, priority: int) -> float:
+        """Attend un créneau libre et renvoie le temps d'attente (secondes)."""
+        start = time.perf_counter()
+        if self.running < self.workers and not self.queued:
+            self.running += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._queue, (priority, next(self._sequence), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                # Le créneau a pu être transmis juste avant l'annulation : le rendre
+                if future.done() and not future.cancelled():
+                    self.release()
+                raise
+
+        wait = time.perf_counter() - start
+        self.acquired += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        SCHEDULER_WAIT_SECONDS.labels(self.name).observe(wait)
+        return wait
+
+    def release(self) -> None:
+        """Transmet le créneau au prochain job en attente, ou le libère."""
+        while self._queue:
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.running -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queued": self.queued,
+            "acquired": self.acquired,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 1) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+        }
+
+
+class JobScheduler:
+    """Admission des jobs et créneaux par étape, partagés par toutes les connexions."""
+
+    def __init__(self, stage_workers: Dict[str, int], max_jobs: int) -> None:
+        self.stages = {name: Stage(name, workers) for name, workers in stage_workers.items()}
+        self.max_jobs = max_jobs
+        self._jobs: Dict[str, int] = {}
+        # Sous-jobs (vidéos d'une playlist) : priorité du job parent, sans compter dans max_jobs
+        self._children: Dict[str, int] = {}
+        self.rejected = 0
+
+    def admit(self, task_id: str, priority: str = DEFAULT_PRIORITY) -> None:
+        """Enregistre un job, ou lève SchedulerFull si `max_jobs` est atteint."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        if len(self._jobs) >= self.max_jobs:
+            self.rejected += 1
+            raise SchedulerFull(
+                f"Serveur saturé ({self.max_jobs} traitements en cours), réessayez plus tard"
+            )
+        self._jobs[task_id] = PRIORITIES[priority]
+
+    def attach(self, child_id: str, parent_id: str) -> None:
+        """Rattache un sous-job à un job admis : il hérite de sa priorité."""
+        self._children[child_id] = self._jobs.get(parent_id, PRIORITIES[DEFAULT_PRIORITY])
+
+    def release_job(self, task_id: str) -> None:
+        self._jobs.pop(task_id, None)
+        self._children.pop(task_id, None)
+
+    @asynccontextmanager
+    async def slot(self, stage_name: str, task_id: str):
+        """Réserve un créneau de l'étape pour la durée du bloc."""
+        stage = self.stages[stage_name]
+        priority = self._jobs.get(task_id, self._children.get(task_id, PRIORITIES[DEFAULT_PRIORITY]))
+        with span(f"wait {stage_name} slot", "scheduler"):
+            wait = await stage.acquire(priority)
+        if wait > 0.1:
+            logger.info(f"Task {task_id} waited {wait:.1f}s for a {stage_name} slot")
+        try:
+            yield
+        finally:
+            stage.release()
+
+    def stats(self) -> dict:
+        return {
+            "jobs": {
+                "active": len(self._jobs),
+                "children": len(self._children),
+                "max": self.max_jobs,
+                "rejected": self.rejected,
+            },
+            "stages": {name: stage.stats() for name, stage in self.stages.items()},
+        }
+
+
+scheduler = JobScheduler(
+    {
+        "download": download_workers,
+        "decode": decode_workers,
+        "transcription": transcription_workers,
+        "llm": llm_workers,
+    },
+    max_jobs,
+)
@@ -0,0 +1,136 @@
+"""
+Protocole de streaming de la génération : deltas regroupés dans le temps.
+
+Au lieu de renvoyer tout le contenu généré à chaque token, seuls les
+caractères ajoutés depuis la trame précédente sont envoyés, et les tokens
+arrivés pendant une fenêtre de `window_ms` sont regroupés dans une seule
+trame. Chaque trame porte un numéro de séquence croissant : le client
+détecte ainsi une trame manquante et se resynchronise sur le message
+`generation_content` final, qui contient le texte complet.
+
+Messages:
+    {"type": "generation_delta", "seq": 12, "delta": "texte ajouté"}
+    {"type": "generation_content", "seq": 12, "content": "texte complet"}
+
+Usage:
+    from core.streaming import DeltaStream
+
+    stream = DeltaStream(send)           # send: coroutine (message: dict) -> None
+    async for token in agenerate_stream(...):
+        await stream.push(token)
+    await stream.close()                 # vide le tampon et envoie generation_content
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from logger import setup_logger
+from config import stream_coalesce_ms
+
+logger = setup_logger(__name__)
+
+Send = Callable[[dict], Awaitable[None]]
+
+
+class DeltaStream:
+    """Regroupe les tokens d'une génération en trames delta numérotées."""
+
+    def __init__(self, send: Send, window_ms: float = stream_coalesce_ms, extra: Optional[dict] = None) -> None:
+        self.send = send
+        self.window = window_ms / 1000
+        # Champs ajoutés à chaque message (ex: canal de sortie)
+        self.extra = extra or {}
+        self.seq = 0
+        self.content = ""
+        self._pending: List[str] = []
+        self._last_flush = 0.0
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def push(self, token: str) -> None:
+        """Ajoute un token ; la trame part dès que la fenêtre est écoulée."""
+        self._pending.append(token)
+        self.content += token
+        remaining = self.window - (time.monotonic() - self._last_flush)
+        if remaining <= 0:
+            await self.flush()
+        elif self._timer is None:
+            # Flux lent : ne pas garder le texte en attente jusqu'au token suivant
+            self._timer = asyncio.create_task(self._flush_later(remaining))
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._pending:
+                return
+            delta = "".join(self._pending)
+            self._pending.clear()
+            self.seq += 1
+            self._last_flush = time.monotonic()
+            await self.send({"type": "generation_delta", "seq": self.seq, "delta": delta, **self.extra})
+
+    async def close(self) -> None:
+        """Envoie le reste du tampon puis le contenu complet (point de resynchronisation)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+        await self.send({"type": "generation_content", "seq": self.seq, "content": self.content, **self.extra})
+
+
+if __name__ == "__main__":
+    # Benchmark : octets envoyés et CPU serveur (encodage JSON) pour une génération
+    # de 20k tokens, ancien protocole (contenu complet tous les 3 tokens) vs deltas.
+    # Usage: python -m core.streaming [tokens] [tokens_par_seconde]
+    import json
+    import random
+    import sys
+
+    total_tokens = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    tokens_per_second = float(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    random.seed(0)
+    words = ["la", "dérivée", "fonction", "limite", "intégrale", "théorème", "donc", "on", "voit", "que"]
+    tokens = [" " + random.choice(words) for _ in range(total_tokens)]
+
+    class Counter:
+        def __init__(self) -> None:
+            self.bytes = 0
+            self.messages = 0
+
+        async def send(self, message: dict) -> None:
+            # Même encodage que WebSocket.send_json
+            self.bytes += len(json.dumps(message, separators=(",", ":")).encode("utf-8"))
+            self.messages += 1
+
+    async def legacy(counter: Counter) -> None:
+        content = ""
+        for count, token in enumerate(tokens, start=1):
+            content += token
+            if count % 3 == 0:
+                await counter.send({"type": "generation_token", "token": token, "content": content})
+            await asyncio.sleep(1 / tokens_per_second)
+        await counter.send({"type": "generation_content", "content": content})
+
+    async def delta(counter: Counter) -> None:
+        stream = DeltaStream(counter.send)
+        for token in tokens:
+            await stream.push(token)
+            await asyncio.sleep(1 / tokens_per_second)
+        await stream.close()
+
+    for label, protocol in (("legacy", legacy), ("delta", delta)):
+        counter = Counter()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        asyncio.run(protocol(counter))
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        print(
+            f"{label:<7} {counter.messages:>6} messages  {counter.bytes / 1e6:9.2f} MB  "
+            f"cpu {cpu:6.2f}s  wall {wall:6.1f}s"
+        )
@@ -0,0 +1,15 @@
+"""
+Estimation du nombre de tokens d'un texte, sans dépendance externe.
+
+Usage:
+    from core.tokens import estimate_tokens
+
+    budget_restant = max_tokens - estimate_tokens(texte)
+"""
+
+# Estimation grossière mais sans dépendance : ~4 caractères par token
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
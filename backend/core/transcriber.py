@@ -0,0 +1,438 @@
+"""
+Backends de transcription interchangeables et pool de modèles résidents.
+
+Chaque backend implémente l'interface Transcriber et renvoie la même
+structure que whisper.transcribe() : {"text", "segments", "language"}.
+Les modèles chargés restent en mémoire dans un pool LRU borné (nombre de
+modèles et mémoire estimée), préchauffé au démarrage de FastAPI.
+
+Usage:
+    from core.transcriber import get_transcriber, model_pool
+
+    transcriber = get_transcriber()            # backend et modèle de config.json
+    result = transcriber.transcribe(audio)     # np.ndarray float32 16 kHz
+
+    model_pool.loaded()                        # modèles résidents
+"""
+
+import importlib.util
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from logger import setup_logger
+from config import (
+    transcription_backend,
+    whisper_model,
+    pool_max_models,
+    pool_max_memory_mb,
+)
+
+logger = setup_logger(__name__)
+
+SAMPLE_RATE = 16000
+
+# Empreinte mémoire approximative d'un modèle chargé (Mo), utilisée par le pool
+MODEL_MEMORY_MB = {
+    "tiny": 150,
+    "base": 300,
+    "small": 1000,
+    "medium": 2600,
+    "large-v1": 4500,
+    "large-v2": 4500,
+    "large-v3": 4500,
+    "large-v3-turbo": 1800,
+}
+DEFAULT_MODEL_MEMORY_MB = 2000
+
+
+# whisper et mlx-whisper ne rendent la main qu'en fin de transcription. Quand
+# l'appelant suit la progression ou les segments, l'audio leur est donné par
+# fenêtres d'environ PROGRESS_WINDOW_SECONDS coupées sur les silences (même
+# découpage et recollage que core.chunked) : chaque fenêtre terminée est relayée.
+PROGRESS_WINDOW_SECONDS = 60
+PROGRESS_OVERLAP_SECONDS = 2.0
+
+
+ProgressCallback = Callable[[float], None]
+SegmentCallback = Callable[[dict], None]
+
+
+class Transcriber(ABC):
+    """Interface commune des backends de transcription."""
+
+    name = ""
+
+    def __init__(self, model_name: str) -> None:
+        self.model_name = model_name
+        self.loaded_at: Optional[float] = None
+        # Les modèles ne sont pas garantis thread-safe : un appel à la fois par instance
+        self._lock = threading.Lock()
+
+    @property
+    def memory_mb(self) -> int:
+        return MODEL_MEMORY_MB.get(self.model_name, DEFAULT_MODEL_MEMORY_MB)
+
+    def load(self) -> None:
+        """Charge le modèle en mémoire (appelé une seule fois par le pool)."""
+        start = time.perf_counter()
+        self._load()
+        self.loaded_at = time.time()
+        logger.info(
+            f"Loaded {self.name} model {self.model_name} in {time.perf_counter() - start:.1f}s"
+        )
+
+    def unload(self) -> None:
+        """
+        Libère le modèle (éviction du pool).
+
+        Prend le même verrou que transcribe() : un modèle évincé pendant un job
+        n'est libéré qu'une fois la transcription en cours terminée.
+        """
+        with self._lock:
+            if self.loaded_at is None:
+                return
+            self._unload()
+            self.loaded_at = None
+
+    def transcribe(
+        self,
+        audio: np.ndarray,
+        language: Optional[str] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        segment_callback: Optional[SegmentCallback] = None,
+    ) -> dict:
+        """
+        Transcrit un buffer float32 mono 16 kHz.
+
+        Args:
+            progress_callback: Appelé avec la fin (en secondes) du dernier segment décodé
+            segment_callback: Appelé avec chaque segment (id, start, end, text) dès son décodage
+
+        Returns:
+            dict: text, segments (start/end en secondes) et language
+        """
+        with self._lock:
+            if self.loaded_at is None:
+                # Évincé entre get_transcriber() et cet appel : rechargé pour ce job
+                logger.warning(f"{self.name} model {self.model_name} was evicted, reloading it")
+                self.load()
+            return self._transcribe(audio, language, progress_callback, segment_callback)
+
+    @abstractmethod
+    def _load(self) -> None:
+        ...
+
+    def _unload(self) -> None:
+        """Libère les ressources du modèle (appelé sous le verrou de l'instance)."""
+
+    @abstractmethod
+    def _transcribe(
+        self,
+        audio: np.ndarray,
+        language: Optional[str],
+        progress_callback: Optional[ProgressCallback],
+        segment_callback: Optional[SegmentCallback],
+    ) -> dict:
+        ...
+
+
+class _WindowedTranscriber(Transcriber):
+    """Backend qui transcrit d'un bloc : progression et segments relayés fenêtre par fenêtre."""
+
+    @abstractmethod
+    def _transcribe_window(self, audio: np.ndarray, language: Optional[str]) -> dict:
+        ...
+
+    def _transcribe(self, audio, language, progress_callback, segment_callback) -> dict:
+        if progress_callback is None and segment_callback is None:
+            return self._transcribe_window(audio, language)
+
+        # Import local : core.chunked importe ce module
+        from core.chunked import plan_windows, stitch_windows
+
+        windows = plan_windows(audio, SAMPLE_RATE, PROGRESS_WINDOW_SECONDS, PROGRESS_OVERLAP_SECONDS)
+        results: List[dict] = []
+        emitted = 0
+        for window in windows:
+            result = self._transcribe_window(audio[window.start:window.end], language)
+            # La première fenêtre fixe la langue, imposée ensuite aux suivantes
+            language = language or result.get("language")
+            results.append(result)
+            if segment_callback:
+                segments = stitch_windows(windows[:len(results)], results)
+                for segment in segments[emitted:]:
+                    segment_callback(dict(segment))
+                emitted = len(segments)
+            if progress_callback:
+                progress_callback(window.end / SAMPLE_RATE)
+
+        segments = stitch_windows(windows, results)
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": language,
+        }
+
+
+class MLXTranscriber(_WindowedTranscriber):
+    """
+    mlx-whisper, accéléré par Metal sur Apple Silicon.
+
+    mlx_whisper.transcribe() ne prend pas de modèle en argument : il passe par
+    ModelHolder, qui n'en garde qu'un seul. Chaque instance garde donc son
+    propre modèle et l'installe dans ModelHolder juste avant de transcrire :
+    plusieurs modèles mlx restent résidents dans le pool sans rechargement.
+    """
+
+    name = "mlx"
+    # ModelHolder est global : un seul appel mlx à la fois, tous modèles confondus
+    _holder_lock = threading.Lock()
+
+    @property
+    def repo_id(self) -> str:
+        return f"mlx-community/whisper-{self.model_name}"
+
+    def _load(self) -> None:
+        import mlx.core as mx
+        from mlx_whisper.load_models import load_model
+
+        # Même dtype que celui demandé par mlx_whisper.transcribe() (fp16 par défaut)
+        self.model = load_model(self.repo_id, dtype=mx.float16)
+
+    def _unload(self) -> None:
+        from mlx_whisper.transcribe import ModelHolder
+
+        with self._holder_lock:
+            if ModelHolder.model is self.model:
+                ModelHolder.model = None
+                ModelHolder.model_path = None
+        self.model = None
+
+    def _transcribe_window(self, audio, language) -> dict:
+        import mlx_whisper
+        from mlx_whisper.transcribe import ModelHolder
+
+        with self._holder_lock:
+            ModelHolder.model = self.model
+            ModelHolder.model_path = self.repo_id
+            # verbose=None : ni texte ni barre de progression sur la console
+            return mlx_whisper.transcribe(
+                audio, path_or_hf_repo=self.repo_id, language=language, verbose=None
+            )
+
+
+class WhisperTranscriber(_WindowedTranscriber):
+    """openai-whisper (PyTorch), sur GPU CUDA si disponible, sinon CPU."""
+
+    name = "whisper"
+
+    def _load(self) -> None:
+        import torch
+        import whisper
+
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.model = whisper.load_model(self.model_name, device=self.device)
+
+    def _unload(self) -> None:
+        self.model = None
+
+    def _transcribe_window(self, audio, language) -> dict:
+        # verbose=None : ni texte ni barre de progression sur la console
+        return self.model.transcribe(
+            np.asarray(audio, dtype=np.float32), language=language, fp16=self.device == "cuda", verbose=None
+        )
+
+
+class FasterWhisperTranscriber(Transcriber):
+    """faster-whisper (CTranslate2) : float16 sur GPU CUDA si disponible, sinon quantifié int8 sur CPU."""
+
+    name = "faster-whisper"
+
+    def _load(self) -> None:
+        import ctranslate2
+        from faster_whisper import WhisperModel
+
+        self.device = "cuda" if ctranslate2.get_cuda_device_count() else "cpu"
+        compute_type = "float16" if self.device == "cuda" else "int8"
+        self.model = WhisperModel(self.model_name, device=self.device, compute_type=compute_type)
+
+    def _unload(self) -> None:
+        self.model = None
+
+    def _transcribe(self, audio, language, progress_callback, segment_callback) -> dict:
+        segments_iter, info = self.model.transcribe(
+            np.asarray(audio, dtype=np.float32), language=language
+        )
+        # Les segments sont décodés à la demande : la progression suit l'itération
+        segments = []
+        for segment in segments_iter:
+            segments.append(
+                {"id": len(segments), "start": segment.start, "end": segment.end, "text": segment.text}
+            )
+            if segment_callback:
+                segment_callback(dict(segments[-1]))
+            if progress_callback:
+                progress_callback(segment.end)
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": info.language,
+        }
+
+
+class FakeTranscriber(Transcriber):
+    """
+    Backend déterministe pour les tests : un segment toutes les
+    `segment_seconds` secondes d'audio, sans aucun modèle.
+    """
+
+    name = "fake"
+    segment_seconds = 5.0
+    # Durée simulée de transcription par seconde d'audio (0 = instantané)
+    realtime_factor = 0.0
+
+    @property
+    def memory_mb(self) -> int:
+        return 0
+
+    def _load(self) -> None:
+        pass
+
+    def _transcribe(self, audio, language, progress_callback, segment_callback) -> dict:
+        duration = len(audio) / SAMPLE_RATE
+
+        segments = []
+        start = 0.0
+        while start < duration:
+            end = min(start + self.segment_seconds, duration)
+            if self.realtime_factor:
+                time.sleep((end - start) * self.realtime_factor)
+            segments.append(
+                {"id": len(segments), "start": start, "end": end, "text": f" Segment {len(segments)}."}
+            )
+            if segment_callback:
+                segment_callback(dict(segments[-1]))
+            if progress_callback:
+                progress_callback(end)
+            start = end
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": language or "fr",
+        }
+
+
+TRANSCRIBERS = {
+    cls.name: cls
+    for cls in (MLXTranscriber, WhisperTranscriber, FasterWhisperTranscriber, FakeTranscriber)
+}
+
+
+def resolve_backend(backend: str) -> str:
+    """Résout "auto" : mlx si installé, puis faster-whisper, puis openai-whisper."""
+    if backend != "auto":
+        if backend not in TRANSCRIBERS:
+            raise ValueError(f"Unknown transcription backend: {backend}")
+        return backend
+    if importlib.util.find_spec("mlx_whisper") is not None:
+        return "mlx"
+    if importlib.util.find_spec("faster_whisper") is not None:
+        return "faster-whisper"
+    return "whisper"
+
+
+class ModelPool:
+    """
+    Pool LRU de modèles résidents, indexé par (backend, modèle).
+
+    Au-delà de `max_models` ou de `max_memory_mb` (mémoire estimée), les
+    modèles les moins récemment utilisés sont déchargés.
+    """
+
+    def __init__(self, max_models: int, max_memory_mb: int) -> None:
+        self.max_models = max_models
+        self.max_memory_mb = max_memory_mb
+        self._models: "OrderedDict[Tuple[str, str], Transcriber]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def get(self, backend: str, model_name: str) -> Transcriber:
+        """Renvoie le transcripteur demandé, en le chargeant si nécessaire."""
+        key = (resolve_backend(backend), model_name)
+
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        # Chargement hors du verrou global : deux modèles différents peuvent charger en parallèle
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key]
+
+            transcriber = TRANSCRIBERS[key[0]](model_name)
+            transcriber.load()
+
+            with self._lock:
+                self._models[key] = transcriber
+                self._loading.pop(key, None)
+                evicted = self._evict(keep=key)
+            # Hors du verrou du pool : unload() attend la fin d'une transcription en cours
+            for old in evicted:
+                old.unload()
+            return transcriber
+
+    def warm(self, backend: str, model_name: str) -> None:
+        """Précharge un modèle (appelé au démarrage de l'application)."""
+        self.get(backend, model_name)
+
+    def _evict(self, keep: Tuple[str, str]) -> List[Transcriber]:
+        """Retire du pool les modèles en trop et les renvoie, à décharger par l'appelant."""
+        def over_budget() -> bool:
+            used = sum(model.memory_mb for model in self._models.values())
+            return len(self._models) > self.max_models or used > self.max_memory_mb
+
+        evicted = []
+        for key in list(self._models.keys()):
+            if not over_budget():
+                break
+            if key == keep:
+                continue
+            evicted.append(self._models.pop(key))
+            logger.info(f"Evicted {key[0]} model {key[1]} from model pool")
+        return evicted
+
+    def loaded(self) -> List[dict]:
+        """Modèles résidents, du moins au plus récemment utilisé."""
+        with self._lock:
+            return [
+                {
+                    "backend": backend,
+                    "model": model_name,
+                    "memory_mb": transcriber.memory_mb,
+                    "loaded_at": transcriber.loaded_at,
+                }
+                for (backend, model_name), transcriber in self._models.items()
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            models = list(self._models.values())
+            self._models.clear()
+        for transcriber in models:
+            transcriber.unload()
+
+
+model_pool = ModelPool(pool_max_models, pool_max_memory_mb)
+
+
+def get_transcriber(backend: Optional[str] = None, model_name: Optional[str] = None) -> Transcriber:
+    """Transcripteur résident pour le backend/modèle donnés (config.json par défaut)."""
+    return model_pool.get(backend or transcription_backend, model_name or whisper_model)
@@ -0,0 +1,216 @@
+"""
+Détection d'activité vocale (VAD) par énergie, exécutée avant Whisper.
+
+Les longs silences (pauses, travail en autonomie, attente avant le cours) sont
+retirés : seules les zones de parole sont concaténées et transcrites, puis les
+timestamps des segments sont ramenés sur la timeline d'origine.
+
+Usage:
+    from core.vad import detect_speech, SpeechTimeline
+
+    timeline = SpeechTimeline(detect_speech(audio), total_frames=len(audio))
+    # spill_path : un audio en memmap est condensé dans un memmap, pas en RAM
+    result = transcribe(timeline.condense(audio, spill_path="workspace/speech_audio.f32"))
+    result = timeline.remap_result(result)
+"""
+
+import bisect
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+NOISE_FLOOR_PERCENTILE = 10
+THRESHOLD_MARGIN_DB = 10.0
+# Bornes du seuil : l'audio est normalisé en crête avant la VAD
+MIN_THRESHOLD_DBFS = -60.0
+MAX_THRESHOLD_DBFS = -35.0
+MIN_SPEECH_MS = 250
+SPEECH_PAD_MS = 300
+
+Region = Tuple[int, int]
+
+
+def frame_energies(audio: np.ndarray, frame_length: int, block_frames: int = SAMPLE_RATE * 30) -> np.ndarray:
+    """
+    Énergie (dBFS) de chaque trame, calculée bloc par bloc pour rester
+    compatible avec un memmap.
+    """
+    block_frames -= block_frames % frame_length
+    energies = []
+    for start in range(0, len(audio) - frame_length + 1, block_frames):
+        block = np.asarray(audio[start:start + block_frames], dtype=np.float32)
+        usable = len(block) - len(block) % frame_length
+        frames = block[:usable].reshape(-1, frame_length)
+        energies.append(10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10))
+    if not energies:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(energies)
+
+
+def detect_speech(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    min_silence_ms: int = 700,
+    min_speech_ms: int = MIN_SPEECH_MS,
+    pad_ms: int = SPEECH_PAD_MS,
+) -> List[Region]:
+    """
+    Découpe l'audio en zones de parole.
+
+    Le seuil s'adapte au bruit de fond (percentile bas des énergies de trame),
+    les silences plus courts que `min_silence_ms` sont conservés pour ne pas
+    hacher les phrases.
+
+    Returns:
+        Liste de (début, fin) en échantillons, triée et sans chevauchement
+    """
+    frame_length = sample_rate * FRAME_MS // 1000
+    energies = frame_energies(audio, frame_length)
+    if len(energies) == 0:
+        return []
+
+    noise_floor = float(np.percentile(energies, NOISE_FLOOR_PERCENTILE))
+    threshold = min(max(noise_floor + THRESHOLD_MARGIN_DB, MIN_THRESHOLD_DBFS), MAX_THRESHOLD_DBFS)
+    voiced = energies > threshold
+
+    # ----- Trames → zones brutes ----- #
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    # ----- Fusion des silences courts, rejet des zones trop brèves ----- #
+    max_gap = min_silence_ms // FRAME_MS
+    min_length = min_speech_ms // FRAME_MS
+    merged: List[List[int]] = []
+    for start, end in zip(starts, ends):
+        if merged and start - merged[-1][1] <= max_gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    pad = sample_rate * pad_ms // 1000
+    regions: List[Region] = []
+    for start, end in merged:
+        if end - start < min_length:
+            continue
+        region_start = max(0, int(start) * frame_length - pad)
+        region_end = min(len(audio), int(end) * frame_length + pad)
+        if regions and region_start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], region_end)
+        else:
+            regions.append((region_start, region_end))
+
+    logger.info(
+        f"VAD: noise floor {noise_floor:.1f} dBFS, threshold {threshold:.1f} dBFS, "
+        f"{len(regions)} speech regions"
+    )
+    return regions
+
+
+@dataclass
+class VadReport:
+    total_duration: float
+    speech_duration: float
+    regions: int
+
+    @property
+    def skipped_duration(self) -> float:
+        return self.total_duration - self.speech_duration
+
+    @property
+    def skipped_ratio(self) -> float:
+        if self.total_duration == 0:
+            return 0.0
+        return self.skipped_duration / self.total_duration
+
+    def as_dict(self) -> dict:
+        return {
+            "total_duration": round(self.total_duration, 2),
+            "speech_duration": round(self.speech_duration, 2),
+            "skipped_duration": round(self.skipped_duration, 2),
+            "skipped_percent": round(self.skipped_ratio * 100, 1),
+            "regions": self.regions,
+        }
+
+
+class SpeechTimeline:
+    """Correspondance entre l'audio condensé (parole seule) et la timeline d'origine."""
+
+    def __init__(self, regions: List[Region], total_frames: int, sample_rate: int = SAMPLE_RATE) -> None:
+        self.regions = regions
+        self.total_frames = total_frames
+        self.sample_rate = sample_rate
+
+        # Début de chaque zone dans l'audio condensé, en secondes
+        self._condensed_starts: List[float] = []
+        self._original_starts: List[float] = []
+        position = 0
+        for start, end in regions:
+            self._condensed_starts.append(position / sample_rate)
+            self._original_starts.append(start / sample_rate)
+            position += end - start
+        self.speech_frames = position
+
+    @property
+    def report(self) -> VadReport:
+        return VadReport(
+            total_duration=self.total_frames / self.sample_rate,
+            speech_duration=self.speech_frames / self.sample_rate,
+            regions=len(self.regions),
+        )
+
+    def condense(self, audio: np.ndarray, spill_path: str = None, block_frames: int = SAMPLE_RATE * 30) -> np.ndarray:
+        """
+        Concatène les zones de parole en un seul buffer float32.
+
+        Un audio déjà débordé sur disque (memmap) n'est pas recopié en mémoire :
+        si `spill_path` est fourni, les zones y sont écrites bloc par bloc et le
+        résultat est un memmap en lecture seule.
+        """
+        if not self.regions:
+            return np.zeros(0, dtype=np.float32)
+        if spill_path is None or not isinstance(audio, np.memmap):
+            return np.concatenate([audio[start:end] for start, end in self.regions]).astype(np.float32, copy=False)
+
+        condensed = np.memmap(spill_path, dtype=np.float32, mode="w+", shape=(self.speech_frames,))
+        position = 0
+        for start, end in self.regions:
+            for block_start in range(start, end, block_frames):
+                block = audio[block_start:min(block_start + block_frames, end)]
+                condensed[position:position + len(block)] = block
+                position += len(block)
+        condensed.flush()
+        del condensed
+        return np.memmap(spill_path, dtype=np.float32, mode="r", shape=(self.speech_frames,))
+
+    def to_original(self, seconds: float, is_end: bool = False) -> float:
+        """
+        Convertit un instant de l'audio condensé en instant d'origine.
+
+        Une fin de segment tombant pile sur une jonction reste rattachée à la
+        zone précédente plutôt que de sauter au début de la suivante.
+        """
+        if not self.regions:
+            return seconds
+        if is_end:
+            index = bisect.bisect_left(self._condensed_starts, seconds) - 1
+        else:
+            index = bisect.bisect_right(self._condensed_starts, seconds) - 1
+        index = max(index, 0)
+        return self._original_starts[index] + seconds - self._condensed_starts[index]
+
+    def remap_result(self, result: dict) -> dict:
+        """Ramène les timestamps des segments (et des mots) sur la timeline d'origine."""
+        for segment in result.get("segments", []):
+            segment["start"] = self.to_original(segment["start"])
+            segment["end"] = self.to_original(segment["end"], is_end=True)
+            for word in segment.get("words", []) or []:
+                word["start"] = self.to_original(word["start"])
+                word["end"] = self.to_original(word["end"], is_end=True)
+        return result
@@ -0,0 +1,56 @@
+"""
+Dossiers de travail isolés par tâche.
+
+Chaque tâche dispose de son propre sous-dossier de temp_folder pour ses
+fichiers intermédiaires (vidéo téléchargée, WAV extrait, débordement
+mémoire...). Plusieurs jobs peuvent ainsi tourner en même temps sans se
+marcher dessus, et le nettoyage d'une tâche ne touche jamais aux fichiers
+des autres.
+
+Usage:
+    from core.workspace import Workspace
+
+    workspace = Workspace(task_id)
+    path = workspace.path_for("extracted_audio.wav")
+    ...
+    workspace.cleanup()
+"""
+
+import os
+import shutil
+import uuid
+from typing import Optional
+
+from logger import setup_logger
+from config import temp_folder
+
+logger = setup_logger(__name__)
+
+
+class Workspace:
+    """Dossier temporaire propre à une tâche, supprimé en fin de vie."""
+
+    def __init__(self, task_id: Optional[str] = None, root: str = temp_folder) -> None:
+        self.task_id = task_id or uuid.uuid4().hex
+        self.path = os.path.join(root, self.task_id)
+        os.makedirs(self.path, exist_ok=True)
+
+    def path_for(self, filename: str) -> str:
+        """Chemin d'un fichier intermédiaire dans le dossier de la tâche."""
+        return os.path.join(self.path, filename)
+
+    def cleanup(self) -> None:
+        """Supprime le dossier de la tâche et tout son contenu."""
+        if not os.path.isdir(self.path):
+            return
+        try:
+            shutil.rmtree(self.path)
+            logger.info(f"Workspace {self.task_id} removed")
+        except Exception as e:
+            logger.error(f"Failed to remove workspace {self.path}. Reasons : {e}")
+
+    def __enter__(self) -> "Workspace":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cleanup()
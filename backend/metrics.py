@@ -0,0 +1,350 @@
+"""
+Métriques du backend, exposées au format texte Prometheus sur GET /metrics.
+
+Implémentation minimale sans dépendance : compteurs, jauges et histogrammes
+avec étiquettes, protégés par un verrou car ils sont alimentés depuis les
+threads de décodage, de transcription et de téléchargement. Les valeurs déjà
+tenues ailleurs (files du scheduler, statistiques des caches) ne sont pas
+dupliquées : un collecteur les lit au moment de la requête.
+
+Usage:
+    from metrics import STAGE_SECONDS, registry
+
+    with STAGE_SECONDS.labels("download").time():
+        download_video(url)
+    STAGE_SECONDS.labels("transcribe").observe(elapsed)
+
+    registry.collector("macscribe_queue_depth", "...", "gauge", lambda: [({"stage": "llm"}, 3)])
+    registry.render()                    # corps de la réponse /metrics
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (suffixe du nom, étiquettes, valeur)
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class Registry:
+    """Ensemble des métriques rendues par /metrics."""
+
+    def __init__(self) -> None:
+        self._metrics: List["_Metric"] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric") -> None:
+        with self._lock:
+            if any(existing.name == metric.name for existing in self._metrics):
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics.append(metric)
+
+    def collector(
+        self, name: str, documentation: str, kind: str,
+        collect: Callable[[], Iterable[Tuple[Dict[str, str], float]]],
+    ) -> "Collector":
+        """Métrique lue à chaque requête : `collect` renvoie des (étiquettes, valeur)."""
+        return Collector(name, documentation, kind, collect, self)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics):
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                # Un collecteur défaillant ne doit pas priver le scrape des autres métriques
+                logger.error(f"Error collecting metric {metric.name}: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# ----- Métriques ----- #
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, label_names: Sequence[str] = (),
+        registry: Registry = registry,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.label_names:
+            # Série unique exposée dès le démarrage, à 0
+            self.labels()
+        registry.register(self)
+
+    def labels(self, *values):
+        """Série correspondant à ces valeurs d'étiquettes (créée au premier appel)."""
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {values}")
+        key = tuple(str(value) for value in values)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _series(self) -> List[Tuple[Dict[str, str], object]]:
+        with self._lock:
+            return [(dict(zip(self.label_names, key)), child) for key, child in self._children.items()]
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, child in self._series():
+            yield "", labels, child.value
+
+
+class _Value:
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = float(value)
+
+
+class Counter(_Metric):
+    """Valeur croissante (nombre de tâches, de tokens...)."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """Valeur instantanée (tâches actives...)."""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if index < len(self.counts):
+                self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        """Observe la durée du bloc, s'il se termine sans erreur."""
+        start = time.perf_counter()
+        yield
+        self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    """Distribution de valeurs (durées, facteurs temps réel) répartie en seaux cumulés."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, label_names: Sequence[str] = (),
+        buckets: Sequence[float] = (), registry: Registry = registry,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, label_names, registry)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, child in self._series():
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield "_bucket", {**labels, "le": "+Inf"}, count
+            yield "_sum", labels, total
+            yield "_count", labels, count
+
+
+class Collector(_Metric):
+    """Métrique dont les valeurs sont lues ailleurs au moment du scrape."""
+
+    def __init__(
+        self, name: str, documentation: str, kind: str,
+        collect: Callable[[], Iterable[Tuple[Dict[str, str], float]]],
+        registry: Registry = registry,
+    ) -> None:
+        self.kind = kind
+        self.collect = collect
+        super().__init__(name, documentation, (), registry)
+
+    def _new_child(self) -> None:
+        return None
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, value in self.collect():
+            yield "", labels, value
+
+
+# ----- Instruments de la pipeline ----- #
+
+# Secondes : de l'export (ms) au téléchargement ou à la transcription d'un long cours (heure)
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 10, 20, 30, 60)
+REALTIME_FACTOR_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+TOKENS_PER_SECOND_BUCKETS = (1, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500)
+
+STAGE_SECONDS = Histogram(
+    "macscribe_stage_duration_seconds",
+    "Duration of each pipeline stage (download, extract, normalize, vad, transcribe, compaction, export).",
+    ["stage"],
+    buckets=DURATION_BUCKETS,
+)
+TRANSCRIPTION_REALTIME_FACTOR = Histogram(
+    "macscribe_transcription_realtime_factor",
+    "Transcription time divided by audio duration (mode: file or live).",
+    ["mode"],
+    buckets=REALTIME_FACTOR_BUCKETS,
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "macscribe_llm_time_to_first_token_seconds",
+    "Time from the LLM request to the first streamed token (cache replays excluded).",
+    ["provider", "model"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_SECONDS = Histogram(
+    "macscribe_llm_duration_seconds",
+    "Total duration of a completed LLM generation (cache replays excluded).",
+    ["provider", "model"],
+    buckets=DURATION_BUCKETS,
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "macscribe_llm_tokens_per_second",
+    "Streamed chunks per second after the first token, per completed generation.",
+    ["provider", "model"],
+    buckets=TOKENS_PER_SECOND_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "macscribe_llm_tokens_total",
+    "Streamed chunks received from the LLM provider.",
+    ["provider", "model"],
+)
+SCHEDULER_WAIT_SECONDS = Histogram(
+    "macscribe_scheduler_wait_seconds",
+    "Time spent waiting for a scheduler slot, per stage.",
+    ["stage"],
+    buckets=DURATION_BUCKETS,
+)
+
+# Alimentées par TaskManager
+TASKS_ACTIVE = Gauge("macscribe_tasks_active", "Tasks currently held in memory (jobs and playlist entries).")
+TASKS = Counter("macscribe_tasks_total", "Finished tasks by outcome (completed or error).", ["outcome"])
+TASK_SECONDS = Histogram(
+    "macscribe_task_duration_seconds",
+    "Duration of a task from creation to completion.",
+    buckets=DURATION_BUCKETS,
+)
+SUBTASKS = Counter(
+    "macscribe_subtasks_total",
+    "Subtask transitions reported to clients (started, completed, error).",
+    ["status"],
+)
+
+
+if __name__ == "__main__":
+    # Rendu d'exemple et coût d'une observation (appelée depuis les threads de la pipeline).
+    # Usage: python metrics.py
+    import random
+
+    random.seed(0)
+    for stage in ("download", "extract", "transcribe"):
+        for _ in range(100):
+            STAGE_SECONDS.labels(stage).observe(random.expovariate(1 / 20))
+    TASKS.labels("completed").inc(3)
+    TASKS_ACTIVE.set(2)
+    registry.collector("macscribe_demo_queue_depth", "Demo collector.", "gauge", lambda: [({"stage": "llm"}, 4)])
+    print(registry.render())
+
+    series = STAGE_SECONDS.labels("export")
+    observations = 200_000
+    start = time.perf_counter()
+    for _ in range(observations):
+        series.observe(0.3)
+    elapsed = time.perf_counter() - start
+    print(f"observe(): {elapsed / observations * 1e6:.2f} µs per call")
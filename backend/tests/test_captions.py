@@ -0,0 +1,157 @@
+"""
+Sous-titres de la source : conversion VTT/SRT, politique de qualité et
+choix de la piste selon les langues préférées.
+
+Usage:
+    cd backend && python -m pytest tests/test_captions.py
+"""
+
+import pytest
+
+from core.captions import evaluate_captions, parse_captions, select_caption_track
+
+VTT = """WEBVTT
+Kind: captions
+Language: fr
+
+00:00:00.000 --> 00:00:04.000
+Bonjour à <c>tous</c>, aujourd'hui
+
+00:00:04.000 --> 00:00:08.500
+on parle de l'algèbre linéaire [Musique]
+
+01:00:00.000 --> 01:00:02.000
+Fin du cours &amp; questions
+"""
+
+SRT = """1
+00:00:01,000 --> 00:00:03,000
+Première ligne
+
+2
+00:00:03,000 --> 00:00:05,500
+Deuxième ligne
+sur deux lignes
+"""
+
+# Sous-titres automatiques YouTube : chaque bloc répète la ligne précédente,
+# séparés par des blocs de transition de 10 ms
+ROLLING_VTT = """WEBVTT
+
+00:00:00.000 --> 00:00:02.000
+première phrase
+
+00:00:02.000 --> 00:00:02.010
+première phrase
+
+00:00:02.010 --> 00:00:04.000
+première phrase
+deuxième phrase
+"""
+
+
+def speech(seconds: int, words_per_segment: int = 10) -> dict:
+    """Résultat avec un segment de `words_per_segment` mots toutes les 5 secondes."""
+    segments = [
+        {"id": i, "start": float(start), "end": float(start + 5), "text": " mot" * words_per_segment}
+        for i, start in enumerate(range(0, seconds, 5))
+    ]
+    return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": "fr"}
+
+
+def track(ext: str = "vtt") -> list:
+    return [{"ext": "json3", "url": "https://x/json3"}, {"ext": ext, "url": f"https://x/{ext}"}]
+
+
+# ----- Conversion ----- #
+
+def test_parse_vtt():
+    result = parse_captions(VTT, "vtt", "fr")
+
+    assert result["language"] == "fr"
+    assert [(s["start"], s["end"]) for s in result["segments"]] == [(0.0, 4.0), (4.0, 8.5), (3600.0, 3602.0)]
+    assert result["segments"][0]["text"] == " Bonjour à tous, aujourd'hui"
+    assert result["segments"][1]["text"] == " on parle de l'algèbre linéaire"
+    assert result["segments"][2]["text"] == " Fin du cours & questions"
+    assert result["text"] == "".join(s["text"] for s in result["segments"])
+
+
+def test_parse_srt():
+    result = parse_captions(SRT, "srt")
+
+    assert [(s["start"], s["end"]) for s in result["segments"]] == [(1.0, 3.0), (3.0, 5.5)]
+    assert result["segments"][1]["text"] == " Deuxième ligne sur deux lignes"
+
+
+def test_parse_rolling_captions_keeps_new_lines_only():
+    result = parse_captions(ROLLING_VTT, "vtt")
+
+    assert [s["text"] for s in result["segments"]] == [" première phrase", " deuxième phrase"]
+
+
+def test_parse_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        parse_captions("", "ttml")
+
+
+# ----- Qualité ----- #
+
+def test_quality_gate_accepts_full_coverage():
+    accepted, report = evaluate_captions(speech(600), 600, min_coverage=0.8)
+
+    assert accepted
+    assert report["coverage"] == 1.0
+    assert report["words_per_minute"] == 120.0
+
+
+def test_quality_gate_rejects_low_coverage():
+    # Sous-titres sur les 5 premières minutes d'une vidéo d'une heure
+    accepted, report = evaluate_captions(speech(300), 3600, min_coverage=0.8)
+
+    assert not accepted
+    assert report["coverage"] < 0.8
+
+
+def test_quality_gate_rejects_annotations_only():
+    # Couverture complète mais presque aucun mot ("[Musique]" retiré à la conversion)
+    accepted, report = evaluate_captions(speech(600, words_per_segment=1), 600, min_coverage=0.8)
+
+    assert not accepted
+    assert report["words_per_minute"] < 30
+
+
+def test_quality_gate_rejects_empty_captions():
+    accepted, _ = evaluate_captions({"text": "", "segments": []}, 600, min_coverage=0.8)
+
+    assert not accepted
+
+
+# ----- Choix de la piste ----- #
+
+def test_language_preference_order():
+    info = {"language": "fr", "subtitles": {"en": track(), "fr-FR": track("srt")}}
+
+    selected = select_caption_track(info, ["fr", "en"])
+    assert selected == {"url": "https://x/srt", "ext": "srt", "language": "fr", "source": "manual"}
+    assert select_caption_track(info, ["en", "fr"])["language"] == "en"
+
+
+def test_manual_preferred_over_auto():
+    info = {"language": "fr", "subtitles": {"fr": track()}, "automatic_captions": {"fr-orig": track()}}
+
+    assert select_caption_track(info, ["fr"], accept_auto=True)["source"] == "manual"
+
+
+def test_video_language_when_no_preference():
+    info = {"language": "en", "subtitles": {"fr": track(), "en": track()}}
+
+    assert select_caption_track(info, [])["language"] == "en"
+
+
+def test_auto_captions_only_in_spoken_language():
+    info = {"language": "en", "automatic_captions": {"en": track(), "fr": track()}}
+
+    assert select_caption_track(info, ["fr", "en"], accept_auto=True)["language"] == "en"
+    # Pas de traduction automatique, et rien sans accept_auto
+    assert select_caption_track(info, ["fr"], accept_auto=True) is None
+    assert select_caption_track(info, ["en"], accept_auto=False) is None
@@ -0,0 +1,132 @@
+"""
+Sous-titres de la source servis par un serveur HTTP local : récupération de
+la piste (fetch_captions), utilisation à la place de Whisper quand la
+couverture suffit, retour à la transcription sinon.
+
+Usage:
+    cd backend && python -m pytest tests/test_captions_pipeline.py
+"""
+
+import asyncio
+
+import pytest
+
+for module in ("fastapi", "litellm", "httpx", "yt_dlp"):
+    pytest.importorskip(module)
+
+import core.process as process
+from config import captions_min_coverage
+from core.downloader import fetch_captions
+from websocket import task_manager
+
+DURATION = 600
+SEGMENT_SECONDS = 5
+URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+def timestamp(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}.000"
+
+
+def write_vtt(folder, name: str, covered_seconds: int) -> None:
+    """VTT avec une phrase de dix mots toutes les 5 secondes sur `covered_seconds` secondes."""
+    blocks = ["WEBVTT\n"]
+    for index, start in enumerate(range(0, covered_seconds, SEGMENT_SECONDS)):
+        end = start + SEGMENT_SECONDS
+        blocks.append(f"{timestamp(start)} --> {timestamp(end)}\nphrase {index} du cours sur les matrices et vecteurs\n")
+    (folder / name).write_text("\n".join(blocks), encoding="utf-8")
+
+
+def video_info(base_url: str, name: str) -> dict:
+    """Métadonnées yt-dlp (probe_url()["info"]) d'une vidéo dont la piste est servie localement."""
+    return {
+        "title": "Cours",
+        "duration": DURATION,
+        "language": "fr",
+        "subtitles": {"fr": [{"ext": "vtt", "url": f"{base_url}/{name}"}]},
+    }
+
+
+@pytest.fixture
+def job(monkeypatch, tmp_path):
+    """Tâche transcript_txt, avec les messages envoyés au client relevés dans une liste."""
+    monkeypatch.setattr(process, "captions_enabled", True)
+    messages = []
+
+    async def record(task_id, message):
+        messages.append(message)
+
+    monkeypatch.setattr(task_manager.websocket_manager, "send_message", record)
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    task_id = task_manager.create_task(URL, "transcript_txt", "md", str(output_dir))
+    try:
+        yield task_id, output_dir, messages
+    finally:
+        task_manager.cleanup(task_id)
+
+
+def use_captions(task_id: str, output_dir, info: dict) -> bool:
+    probe = {"title": info["title"], "duration": info["duration"], "cached": False, "info": info}
+    return asyncio.run(
+        process._use_captions(task_id, URL, probe, ["transcript_txt"], "md", str(output_dir), "fr")
+    )
+
+
+def captions_report(messages: list) -> dict:
+    return next(message for message in messages if message["type"] == "captions_report")
+
+
+def test_fetch_captions_downloads_selected_track(http_folder):
+    folder, base_url = http_folder
+    write_vtt(folder, "cours.fr.vtt", DURATION)
+
+    found = fetch_captions(URL, ["fr"], video_info(base_url, "cours.fr.vtt"))
+
+    assert found["title"] == "Cours"
+    assert found["duration"] == DURATION
+    assert found["caption"] == {
+        "language": "fr",
+        "source": "manual",
+        "ext": "vtt",
+        "content": (folder / "cours.fr.vtt").read_text(encoding="utf-8"),
+    }
+
+
+def test_unreachable_track_falls_back_to_whisper(http_folder):
+    _, base_url = http_folder
+
+    found = fetch_captions(URL, ["fr"], video_info(base_url, "absent.vtt"))
+
+    assert found["caption"] is None
+
+
+def test_captions_replace_transcription(job, http_folder):
+    task_id, output_dir, messages = job
+    folder, base_url = http_folder
+    write_vtt(folder, "cours.fr.vtt", DURATION)
+
+    assert use_captions(task_id, output_dir, video_info(base_url, "cours.fr.vtt"))
+
+    report = captions_report(messages)
+    assert report["used"]
+    assert report["coverage"] >= captions_min_coverage
+    lines = (output_dir / "Cours_transcript.txt").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == DURATION // SEGMENT_SECONDS
+    assert lines[0] == "phrase 0 du cours sur les matrices et vecteurs"
+    assert task_manager.get_task(task_id).completed
+
+
+def test_low_coverage_falls_back_to_transcription(job, http_folder):
+    task_id, output_dir, messages = job
+    folder, base_url = http_folder
+    # Sous-titres sur la moitié seulement de la couverture minimale
+    write_vtt(folder, "cours.fr.vtt", int(DURATION * captions_min_coverage / 2))
+
+    assert not use_captions(task_id, output_dir, video_info(base_url, "cours.fr.vtt"))
+
+    report = captions_report(messages)
+    assert not report["used"]
+    assert report["coverage"] < captions_min_coverage
+    assert not any(output_dir.iterdir())
+    assert not task_manager.get_task(task_id).completed
@@ -0,0 +1,130 @@
+"""
+Compaction de la transcription : hésitations, marqueurs de discours,
+répétitions et fusion des segments courts.
+
+Usage:
+    cd backend && python -m pytest tests/test_compaction.py
+"""
+
+import pytest
+
+from core.compaction import (
+    MAX_MERGE_GAP_SECONDS,
+    MAX_MERGED_WORDS,
+    MIN_SEGMENT_WORDS,
+    collapse_repeats,
+    compact_segments,
+    remove_fillers,
+)
+
+
+def segment(start: float, end: float, text: str) -> dict:
+    return {"start": start, "end": end, "text": text}
+
+
+# ----- Hésitations et marqueurs ----- #
+
+@pytest.mark.parametrize("text, language", [
+    ("Quoi ? Tu plaisantes.", "fr"),
+    ("Tu viens, quoi ?", "fr"),
+    ("Well, well, well.", "en"),
+    ("Donc.", "fr"),
+    ("Bon, appétit.", "fr"),
+    ("Euh.", "fr"),
+])
+def test_meaningful_markers_are_kept(text, language):
+    assert remove_fillers(text, language) == (text, 0)
+
+
+def test_markers_and_fillers_removed_before_content():
+    assert remove_fillers("Euh, donc, voilà, on commence le cours.", "fr") == ("on commence le cours.", 3)
+    assert remove_fillers("So, basically, the idea is simple.", "en") == ("the idea is simple.", 2)
+
+
+def test_marker_kept_when_its_sentence_ends():
+    text, removed = remove_fillers("Alors, du coup, la dérivée est nulle. Voilà.", "fr")
+
+    assert text == "la dérivée est nulle. Voilà."
+    assert removed == 2
+
+
+def test_filler_inside_sentence():
+    assert remove_fillers("On va voir, euh, les matrices.", "fr") == ("On va voir, les matrices.", 1)
+
+
+def test_no_orphan_punctuation_at_start():
+    assert remove_fillers("euh ? Oui, on y va.", "fr") == ("Oui, on y va.", 1)
+
+
+# ----- Répétitions ----- #
+
+@pytest.mark.parametrize("text, language", [
+    ("Le C plus plus", "fr"),
+    ("x x", "en"),
+    ("bye bye", "en"),
+    ("très très bien", "fr"),
+    ("nous nous sommes trompés", "fr"),
+    ("le code 0 0 0", "fr"),
+])
+def test_legitimate_repeats_are_kept(text, language):
+    assert collapse_repeats(text, language=language) == (text, 0)
+
+
+@pytest.mark.parametrize("text, expected, removed", [
+    ("on va on va voir", "on va voir", 2),
+    ("le le le chat", "le chat", 2),
+    ("le, le chat", "le chat", 1),
+    ("la- la matrice", "la matrice", 1),
+])
+def test_disfluent_repeats_are_collapsed(text, expected, removed):
+    assert collapse_repeats(text, language="fr") == (expected, removed)
+
+
+# ----- Fusion et horodatage ----- #
+
+def test_short_segments_merged_within_gap():
+    segments = [segment(0.0, 1.0, "On commence."), segment(1.5, 3.0, "Le premier chapitre.")]
+
+    merged, report = compact_segments(segments, "fr")
+
+    assert merged == [{"start": 0.0, "end": 3.0, "text": "On commence. Le premier chapitre.", "id": 0}]
+    assert report.segments_before == 2
+    assert report.segments_after == 1
+
+
+def test_gap_above_limit_not_merged():
+    gap = MAX_MERGE_GAP_SECONDS + 0.5
+    segments = [segment(0.0, 1.0, "On commence."), segment(1.0 + gap, 3.0 + gap, "Le premier chapitre.")]
+
+    merged, _ = compact_segments(segments, "fr")
+
+    assert [(s["start"], s["end"], s["id"]) for s in merged] == [(0.0, 1.0, 0), (1.0 + gap, 3.0 + gap, 1)]
+
+
+def test_long_segments_not_merged():
+    long_text = " ".join(f"mot{i}" for i in range(MIN_SEGMENT_WORDS))
+    segments = [segment(0.0, 4.0, long_text), segment(4.0, 8.0, long_text.replace("mot", "terme"))]
+
+    merged, _ = compact_segments(segments, "fr")
+
+    assert len(merged) == 2
+
+
+def test_merge_stops_at_max_words():
+    words = MAX_MERGED_WORDS - 2
+    segments = [segment(0.0, 10.0, " ".join(f"mot{i}" for i in range(words))), segment(10.0, 11.0, "un deux trois.")]
+
+    merged, _ = compact_segments(segments, "fr")
+
+    assert [(s["start"], s["end"]) for s in merged] == [(0.0, 10.0), (10.0, 11.0)]
+
+
+def test_repetition_loop_dropped_and_ids_renumbered():
+    text = "Whisper répète parfois exactement la même phrase entière ici."
+    segments = [segment(0.0, 4.0, text), segment(4.0, 8.0, text), segment(10.0, 14.0, "Puis la suite du cours arrive enfin normalement.")]
+
+    merged, report = compact_segments(segments, "fr")
+
+    assert [s["text"] for s in merged] == [text, "Puis la suite du cours arrive enfin normalement."]
+    assert [s["id"] for s in merged] == [0, 1]
+    assert report.loops_removed == 1
@@ -0,0 +1,61 @@
+"""
+Téléchargement d'une URL à travers le cache des médias, contre un serveur
+HTTP local : le premier appel remplit le cache, le second le sert sans yt-dlp.
+
+Usage:
+    cd backend && python -m pytest tests/test_downloader.py
+"""
+
+import os
+
+import pytest
+
+yt_dlp = pytest.importorskip("yt_dlp")
+
+import core.downloader as downloader
+from core.media_cache import MediaCache
+
+
+class ForbiddenYoutubeDL:
+    """Tout accès à yt-dlp fait échouer le test."""
+
+    def __init__(self, *args, **kwargs):
+        raise AssertionError("yt-dlp ne doit pas être appelé pour un média en cache")
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = MediaCache(str(tmp_path / "media"), 10 * 1024 * 1024)
+    monkeypatch.setattr(downloader, "media_cache", cache)
+    monkeypatch.setattr(downloader, "media_cache_enabled", True)
+    return cache
+
+
+def test_second_download_served_from_cache(cache, http_folder, monkeypatch, tmp_path):
+    folder, base_url = http_folder
+    content = os.urandom(4096)
+    (folder / "cours.mp3").write_bytes(content)
+    url = f"{base_url}/cours.mp3"
+
+    first = downloader.download_video(url, str(tmp_path / "job1"), audio_only=True)
+
+    assert not first["cached"]
+    assert first["title"] == "cours"
+    with open(first["file_path"], "rb") as f:
+        assert f.read() == content
+    assert cache.lookup(*downloader.resolve_media_id(url), audio_only=True) is not None
+
+    monkeypatch.setattr(yt_dlp, "YoutubeDL", ForbiddenYoutubeDL)
+    progress = []
+    second = downloader.download_video(
+        url, str(tmp_path / "job2"), progress_callback=lambda percent, speed: progress.append(percent), audio_only=True
+    )
+
+    assert second["cached"]
+    assert second["title"] == "cours"
+    assert os.path.dirname(second["file_path"]) == str(tmp_path / "job2")
+    with open(second["file_path"], "rb") as f:
+        assert f.read() == content
+    assert progress == [100]
+    # Le mode vidéo est une autre entrée : il n'est pas servi par le téléchargement audio
+    assert cache.lookup(*downloader.resolve_media_id(url), audio_only=False) is None
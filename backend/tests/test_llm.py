@@ -0,0 +1,108 @@
+"""
+Génération LLM en streaming asynchrone : plusieurs flux simultanés ne
+bloquent jamais l'event loop, et un flux muet lève TimeoutError.
+
+litellm.acompletion est remplacé par un faux flux : aucun appel réseau.
+
+Usage:
+    cd backend && python -m pytest tests/test_llm.py
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+for module in ("litellm", "httpx", "dotenv"):
+    pytest.importorskip(module)
+
+import core.llm as llm
+
+STREAMS = 20
+TOKENS = 50
+TOKEN_INTERVAL = 0.005
+HEARTBEAT_INTERVAL = 0.01
+# Retard maximal toléré d'un battement sur son horaire
+MAX_HEARTBEAT_LAG = 0.05
+
+
+def chunk(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class FakeStream:
+    """Réponse en streaming de litellm : un token toutes les `interval` secondes."""
+
+    def __init__(self, prompt: str, tokens: int, interval: float) -> None:
+        self.prompt = prompt
+        self.tokens = tokens
+        self.interval = interval
+        self.closed = False
+
+    async def __aiter__(self):
+        for index in range(self.tokens):
+            await asyncio.sleep(self.interval)
+            yield chunk(f"{self.prompt}:{index} ")
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_completion(monkeypatch):
+    """Remplace acompletion ; renvoie la liste des flux créés."""
+    streams = []
+    settings = {"tokens": TOKENS, "interval": TOKEN_INTERVAL}
+
+    async def acompletion(model, messages, stream, timeout, **kwargs):
+        response = FakeStream(messages[0]["content"], settings["tokens"], settings["interval"])
+        streams.append(response)
+        return response
+
+    monkeypatch.setattr(llm, "acompletion", acompletion)
+    yield streams, settings
+    asyncio.run(llm.close_http_client())
+
+
+def test_concurrent_streams_keep_event_loop_responsive(fake_completion):
+    streams, _ = fake_completion
+
+    async def heartbeat(stop: asyncio.Event, lags: list) -> None:
+        expected = time.perf_counter() + HEARTBEAT_INTERVAL
+        while not stop.is_set():
+            await asyncio.sleep(max(expected - time.perf_counter(), 0))
+            lags.append(time.perf_counter() - expected)
+            expected += HEARTBEAT_INTERVAL
+
+    async def consume(prompt: str) -> str:
+        return await llm.agenerate("deepseek", "deepseek-chat", prompt, use_cache=False)
+
+    async def main():
+        stop = asyncio.Event()
+        lags = []
+        beating = asyncio.create_task(heartbeat(stop, lags))
+        results = await asyncio.gather(*(consume(f"job{index}") for index in range(STREAMS)))
+        stop.set()
+        await beating
+        return results, lags
+
+    results, lags = asyncio.run(main())
+
+    for index, text in enumerate(results):
+        assert text == "".join(f"job{index}:{token} " for token in range(TOKENS))
+    assert all(stream.closed for stream in streams)
+    assert len(lags) >= TOKENS * TOKEN_INTERVAL / HEARTBEAT_INTERVAL / 2
+    assert max(lags) < MAX_HEARTBEAT_LAG, f"event loop blocked for {max(lags) * 1000:.0f} ms"
+
+
+def test_silent_stream_raises_timeout(fake_completion):
+    streams, settings = fake_completion
+    settings["interval"] = 1.0
+
+    async def main():
+        return await llm.agenerate("deepseek", "deepseek-chat", "job", idle_timeout=0.05, use_cache=False)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(main())
+    assert streams[0].closed
@@ -0,0 +1,102 @@
+"""
+Cache des médias téléchargés : clé (extracteur, id, mode), lien physique au
+lieu d'une copie, règles de service audio/vidéo et éviction LRU.
+
+Usage:
+    cd backend && python -m pytest tests/test_media_cache.py
+"""
+
+import json
+import os
+
+import pytest
+
+pytest.importorskip("yt_dlp")
+
+from core.media_cache import MediaCache, resolve_media_id
+
+
+def make_media(folder, name: str, size: int = 1000) -> str:
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, name)
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return MediaCache(str(tmp_path / "media"), 10 * 1024 * 1024)
+
+
+def test_resolve_media_id_without_network():
+    assert resolve_media_id("https://www.youtube.com/watch?v=dQw4w9WgXcQ") == ("Youtube", "dQw4w9WgXcQ")
+    assert resolve_media_id("https://youtu.be/dQw4w9WgXcQ") == ("Youtube", "dQw4w9WgXcQ")
+
+
+def test_key_is_extractor_id_and_mode(cache, tmp_path):
+    source = make_media(tmp_path / "job", "cours.m4a")
+    cache.store("Youtube", "abc", True, source, {"title": "Cours"})
+
+    assert cache.lookup("Youtube", "abc", audio_only=True)["title"] == "Cours"
+    assert cache.lookup("Vimeo", "abc", audio_only=True) is None
+    assert cache.lookup("Youtube", "abd", audio_only=True) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_hit_materializes_hard_link(cache, tmp_path):
+    source = make_media(tmp_path / "job1", "cours.m4a")
+    cache.store("Youtube", "abc", True, source, {"title": "Cours"})
+
+    entry = cache.lookup("Youtube", "abc", audio_only=True)
+    file_path = cache.materialize(entry, str(tmp_path / "job2"))
+
+    assert os.path.basename(file_path) == "cours.m4a"
+    assert os.path.samefile(file_path, entry["file_path"])
+    assert os.stat(entry["file_path"]).st_nlink >= 2
+    # Le nettoyage du dossier de travail ne touche pas l'entrée du cache
+    os.unlink(file_path)
+    assert cache.lookup("Youtube", "abc", audio_only=True) is not None
+
+
+def test_audio_entry_does_not_serve_video_request(cache, tmp_path):
+    source = make_media(tmp_path / "job", "cours.m4a")
+    cache.store("Youtube", "abc", True, source, {"title": "Cours"})
+
+    assert cache.lookup("Youtube", "abc", audio_only=False) is None
+
+
+def test_video_entry_serves_audio_request(cache, tmp_path):
+    source = make_media(tmp_path / "job", "cours.mp4")
+    cache.store("Youtube", "abc", False, source, {"title": "Cours"})
+
+    entry = cache.lookup("Youtube", "abc", audio_only=True)
+    assert entry["mode"] == "video"
+
+
+def test_lru_eviction(cache, tmp_path):
+    for index, video_id in enumerate(("a", "b")):
+        source = make_media(tmp_path / "job", f"{video_id}.m4a")
+        cache.store("Youtube", video_id, True, source, {"title": video_id})
+        # Horodatages distincts et anciens, quelle que soit la résolution du système de fichiers
+        meta_path = cache._meta_path(cache._key("Youtube", video_id, True))
+        os.utime(meta_path, (1000 + index, 1000 + index))
+
+    # "a" est relu : c'est "b" le moins récemment utilisé
+    assert cache.lookup("Youtube", "a", audio_only=True) is not None
+    cache.max_bytes = cache.stats()["size_bytes"] + 500
+
+    source = make_media(tmp_path / "job", "c.m4a")
+    cache.store("Youtube", "c", True, source, {"title": "c"})
+
+    assert cache.lookup("Youtube", "b", audio_only=True) is None
+    assert cache.lookup("Youtube", "a", audio_only=True) is not None
+    assert cache.lookup("Youtube", "c", audio_only=True) is not None
+    assert cache.stats()["size_bytes"] <= cache.max_bytes
+    remaining = sorted(
+        json.load(open(os.path.join(cache.folder, name), encoding="utf-8"))["id"]
+        for name in os.listdir(cache.folder)
+        if name.endswith(".json")
+    )
+    assert remaining == ["a", "c"]
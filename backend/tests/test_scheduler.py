@@ -0,0 +1,163 @@
+"""
+Jobs concurrents à travers la pipeline complète, avec le backend de
+transcription "fake" : les créneaux par étape sont respectés, chaque job se
+termine et son dossier de travail est supprimé.
+
+Usage:
+    cd backend && python -m pytest tests/test_scheduler.py
+"""
+
+import asyncio
+import math
+import os
+import re
+import shutil
+import struct
+import wave
+from collections import Counter
+from contextlib import asynccontextmanager
+
+import pytest
+
+for module in ("fastapi", "litellm", "httpx", "yt_dlp"):
+    pytest.importorskip(module)
+if shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None:
+    pytest.skip("ffmpeg/ffprobe are required to decode the test audio", allow_module_level=True)
+
+import core.MediaProcessor as media_module
+import core.process as process
+from core.scheduler import JobScheduler
+from core.transcriber import FakeTranscriber, model_pool
+from websocket import task_manager
+
+JOBS = 6
+WORKERS = {"download": 1, "decode": 2, "transcription": 1, "llm": 2}
+SEGMENT_SECONDS = 5
+
+
+def audio_seconds(index: int) -> int:
+    """Durée distincte par job : le job `index` produit index + 2 segments avec le backend fake."""
+    return 8 + SEGMENT_SECONDS * index
+
+
+def expected_segments(index: int) -> int:
+    return math.ceil(audio_seconds(index) / SEGMENT_SECONDS)
+
+
+class RecordingScheduler(JobScheduler):
+    """JobScheduler qui relève le nombre maximal de créneaux occupés simultanément par étape."""
+
+    def __init__(self, stage_workers, max_jobs):
+        super().__init__(stage_workers, max_jobs)
+        self.running = Counter()
+        self.peak = Counter()
+
+    @asynccontextmanager
+    async def slot(self, stage_name, task_id):
+        async with super().slot(stage_name, task_id):
+            self.running[stage_name] += 1
+            self.peak[stage_name] = max(self.peak[stage_name], self.running[stage_name])
+            try:
+                yield
+            finally:
+                self.running[stage_name] -= 1
+
+
+def write_tone(path: str, seconds: int, frequency: float) -> None:
+    """WAV PCM 16 bits mono 16 kHz : une sinusoïde continue, assez longue pour plusieurs segments."""
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        frames = (
+            struct.pack("<h", int(8000 * math.sin(2 * math.pi * frequency * i / 16000)))
+            for i in range(seconds * 16000)
+        )
+        wav.writeframes(b"".join(frames))
+
+
+# Génération plus lente que la transcription : les appels LLM de jobs successifs se chevauchent.
+# Le résumé reprend le nombre de segments du prompt, propre à chaque job
+async def fake_stream(provider, model_name, prompt, **kwargs):
+    count = len(re.findall(r"Segment \d+\.", prompt))
+    for token in ("Résumé ", f"de {count} ", "segments."):
+        await asyncio.sleep(0.2)
+        yield token
+
+
+@pytest.fixture
+def pipeline(monkeypatch, tmp_path):
+    recording = RecordingScheduler(WORKERS, max_jobs=JOBS)
+    monkeypatch.setattr(process, "scheduler", recording)
+    monkeypatch.setattr(process, "agenerate_stream", fake_stream)
+    monkeypatch.setattr(process, "transcription_cache_enabled", False)
+    monkeypatch.setattr(process, "vad_enabled", False)
+    monkeypatch.setattr(media_module, "transcription_backend", "fake")
+    monkeypatch.setattr(media_module, "chunked_transcription", False)
+    monkeypatch.setattr("core.transcriber.transcription_backend", "fake")
+    # Transcription lente : les jobs se chevauchent réellement sur l'étape transcription
+    monkeypatch.setattr(FakeTranscriber, "realtime_factor", 0.02)
+    monkeypatch.setattr(FakeTranscriber, "segment_seconds", float(SEGMENT_SECONDS))
+    yield recording
+    model_pool.clear()
+
+
+def test_concurrent_jobs_respect_stage_limits(pipeline, tmp_path):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    sources = []
+    for index in range(JOBS):
+        source = tmp_path / f"cours_{index}.wav"
+        write_tone(str(source), audio_seconds(index), 220 + 40 * index)
+        sources.append(str(source))
+
+    task_ids = []
+    for source in sources:
+        task_id = task_manager.create_task(source, "create_summary", "md", str(output_dir))
+        pipeline.admit(task_id)
+        task_ids.append(task_id)
+    workspaces = [task_manager.get_task(task_id).workspace.path for task_id in task_ids]
+
+    async def run_all():
+        await asyncio.gather(
+            *(
+                process.process_file_task(
+                    task_id, "create_summary", source, "md", str(output_dir),
+                    outputs=["create_summary", "transcript_txt"],
+                )
+                for task_id, source in zip(task_ids, sources)
+            )
+        )
+
+    try:
+        asyncio.run(run_all())
+
+        for task_id in task_ids:
+            state = task_manager.get_task(task_id)
+            assert state.completed
+            assert state.error is None
+            assert all(task.status.value == "completed" for task in state.tasks)
+
+        for index in range(JOBS):
+            summary = output_dir / f"cours_{index}_summary.md"
+            transcript = output_dir / f"cours_{index}_transcript.txt"
+            count = expected_segments(index)
+            # Chaque fichier correspond à son propre job, pas à celui d'à côté
+            assert summary.read_text(encoding="utf-8") == f"Résumé de {count} segments."
+            assert transcript.read_text(encoding="utf-8").splitlines() == [f"Segment {i}." for i in range(count)]
+
+        for stage, workers in WORKERS.items():
+            assert pipeline.peak[stage] <= workers, f"{stage}: {pipeline.peak[stage]} > {workers}"
+            assert pipeline.stages[stage].running == 0
+        # Avec plus de jobs que de créneaux, chaque étape utilisée a bien été saturée
+        assert pipeline.peak["decode"] == WORKERS["decode"]
+        assert pipeline.peak["transcription"] == WORKERS["transcription"]
+        assert pipeline.peak["llm"] == WORKERS["llm"]
+
+        assert not any(os.path.exists(path) for path in workspaces)
+    finally:
+        for task_id in task_ids:
+            pipeline.release_job(task_id)
+            task_manager.cleanup(task_id)
+
+    assert pipeline.stats()["jobs"]["active"] == 0
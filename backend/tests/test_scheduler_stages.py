@@ -0,0 +1,191 @@
+"""
+Créneaux par étape du JobScheduler : ordre de service par priorité puis par
+ordre d'arrivée, créneau rendu quand un job en attente est annulé, et refus
+des jobs au-delà de max_jobs.
+
+Usage:
+    cd backend && python -m pytest tests/test_scheduler_stages.py
+"""
+
+import asyncio
+
+import pytest
+
+from core.scheduler import JobScheduler, SchedulerFull
+
+
+def make_scheduler(max_jobs: int = 10) -> JobScheduler:
+    return JobScheduler({"transcription": 1, "llm": 2}, max_jobs)
+
+
+async def settle() -> None:
+    """Laisse les tâches créées atteindre leur point d'attente."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def run_in_order(scheduler: JobScheduler, waiting: list) -> list:
+    """
+    Un job occupe l'unique créneau de transcription pendant que `waiting`
+    (task_id dans leur ordre d'arrivée) se mettent en file ; renvoie l'ordre de service.
+    """
+    served = []
+    release_holder = asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot("transcription", "holder"):
+            await release_holder.wait()
+
+    async def job(task_id):
+        async with scheduler.slot("transcription", task_id):
+            served.append(task_id)
+
+    holding = asyncio.create_task(holder())
+    await settle()
+    jobs = []
+    for task_id in waiting:
+        jobs.append(asyncio.create_task(job(task_id)))
+        await settle()
+    assert scheduler.stages["transcription"].queued == len(waiting)
+
+    release_holder.set()
+    await asyncio.gather(holding, *jobs)
+    return served
+
+
+def test_slots_served_by_priority():
+    scheduler = make_scheduler()
+    for task_id, priority in (("low", "low"), ("normal", "normal"), ("high", "high")):
+        scheduler.admit(task_id, priority)
+
+    served = asyncio.run(run_in_order(scheduler, ["low", "normal", "high"]))
+
+    assert served == ["high", "normal", "low"]
+    assert scheduler.stages["transcription"].running == 0
+
+
+def test_same_priority_served_in_arrival_order():
+    scheduler = make_scheduler()
+    for task_id in ("a", "b", "c", "d"):
+        scheduler.admit(task_id, "normal")
+
+    assert asyncio.run(run_in_order(scheduler, ["c", "a", "d", "b"])) == ["c", "a", "d", "b"]
+
+
+def test_child_job_inherits_parent_priority():
+    scheduler = make_scheduler()
+    scheduler.admit("playlist", "high")
+    scheduler.admit("other", "normal")
+    scheduler.attach("video", "playlist")
+
+    assert asyncio.run(run_in_order(scheduler, ["other", "video"])) == ["video", "other"]
+
+
+def test_cancelled_waiter_leaves_queue():
+    scheduler = make_scheduler()
+    stage = scheduler.stages["transcription"]
+
+    async def main():
+        release_holder = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot("transcription", "holder"):
+                await release_holder.wait()
+
+        async def job(task_id):
+            async with scheduler.slot("transcription", task_id):
+                pass
+
+        holding = asyncio.create_task(holder())
+        await settle()
+        waiting = asyncio.create_task(job("waiting"))
+        await settle()
+        assert stage.queued == 1
+
+        waiting.cancel()
+        await settle()
+        assert stage.queued == 0
+
+        release_holder.set()
+        await holding
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    asyncio.run(main())
+    assert stage.running == 0
+
+
+def test_slot_handed_to_cancelled_waiter_is_passed_on():
+    scheduler = make_scheduler()
+    stage = scheduler.stages["transcription"]
+    served = []
+
+    async def main():
+        async def job(task_id):
+            async with scheduler.slot("transcription", task_id):
+                served.append(task_id)
+
+        await stage.acquire(1)
+        first = asyncio.create_task(job("first"))
+        await settle()
+        second = asyncio.create_task(job("second"))
+        await settle()
+
+        # Le créneau est transmis à "first", annulé avant d'avoir pu reprendre la main
+        stage.release()
+        first.cancel()
+        # Sans créneau rendu, "second" attendrait indéfiniment
+        await asyncio.wait_for(asyncio.gather(first, second, return_exceptions=True), timeout=1.0)
+
+    asyncio.run(main())
+    assert served == ["second"]
+    assert stage.running == 0
+    assert stage.queued == 0
+
+
+def test_stage_runs_up_to_its_workers():
+    scheduler = make_scheduler()
+    stage = scheduler.stages["llm"]
+    peak = []
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def job(task_id):
+            async with scheduler.slot("llm", task_id):
+                peak.append(stage.running)
+                await gate.wait()
+
+        jobs = [asyncio.create_task(job(str(index))) for index in range(5)]
+        await settle()
+        assert stage.running == 2
+        assert stage.queued == 3
+        gate.set()
+        await asyncio.gather(*jobs)
+
+    asyncio.run(main())
+    assert max(peak) == 2
+    assert stage.running == 0
+
+
+def test_admission_rejected_beyond_max_jobs():
+    scheduler = make_scheduler(max_jobs=2)
+    scheduler.admit("a")
+    scheduler.admit("b", "high")
+
+    with pytest.raises(SchedulerFull):
+        scheduler.admit("c")
+    assert scheduler.stats()["jobs"] == {"active": 2, "children": 0, "max": 2, "rejected": 1}
+
+    # Un job terminé libère sa place
+    scheduler.release_job("a")
+    scheduler.admit("c")
+    assert scheduler.stats()["jobs"]["active"] == 2
+
+
+def test_unknown_priority_rejected():
+    scheduler = make_scheduler()
+
+    with pytest.raises(ValueError):
+        scheduler.admit("a", "urgent")
+    assert scheduler.stats()["jobs"]["active"] == 0
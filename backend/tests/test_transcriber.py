@@ -0,0 +1,99 @@
+"""
+Pool de modèles : un modèle évincé pendant une transcription par fenêtres
+reste utilisable jusqu'à la fin du job, puis est libéré.
+
+Usage:
+    cd backend && python -m pytest tests/test_transcriber.py
+"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import core.transcriber as transcriber_module
+from core.transcriber import SAMPLE_RATE, ModelPool, _WindowedTranscriber
+
+
+class SlowTranscriber(_WindowedTranscriber):
+    """Backend de test : chaque fenêtre prend un peu de temps et exige un modèle chargé."""
+
+    name = "slow"
+    events = []
+
+    @property
+    def memory_mb(self) -> int:
+        return 0
+
+    def _load(self) -> None:
+        self.model = object()
+        self.words = 0
+
+    def _unload(self) -> None:
+        self.events.append(("unload", self.model_name))
+        self.model = None
+
+    def _transcribe_window(self, audio, language) -> dict:
+        if self.model is None:
+            raise AttributeError("'NoneType' object has no attribute 'transcribe'")
+        time.sleep(0.05)
+        duration = len(audio) / SAMPLE_RATE
+        segments = []
+        for start in np.arange(0.0, duration, 10.0):
+            self.words += 1
+            segments.append(
+                {"id": len(segments), "start": float(start), "end": float(min(start + 10, duration)),
+                 "text": f" mot{self.words}"}
+            )
+        return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": "fr"}
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    SlowTranscriber.events = []
+    monkeypatch.setitem(transcriber_module.TRANSCRIBERS, "slow", SlowTranscriber)
+    return ModelPool(max_models=1, max_memory_mb=10_000)
+
+
+def test_eviction_waits_for_running_transcription(pool):
+    audio = (np.random.default_rng(0).standard_normal(SAMPLE_RATE * 300) * 0.1).astype(np.float32)
+    first_window = threading.Event()
+    outcome = {}
+
+    def job():
+        def on_progress(seconds):
+            first_window.set()
+            SlowTranscriber.events.append(("window", seconds))
+
+        try:
+            outcome["result"] = pool.get("slow", "a").transcribe(audio, progress_callback=on_progress)
+        except Exception as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=job)
+    worker.start()
+    assert first_window.wait(5)
+
+    # Charger un second modèle évince "a" (max_models=1) en pleine transcription
+    other = pool.get("slow", "b")
+    worker.join(10)
+
+    assert "error" not in outcome
+    assert outcome["result"]["segments"][-1]["end"] == pytest.approx(300.0)
+    windows = [event for event in SlowTranscriber.events if event[0] == "window"]
+    assert len(windows) > 1
+    # "a" n'est libéré qu'après sa dernière fenêtre
+    assert SlowTranscriber.events.index(("unload", "a")) > SlowTranscriber.events.index(windows[-1])
+    assert [entry["model"] for entry in pool.loaded()] == ["b"]
+    assert other.model is not None
+
+
+def test_evicted_transcriber_reloads_on_use(pool):
+    first = pool.get("slow", "a")
+    pool.get("slow", "b")
+    assert first.model is None
+
+    # Référence obtenue avant l'éviction : rechargée plutôt que d'échouer
+    result = first.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    assert result["language"] == "fr"
@@ -0,0 +1,39 @@
+"""
+Condensation des zones de parole : identique en mémoire et depuis un audio
+débordé sur disque (memmap), sans passer par un buffer en RAM dans ce cas.
+
+Usage:
+    cd backend && python -m pytest tests/test_vad.py
+"""
+
+import numpy as np
+
+from core.vad import SpeechTimeline
+
+REGIONS = [(100, 2500), (4000, 4010), (7000, 9999)]
+
+
+def test_condense_in_memory():
+    audio = np.arange(10000, dtype=np.float32)
+
+    condensed = SpeechTimeline(REGIONS, len(audio)).condense(audio)
+
+    assert not isinstance(condensed, np.memmap)
+    assert np.array_equal(condensed, np.concatenate([audio[start:end] for start, end in REGIONS]))
+
+
+def test_condense_memmap_into_spill_file(tmp_path):
+    source = np.memmap(tmp_path / "normalized_audio.f32", dtype=np.float32, mode="w+", shape=(10000,))
+    source[:] = np.arange(10000, dtype=np.float32)
+    spill_path = str(tmp_path / "speech_audio.f32")
+
+    # Blocs plus petits que les zones : chaque zone est recopiée en plusieurs fois
+    condensed = SpeechTimeline(REGIONS, len(source)).condense(source, spill_path, block_frames=1000)
+
+    assert isinstance(condensed, np.memmap)
+    assert condensed.filename == spill_path
+    assert np.array_equal(condensed, np.concatenate([source[start:end] for start, end in REGIONS]))
+
+
+def test_condense_without_speech():
+    assert len(SpeechTimeline([], 10000).condense(np.zeros(10000, dtype=np.float32))) == 0
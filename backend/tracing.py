@@ -0,0 +1,356 @@
+"""
+Traces par tâche : spans des étapes de la pipeline, exportées au format Chrome trace.
+
+Chaque tâche a sa trace, créée par TaskManager.create_task et rangée à son
+nettoyage parmi les `max_traces` dernières terminées. La trace courante est
+portée par une ContextVar : asyncio.to_thread la transmet aux threads de
+décodage et de transcription, si bien que `span()` rattache les mesures à
+la bonne tâche sans passer de task_id (hors de toute tâche, c'est un no-op).
+
+L'export (GET /traces/{task_id}) suit le format "trace event" de Chrome,
+chargeable dans chrome://tracing ou https://ui.perfetto.dev : une ligne par
+thread, une ligne par tâche asyncio.
+
+Sur demande (champ "profile" du message WebSocket), un profileur par
+échantillonnage relève toutes les `profile_interval_ms` la pile des threads
+qui exécutent un span de la tâche. Seuls les threads de travail sont
+échantillonnés : l'event loop est partagée par toutes les tâches. Le résultat
+est au format "collapsed stacks" (flamegraph.pl, speedscope).
+
+Usage:
+    from tracing import span, traced, tracer
+
+    tracer.start(task_id, profile=True)       # fait par TaskManager.create_task
+    with span("decode", file=path):
+        ...
+    tracer.finish(task_id)                    # fait par TaskManager.cleanup
+    tracer.chrome_trace(task_id)              # {"traceEvents": [...]}
+    tracer.profile(task_id)                   # "main;ingest_audio;... 42\\n..."
+
+    @traced("media.ingest_audio")             # chaque appel est un span
+    def ingest_audio(self, ...): ...
+"""
+
+import asyncio
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from logger import setup_logger
+from config import tracing_enabled, max_traces, max_trace_events, profile_interval_ms
+
+logger = setup_logger(__name__)
+
+# Au-delà, la pile est tronquée côté racine
+MAX_STACK_DEPTH = 64
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+
+
+def _lane_name() -> str:
+    """Ligne du span dans la timeline : la tâche asyncio, ou à défaut le thread."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is not None:
+        return f"async {task.get_name()}"
+    return threading.current_thread().name
+
+
+class SamplingProfiler:
+    """Relève la pile des threads qui exécutent un span de `trace`, toutes les `interval` secondes."""
+
+    def __init__(self, trace: "Trace", interval: float) -> None:
+        self.trace = trace
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"profiler-{trace.task_id[:8]}", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            threads = self.trace.busy_threads()
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[_collapse(frame)] += 1
+                    self.samples += 1
+
+    def collapsed(self) -> str:
+        """Une ligne par pile distincte : "racine;...;feuille nombre"."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Trace:
+    """Spans d'une tâche, au plus `max_events`."""
+
+    def __init__(self, task_id: str, max_events: int) -> None:
+        self.task_id = task_id
+        self.max_events = max_events
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.events: List[dict] = []
+        self.dropped = 0
+        self.profiler: Optional[SamplingProfiler] = None
+        self._origin = time.perf_counter()
+        self._lanes: Dict[str, int] = {}
+        # Thread → nombre de spans ouverts (threads de travail uniquement, pour le profileur)
+        self._busy: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, category: str, start: float, end: float, lane: str, args: dict) -> None:
+        with self._lock:
+            if len(self.events) >= self.max_events:
+                self.dropped += 1
+                return
+            tid = self._lanes.setdefault(lane, len(self._lanes) + 1)
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": round((start - self._origin) * 1e6, 1),
+                    "dur": round((end - start) * 1e6, 1),
+                    "pid": 1,
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+
+    def enter_thread(self, ident: int) -> None:
+        with self._lock:
+            self._busy[ident] = self._busy.get(ident, 0) + 1
+
+    def exit_thread(self, ident: int) -> None:
+        with self._lock:
+            if self._busy.get(ident, 0) <= 1:
+                self._busy.pop(ident, None)
+            else:
+                self._busy[ident] -= 1
+
+    def busy_threads(self) -> List[int]:
+        with self._lock:
+            return list(self._busy)
+
+    def chrome_trace(self) -> dict:
+        with self._lock:
+            events = list(self.events)
+            lanes = dict(self._lanes)
+        metadata = [
+            {"name": "process_name", "ph": "M", "pid": 1, "tid": 0, "args": {"name": f"task {self.task_id}"}}
+        ] + [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": lane}}
+            for lane, tid in lanes.items()
+        ]
+        return {
+            "traceEvents": metadata + events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "task_id": self.task_id,
+                "started_at": self.started_at,
+                "dropped_events": self.dropped,
+            },
+        }
+
+    def summary(self) -> dict:
+        end = self.finished_at or time.time()
+        return {
+            "task_id": self.task_id,
+            "started_at": self.started_at,
+            "duration_seconds": round(end - self.started_at, 3),
+            "finished": self.finished_at is not None,
+            "events": len(self.events),
+            "dropped_events": self.dropped,
+            "profile_samples": self.profiler.samples if self.profiler else None,
+        }
+
+
+class Tracer:
+    """Traces des tâches en cours et des `max_traces` dernières terminées."""
+
+    def __init__(self, enabled: bool, max_traces: int, max_events: int, profile_interval: float) -> None:
+        self.enabled = enabled
+        self.max_traces = max_traces
+        self.max_events = max_events
+        self.profile_interval = profile_interval
+        self._active: Dict[str, Trace] = {}
+        self._finished: "OrderedDict[str, Trace]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, task_id: str, profile: bool = False) -> Optional[Trace]:
+        """
+        Crée la trace de la tâche et en fait la trace courante du contexte appelant
+        (la coroutine de la tâche et tout ce qu'elle lance ensuite).
+        """
+        if not self.enabled:
+            return None
+        trace = Trace(task_id, self.max_events)
+        if profile:
+            trace.profiler = SamplingProfiler(trace, self.profile_interval)
+            trace.profiler.start()
+            logger.info(f"Sampling profiler started for task {task_id}")
+        with self._lock:
+            self._active[task_id] = trace
+        _current.set(trace)
+        return trace
+
+    def finish(self, task_id: str) -> None:
+        """Arrête le profileur et range la trace parmi les dernières terminées."""
+        with self._lock:
+            trace = self._active.pop(task_id, None)
+            if trace is None:
+                return
+            trace.finished_at = time.time()
+            self._finished[task_id] = trace
+            while len(self._finished) > self.max_traces:
+                self._finished.popitem(last=False)
+        if trace.profiler is not None:
+            trace.profiler.stop()
+            logger.info(f"Sampling profiler stopped for task {task_id}: {trace.profiler.samples} samples")
+
+    def get(self, task_id: str) -> Optional[Trace]:
+        with self._lock:
+            return self._active.get(task_id) or self._finished.get(task_id)
+
+    def list(self) -> List[dict]:
+        """Résumé des traces, les plus récentes d'abord."""
+        with self._lock:
+            traces = list(self._active.values()) + list(reversed(self._finished.values()))
+        return [trace.summary() for trace in traces]
+
+    def chrome_trace(self, task_id: str) -> Optional[dict]:
+        trace = self.get(task_id)
+        return trace.chrome_trace() if trace else None
+
+    def profile(self, task_id: str) -> Optional[str]:
+        """Piles échantillonnées ("collapsed stacks"), None sans trace ou sans profileur."""
+        trace = self.get(task_id)
+        if trace is None or trace.profiler is None:
+            return None
+        return trace.profiler.collapsed()
+
+
+tracer = Tracer(tracing_enabled, max_traces, max_trace_events, profile_interval_ms / 1000)
+
+
+@contextmanager
+def span(name: str, category: str = "pipeline", **args):
+    """
+    Mesure le bloc dans la trace de la tâche courante (aucun effet hors tâche).
+
+    Renvoie le dict des arguments du span, que le bloc peut compléter
+    (ex: nombre de tokens, connu seulement à la fin).
+    """
+    trace = _current.get()
+    if trace is None:
+        yield args
+        return
+
+    lane = _lane_name()
+    # Dans l'event loop, le thread est partagé par toutes les tâches : pas d'échantillonnage
+    ident = None if lane.startswith("async ") else threading.get_ident()
+    if ident is not None:
+        trace.enter_thread(ident)
+    start = time.perf_counter()
+    try:
+        yield args
+    except BaseException as e:
+        args["error"] = type(e).__name__
+        raise
+    finally:
+        end = time.perf_counter()
+        if ident is not None:
+            trace.exit_thread(ident)
+        trace.add(name, category, start, end, lane, args)
+
+
+def traced(name: str, category: str = "pipeline"):
+    """Décorateur : chaque appel de la fonction (synchrone) est un span."""
+
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name, category):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+if __name__ == "__main__":
+    # Démonstration : deux étapes CPU dans des threads (comme asyncio.to_thread) et une
+    # attente asynchrone, profileur activé. Écrit trace.json (chrome://tracing) et
+    # profile.txt (flamegraph.pl / speedscope).
+    # Usage: python tracing.py
+    import json
+
+    def decode(seconds: float) -> int:
+        with span("decode", seconds=seconds):
+            total, deadline = 0, time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                total += sum(range(1000))
+            return total
+
+    def transcribe(seconds: float) -> float:
+        with span("transcribe"):
+            value, deadline = 0.0, time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                value += sum(i * 0.5 for i in range(1000))
+            return value
+
+    async def job() -> None:
+        tracer.start("demo", profile=True)
+        with span("process"):
+            await asyncio.to_thread(decode, 0.3)
+            with span("llm", category="llm"):
+                await asyncio.sleep(0.2)
+            await asyncio.to_thread(transcribe, 0.5)
+        tracer.finish("demo")
+
+    asyncio.run(job())
+    with open("trace.json", "w", encoding="utf-8") as f:
+        json.dump(tracer.chrome_trace("demo"), f)
+    with open("profile.txt", "w", encoding="utf-8") as f:
+        f.write(tracer.profile("demo"))
+    print(tracer.list())
+    print(tracer.profile("demo").splitlines()[0])
+
+    trace = Trace("bench", 1_000_000)
+    token = _current.set(trace)
+    spans = 100_000
+    start = time.perf_counter()
+    for _ in range(spans):
+        with span("noop"):
+            pass
+    print(f"span(): {(time.perf_counter() - start) / spans * 1e6:.2f} µs per span")
+    _current.reset(token)
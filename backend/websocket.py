@@ -2,6 +2,11 @@
 Module de gestion WebSocket pour le backend.
 Gère les connexions, les tâches en mémoire et le broadcast des progressions.
 
+Les messages ne sont jamais envoyés depuis le code de la pipeline : chaque
+connexion a une file sortante bornée vidée par une seule tâche d'écriture,
+de sorte qu'un terminal lent ne ralentit pas le traitement et que l'ordre
+des messages est garanti.
+
 Usage:
     from websocket import WebSocketManager, TaskManager
     
@@ -13,12 +18,18 @@ Usage:
 """
 
 import asyncio
+import time
 import uuid
-from typing import Dict, List, Optional
+from collections import deque
+from typing import Deque, Dict, List, Optional
 from dataclasses import dataclass, field
 from enum import Enum
 from fastapi import WebSocket
+from core.workspace import Workspace
+from config import send_queue_size
 from logger import setup_logger
+from metrics import SUBTASKS, TASK_SECONDS, TASKS, TASKS_ACTIVE
+from tracing import tracer
 
 logger = setup_logger(__name__)
 
@@ -50,33 +61,134 @@ class TaskState:
     current_task_index: int = -1
     completed: bool = False
     error: Optional[str] = None
+    workspace: Optional[Workspace] = None
+    created_at: float = field(default_factory=time.perf_counter)
+
+
+# Messages récupérables côté client, les seuls que la file peut abandonner quand
+# elle est pleine, par ordre de préférence : generation_delta est resynchronisé
+# par generation_content, transcript_segment n'est qu'un aperçu, et progress
+# (déjà un seul par sous-tâche) est dépassé par le status suivant
+DROPPABLE_TYPES = ("generation_delta", "transcript_segment", "progress")
+
+
+class OutboundQueue:
+    """
+    File sortante bornée d'une connexion, vidée par une unique tâche d'écriture.
+
+    Politique quand la file est pleine :
+    1. un message `progress` remplace celui encore en attente pour la même sous-tâche ;
+    2. sinon le plus ancien message abandonnable est retiré (DROPPABLE_TYPES, dans l'ordre) ;
+    3. les autres messages (status, error, complete...) ne sont jamais perdus,
+       quitte à dépasser la borne.
+    """
+
+    def __init__(self, task_id: str, websocket: WebSocket, max_size: int = send_queue_size):
+        self.task_id = task_id
+        self.websocket = websocket
+        self.max_size = max_size
+        self.closed = False
+        self.coalesced = 0
+        self.dropped = 0
+        self._queue: Deque[dict] = deque()
+        self._ready = asyncio.Event()
+        self._sending = False
+        self._writer = asyncio.create_task(self._run())
+
+    def put(self, message: dict):
+        """Ajoute un message sans jamais attendre le client."""
+        if self.closed:
+            return
+
+        if message.get("type") == "progress":
+            for index, queued in enumerate(self._queue):
+                if queued.get("type") == "progress" and queued.get("task_id") == message.get("task_id"):
+                    self._queue[index] = message
+                    self.coalesced += 1
+                    return
+
+        if len(self._queue) >= self.max_size:
+            self._drop_one()
+
+        self._queue.append(message)
+        self._ready.set()
+
+    def _drop_one(self):
+        for droppable in DROPPABLE_TYPES:
+            for queued in self._queue:
+                if queued.get("type") == droppable:
+                    self._queue.remove(queued)
+                    self.dropped += 1
+                    return
+
+    async def _run(self):
+        while True:
+            await self._ready.wait()
+            while self._queue:
+                message = self._queue.popleft()
+                self._sending = True
+                try:
+                    await self.websocket.send_json(message)
+                except Exception as e:
+                    logger.error(f"Error sending message to {self.task_id}: {e}")
+                    self.closed = True
+                    self._queue.clear()
+                    return
+                finally:
+                    self._sending = False
+            self._ready.clear()
+
+    async def drain(self, timeout: float):
+        """Attend que les messages en attente soient envoyés (au plus `timeout` secondes)."""
+        deadline = time.monotonic() + timeout
+        while (self._queue or self._sending) and not self.closed and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+
+    def close(self):
+        self.closed = True
+        self._writer.cancel()
+        if self.coalesced or self.dropped:
+            logger.info(
+                f"Outbound queue for {self.task_id}: {self.coalesced} progress messages coalesced, "
+                f"{self.dropped} dropped"
+            )
 
 
 class WebSocketManager:
     """Gère les connexions WebSocket actives."""
     
     def __init__(self):
-        self.connections: Dict[str, WebSocket] = {}
+        self.connections: Dict[str, OutboundQueue] = {}
     
     async def connect(self, websocket: WebSocket, task_id: str):
         """Accepte une nouvelle connexion WebSocket."""
         await websocket.accept()
-        self.connections[task_id] = websocket
+        self.register(task_id, websocket)
+
+    def register(self, task_id: str, websocket: WebSocket):
+        """Associe une connexion déjà acceptée à une tâche et démarre sa file sortante."""
+        self.connections[task_id] = OutboundQueue(task_id, websocket)
         logger.info(f"WebSocket connected for task {task_id}")
     
     def disconnect(self, task_id: str):
         """Ferme une connexion WebSocket."""
         if task_id in self.connections:
-            del self.connections[task_id]
+            self.connections.pop(task_id).close()
             logger.info(f"WebSocket disconnected for task {task_id}")
+
+    async def drain(self, task_id: str, timeout: float = 2.0):
+        """Laisse partir les derniers messages avant la fermeture."""
+        if task_id in self.connections:
+            await self.connections[task_id].drain(timeout)
+
+    def enqueue(self, task_id: str, message: dict):
+        """Place un message dans la file sortante du client (synchrone, ordre garanti)."""
+        if task_id in self.connections:
+            self.connections[task_id].put(message)
     
     async def send_message(self, task_id: str, message: dict):
-        """Envoie un message à un client spécifique."""
-        if task_id in self.connections:
-            try:
-                await self.connections[task_id].send_json(message)
-            except Exception as e:
-                logger.error(f"Error sending message to {task_id}: {e}")
+        """Envoie un message à un client spécifique (mis en file, n'attend jamais le client)."""
+        self.enqueue(task_id, message)
     
     async def broadcast(self, message: dict):
         """Envoie un message à tous les clients connectés."""
@@ -96,17 +208,26 @@ class TaskManager:
         file_path: str,
         action: str,
         output_format: str,
-        output_path: str
+        output_path: str,
+        profile: bool = False
     ) -> str:
-        """Crée une nouvelle tâche et retourne son ID."""
+        """
+        Crée une nouvelle tâche et retourne son ID.
+
+        La trace de la tâche devient la trace courante de l'appelant (voir
+        tracing) ; `profile` y ajoute le profileur par échantillonnage.
+        """
         task_id = str(uuid.uuid4())
         self.tasks[task_id] = TaskState(
             task_id=task_id,
             file_path=file_path,
             action=action,
             output_format=output_format,
-            output_path=output_path
+            output_path=output_path,
+            workspace=Workspace(task_id),
         )
+        TASKS_ACTIVE.inc()
+        tracer.start(task_id, profile)
         logger.info(f"Created task {task_id}")
         return task_id
     
@@ -125,23 +246,21 @@ class TaskManager:
             for i, name in enumerate(task_names)
         ]
         
-        # Notifier le client
-        asyncio.create_task(
-            self.websocket_manager.send_message(
-                task_id,
-                {
-                    "type": "init",
-                    "tasks": [
-                        {
-                            "id": task.id,
-                            "name": task.name,
-                            "status": task.status.value,
-                            "progress": task.progress
-                        }
-                        for task in task_state.tasks
-                    ]
-                }
-            )
+        # Notifier le client (mis en file immédiatement : arrive avant tout status/progress)
+        self.websocket_manager.enqueue(
+            task_id,
+            {
+                "type": "init",
+                "tasks": [
+                    {
+                        "id": task.id,
+                        "name": task.name,
+                        "status": task.status.value,
+                        "progress": task.progress
+                    }
+                    for task in task_state.tasks
+                ]
+            }
         )
     
     async def start_task(self, task_id: str, task_index: int):
@@ -156,6 +275,7 @@ class TaskManager:
             task = task_state.tasks[task_index]
             task.status = TaskStatus.RUNNING
             task.progress = 0
+            SUBTASKS.labels("started").inc()
             
             await self.websocket_manager.send_message(
                 task_id,
@@ -167,8 +287,14 @@ class TaskManager:
             )
             logger.info(f"Task {task_id} - Started: {task.name}")
     
-    async def update_progress(self, task_id: str, task_index: int, progress: int):
-        """Met à jour la progression d'une tâche."""
+    async def update_progress(
+        self, task_id: str, task_index: int, progress: int, details: Optional[dict] = None
+    ):
+        """
+        Met à jour la progression d'une tâche.
+
+        `details` ajoute des champs au message (ex: realtime_factor, eta_seconds).
+        """
         if task_id not in self.tasks:
             return
         
@@ -182,7 +308,8 @@ class TaskManager:
                 {
                     "type": "progress",
                     "task_id": task_index,
-                    "progress": task.progress
+                    "progress": task.progress,
+                    **(details or {}),
                 }
             )
     
@@ -217,6 +344,7 @@ class TaskManager:
             task = task_state.tasks[task_index]
             task.status = TaskStatus.COMPLETED
             task.progress = 100
+            SUBTASKS.labels("completed").inc()
             
             await self.websocket_manager.send_message(
                 task_id,
@@ -235,10 +363,15 @@ class TaskManager:
             return
         
         task_state = self.tasks[task_id]
+        if task_state.error is None:
+            # set_error peut être rappelé par l'appelant : la tâche n'est comptée qu'une fois
+            TASKS.labels("error").inc()
         task_state.error = error_message
         
         if 0 <= task_state.current_task_index < len(task_state.tasks):
             task = task_state.tasks[task_state.current_task_index]
+            if task.status != TaskStatus.ERROR:
+                SUBTASKS.labels("error").inc()
             task.status = TaskStatus.ERROR
             task.message = error_message
             
@@ -253,28 +386,64 @@ class TaskManager:
         
         logger.error(f"Task {task_id} - Error: {error_message}")
     
-    async def complete_all(self, task_id: str, output_path: str):
-        """Marque toutes les tâches comme terminées."""
+    async def fail_task(self, task_id: str, task_index: int, error_message: str):
+        """Marque une seule sous-tâche en erreur sans interrompre les autres (ex: vidéo d'une playlist)."""
+        if task_id not in self.tasks:
+            return
+
+        task_state = self.tasks[task_id]
+        if 0 <= task_index < len(task_state.tasks):
+            task = task_state.tasks[task_index]
+            task.status = TaskStatus.ERROR
+            task.message = error_message
+            SUBTASKS.labels("error").inc()
+
+            await self.websocket_manager.send_message(
+                task_id,
+                {
+                    "type": "status",
+                    "task_id": task_index,
+                    "status": task.status.value,
+                    "message": error_message
+                }
+            )
+            logger.error(f"Task {task_id} - Failed: {task.name}: {error_message}")
+
+    async def complete_all(
+        self, task_id: str, output_path: str, output_paths: Optional[Dict[str, str]] = None
+    ):
+        """
+        Marque toutes les tâches comme terminées.
+
+        `output_paths` associe chaque sortie d'un job multi-sorties à son fichier.
+        """
         if task_id not in self.tasks:
             return
         
         task_state = self.tasks[task_id]
         task_state.completed = True
         task_state.output_path = output_path
+        TASKS.labels("completed").inc()
+        TASK_SECONDS.observe(time.perf_counter() - task_state.created_at)
         
         await self.websocket_manager.send_message(
             task_id,
             {
                 "type": "complete",
-                "output_path": output_path
+                "output_path": output_path,
+                "output_paths": output_paths or {},
             }
         )
         logger.info(f"Task {task_id} - All completed. Output: {output_path}")
     
     def cleanup(self, task_id: str):
-        """Nettoie une tâche terminée."""
+        """Nettoie une tâche terminée et supprime son dossier de travail."""
         if task_id in self.tasks:
-            del self.tasks[task_id]
+            task_state = self.tasks.pop(task_id)
+            TASKS_ACTIVE.dec()
+            tracer.finish(task_id)
+            if task_state.workspace is not None:
+                task_state.workspace.cleanup()
             logger.info(f"Cleaned up task {task_id}")
 
 
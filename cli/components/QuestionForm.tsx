@@ -6,18 +6,27 @@ import { FileInputWithCompletion } from "./FileInput.js";
 import { OptionsMenu } from "./OptionsMenu.js";
 import { TaskProgress } from "./TaskProgress.js";
 import { GenerationDisplay } from "./GenerationDisplay.js";
-import { createWebSocketClient, type Task, type WebSocketClient } from "../utils/websocket.js";
+import { TranscriptDisplay, formatTimestamp, type TranscriptSegment } from "./TranscriptDisplay.js";
+import { createWebSocketClient, type PlaylistProgress, type Task, type WebSocketClient } from "../utils/websocket.js";
 import fs from "fs";
 import path from "path";
 
 type FormData = {
-	action: 'create_course' | 'create_summary' | 'download_video' | null;
+	action: 'create_course' | 'create_summary' | 'create_all' | 'download_video' | null;
 	filePath: string;
 	outputFormat: 'md' | 'typst' | 'txt' | null;
 	outputPath: string;
 	isUrl: boolean;
 }
 
+// Sorties produites par "Create course + summary" à partir d'une seule transcription
+const ALL_OUTPUTS = ['create_course', 'create_summary', 'transcript_srt'];
+
+const CHANNEL_TITLES: Record<string, string> = {
+	create_course: 'Cours',
+	create_summary: 'Résumé',
+};
+
 export default function QuestionForm() {
 	const [step, setStep] = useState<number>(0);
 	const [showOptions, setShowOptions] = useState<boolean>(false);
@@ -36,14 +45,17 @@ export default function QuestionForm() {
 	const [tasks, setTasks] = useState<Task[]>([]);
 	const [error, setError] = useState<string | null>(null);
 	const [outputFile, setOutputFile] = useState<string | null>(null);
+	const [outputFiles, setOutputFiles] = useState<Record<string, string>>({});
 	const [isComplete, setIsComplete] = useState<boolean>(false);
-	const [generationContent, setGenerationContent] = useState<string>("");
+	const [generationContents, setGenerationContents] = useState<Record<string, string>>({});
 	const [showGeneration, setShowGeneration] = useState<boolean>(false);
+	const [transcriptSegments, setTranscriptSegments] = useState<TranscriptSegment[]>([]);
 
 	// États pour le flux download
-	const [downloadedVideoPath, setDownloadedVideoPath] = useState<string | null>(null);
+	const [downloadedVideoDuration, setDownloadedVideoDuration] = useState<number | null>(null);
 	const [downloadedVideoTitle, setDownloadedVideoTitle] = useState<string | null>(null);
 	const [showPostDownloadMenu, setShowPostDownloadMenu] = useState<boolean>(false);
+	const [playlist, setPlaylist] = useState<PlaylistProgress | null>(null);
 	const wsClientRef = useRef<WebSocketClient | null>(null);
 
 	const validateFilePath = (filePath: string): boolean => {
@@ -92,9 +104,9 @@ export default function QuestionForm() {
 			setTasks(initialTasks);
 		});
 
-		wsClient.on('progress', (taskId: number, progress: number, downloadPercent?: number, downloadSpeed?: number | null) => {
+		wsClient.on('progress', (taskId: number, progress: number, downloadPercent?: number, downloadSpeed?: number | null, realtimeFactor?: number, etaSeconds?: number) => {
 			setTasks(prev => prev.map(task =>
-				task.id === taskId ? { ...task, progress, download_percent: downloadPercent, download_speed: downloadSpeed } : task
+				task.id === taskId ? { ...task, progress, download_percent: downloadPercent, download_speed: downloadSpeed, realtime_factor: realtimeFactor, eta_seconds: etaSeconds } : task
 			));
 		});
 
@@ -104,33 +116,68 @@ export default function QuestionForm() {
 			));
 		});
 
-		wsClient.on('generation_start', (data: { prompt: string }) => {
+		wsClient.on('transcript_segment', (segment: TranscriptSegment) => {
+			// Les segments peuvent arriver dans le désordre : on les garde triés par index
+			setTranscriptSegments(prev => [...prev.filter(s => s.index !== segment.index), segment].sort((a, b) => a.index - b.index));
+		});
+
+		// Par canal (une génération par sortie) : numéro de la dernière trame delta reçue.
+		// Un trou signifie une trame perdue, on arrête alors d'ajouter jusqu'au contenu complet final
+		const lastSeq: Record<string, number> = {};
+		const streamGap: Record<string, boolean> = {};
+
+		wsClient.on('generation_start', (data: { prompt: string; channel: string }) => {
+			lastSeq[data.channel] = 0;
+			streamGap[data.channel] = false;
 			setShowGeneration(true);
-			setGenerationContent(data.prompt + "\n\n");
+			setGenerationContents(prev => ({ ...prev, [data.channel]: data.prompt + "\n\n" }));
 		});
 
-		wsClient.on('generation_token', (data: { token: string; content: string }) => {
-			setGenerationContent(data.content);
+		wsClient.on('generation_delta', (data: { seq: number; delta: string; channel: string }) => {
+			if (data.seq !== (lastSeq[data.channel] ?? 0) + 1) {
+				streamGap[data.channel] = true;
+			}
+			lastSeq[data.channel] = data.seq;
+			if (!streamGap[data.channel]) {
+				// La première trame remplace le message d'attente de generation_start
+				setGenerationContents(prev => ({
+					...prev,
+					[data.channel]: data.seq === 1 ? data.delta : (prev[data.channel] ?? '') + data.delta,
+				}));
+			}
 		});
 
-		wsClient.on('generation_content', (data: { content: string }) => {
-			setGenerationContent(data.content);
+		wsClient.on('generation_content', (data: { seq: number; content: string; channel: string }) => {
+			lastSeq[data.channel] = data.seq;
+			streamGap[data.channel] = false;
+			setGenerationContents(prev => ({ ...prev, [data.channel]: data.content }));
 		});
 
-		wsClient.on('download_complete', (data: { video_path: string; title: string }) => {
-			setDownloadedVideoPath(data.video_path);
+		// Métadonnées de l'URL reçues : rien n'est encore téléchargé, le choix décide du flux (audio seul ou vidéo)
+		wsClient.on('url_ready', (data: { title: string; duration: number }) => {
+			setDownloadedVideoDuration(data.duration);
 			setDownloadedVideoTitle(data.title);
 			setShowPostDownloadMenu(true);
 		});
 
+		// URL de playlist ou de chaîne : une tâche par vidéo, avancement global en plus
+		wsClient.on('playlist', (data: { title: string; total: number }) => {
+			setPlaylist({ title: data.title, total: data.total, done: 0, failed: 0, running: 0, percent: 0 });
+		});
+
+		wsClient.on('playlist_progress', (data: Omit<PlaylistProgress, 'title'>) => {
+			setPlaylist(prev => ({ ...data, title: prev?.title }));
+		});
+
 		wsClient.on('error', (errorMessage: string) => {
 			setError(errorMessage);
 		});
 
 		let isFinished = false;
 
-		wsClient.on('complete', (outputPath: string) => {
+		wsClient.on('complete', (outputPath: string, outputPaths: Record<string, string>) => {
 			setOutputFile(outputPath);
+			setOutputFiles(outputPaths);
 			setIsComplete(true);
 			isFinished = true;
 		});
@@ -143,11 +190,13 @@ export default function QuestionForm() {
 
 		try {
 			await wsClient.connect();
+			const isMultiOutput = formData.action === 'create_all';
 			wsClient.send({
-				action: formData.action,
+				action: isMultiOutput ? 'create_course' : formData.action,
 				file_path: formData.filePath,
 				output_format: formData.outputFormat || "",
-				output_path: formData.outputPath || ""
+				output_path: formData.outputPath || "",
+				...(isMultiOutput ? { outputs: ALL_OUTPUTS } : {}),
 			});
 		} catch (err) {
 			setError(`Erreur de connexion: ${err}`);
@@ -193,6 +242,7 @@ export default function QuestionForm() {
 		const items = [
 			{ label: 'Create course', value: 'create_course' },
 			{ label: 'Create summary', value: 'create_summary' },
+			{ label: 'Create course + summary', value: 'create_all' },
 			{ label: 'Download video', value: 'download_video' },
 			{ label: 'Options', value: 'options' },
 			{ label: 'Quit', value: 'quit' },
@@ -212,7 +262,7 @@ export default function QuestionForm() {
 							setFormData({ ...formData, action: 'download_video', isUrl: true });
 							setStep(1);
 						} else {
-							setFormData({ ...formData, action: item.value as 'create_course' | 'create_summary', isUrl: false });
+							setFormData({ ...formData, action: item.value as 'create_course' | 'create_summary' | 'create_all', isUrl: false });
 							setStep(1);
 						}
 					}}
@@ -259,7 +309,7 @@ export default function QuestionForm() {
 		return (
 			<Box flexDirection="column" marginBottom={1} paddingX={1}>
 				<Box>
-					<Text bold>Enter the file path:</Text>
+					<Text bold>Enter the file path or video URL:</Text>
 				</Box>
 
 				<Box borderStyle="round" borderColor={fileError ? "red" : "grey"} paddingX={1}>
@@ -271,11 +321,13 @@ export default function QuestionForm() {
 							setFileError(null);
 						}}
 						onSubmit={() => {
-							if (validateFilePath(formData.filePath)) {
+							// Une URL avec l'action déjà choisie : transcrite pendant son téléchargement
+							const isUrl = formData.filePath.startsWith("http://") || formData.filePath.startsWith("https://");
+							if (isUrl ? validateUrl(formData.filePath) : validateFilePath(formData.filePath)) {
 								setStep(2);
 							}
 						}}
-						placeholder="/path/to/file.mp3"
+						placeholder="/path/to/file.mp3 or https://..."
 					/>
 				</Box>
 
@@ -347,15 +399,15 @@ export default function QuestionForm() {
 			const items = [
 				{ label: 'Create course from this video', value: 'create_course' },
 				{ label: 'Create summary from this video', value: 'create_summary' },
-				{ label: 'Done (keep video only)', value: 'done' },
+				{ label: 'Done (download video only)', value: 'done' },
 			];
 
 			return (
 				<Box flexDirection="column" paddingX={1}>
 					<TaskProgress tasks={tasks} />
 					<Box marginTop={1} flexDirection="column">
-						<Text color="green" bold>Video downloaded: {downloadedVideoTitle}</Text>
-						<Text dimColor>{downloadedVideoPath}</Text>
+						<Text color="green" bold>Video found: {downloadedVideoTitle}</Text>
+						{downloadedVideoDuration ? <Text dimColor>Durée : {formatTimestamp(downloadedVideoDuration)}</Text> : null}
 					</Box>
 					<Box marginTop={1} flexDirection="column">
 						<Text bold>What do you want to do with this video?</Text>
@@ -373,18 +425,27 @@ export default function QuestionForm() {
 			return (
 				<Box flexDirection="column" paddingX={1}>
 					<Text color="green" bold>Traitement terminé avec succès !</Text>
-					<Box marginTop={1}>
-						<Text>Fichier généré :</Text>
-						<Text color="cyan">{outputFile}</Text>
-					</Box>
-					{generationContent && (
+					{Object.keys(outputFiles).length > 1 ? (
+						<Box marginTop={1} flexDirection="column">
+							<Text>Fichiers générés :</Text>
+							{Object.entries(outputFiles).map(([output, file]) => (
+								<Text key={output} color="cyan">{file}</Text>
+							))}
+						</Box>
+					) : (
 						<Box marginTop={1}>
+							<Text>Fichier généré :</Text>
+							<Text color="cyan">{outputFile}</Text>
+						</Box>
+					)}
+					{Object.entries(generationContents).map(([channel, content]) => (
+						<Box key={channel} marginTop={1}>
 							<GenerationDisplay
-								content={generationContent}
-								title="Contenu généré (aperçu)"
+								content={content}
+								title={`${CHANNEL_TITLES[channel] ?? 'Contenu généré'} (aperçu)`}
 							/>
 						</Box>
-					)}
+					))}
 					<Box marginTop={1}>
 						<Text bold color="yellow">Appuyez sur une touche pour retourner au menu</Text>
 					</Box>
@@ -395,10 +456,27 @@ export default function QuestionForm() {
 		// Pendant le traitement
 		return (
 			<Box flexDirection="column">
+				{playlist && (
+					<Box flexDirection="column" marginBottom={1}>
+						<Text bold>Playlist : {playlist.title}</Text>
+						<Text>
+							{playlist.done}/{playlist.total} vidéos ({playlist.percent}%)
+							{playlist.running > 0 ? ` · ${playlist.running} en cours` : ''}
+							{playlist.failed > 0 ? <Text color="red">{` · ${playlist.failed} en échec`}</Text> : null}
+						</Text>
+					</Box>
+				)}
 				<TaskProgress tasks={tasks} />
-				{showGeneration && generationContent && (
-					<GenerationDisplay content={generationContent} />
+				{!showGeneration && transcriptSegments.length > 0 && (
+					<TranscriptDisplay segments={transcriptSegments} />
 				)}
+				{showGeneration && Object.entries(generationContents).map(([channel, content]) => (
+					<GenerationDisplay
+						key={channel}
+						content={content}
+						title={Object.keys(generationContents).length > 1 ? `${CHANNEL_TITLES[channel] ?? channel} : génération en cours...` : undefined}
+					/>
+				))}
 			</Box>
 		);
 	};
@@ -458,12 +536,15 @@ export default function QuestionForm() {
 		setError(null);
 		setOutputFile(null);
 		setIsComplete(false);
-		setGenerationContent("");
+		setGenerationContents({});
+		setOutputFiles({});
 		setShowGeneration(false);
+		setTranscriptSegments([]);
 		setFileError(null);
-		setDownloadedVideoPath(null);
+		setDownloadedVideoDuration(null);
 		setDownloadedVideoTitle(null);
 		setShowPostDownloadMenu(false);
+		setPlaylist(null);
 		wsClientRef.current = null;
 	};
 
@@ -46,6 +46,13 @@ function formatSpeed(bytesPerSec: number): string {
 	return `${bytesPerSec.toFixed(0)} B/s`;
 }
 
+function formatEta(seconds: number): string {
+	const total = Math.max(0, Math.round(seconds));
+	const minutes = Math.floor(total / 60);
+	const secs = total % 60;
+	return minutes > 0 ? `${minutes}m${secs.toString().padStart(2, '0')}s` : `${secs}s`;
+}
+
 export function TaskProgress({ tasks }: TaskProgressProps) {
 	return (
 		<Box flexDirection="column" paddingX={1} borderStyle='round' borderColor='gray'>
@@ -83,6 +90,22 @@ export function TaskProgress({ tasks }: TaskProgressProps) {
 							)}
 						</Box>
 					)}
+
+					{task.status === 'running' && task.realtime_factor != null && task.realtime_factor > 0 && (
+						<Box>
+							<Text color="cyan">
+								{` ${Math.round(task.progress)}%`}
+							</Text>
+							{task.eta_seconds != null && (
+								<Text dimColor>
+									{` - reste ~${formatEta(task.eta_seconds)}`}
+								</Text>
+							)}
+							<Text dimColor>
+								{` - x${(1 / task.realtime_factor).toFixed(1)} temps réel`}
+							</Text>
+						</Box>
+					)}
 				</Box>
 			))}
 
@@ -0,0 +1,53 @@
+import React from 'react';
+import { Box, Text } from 'ink';
+
+export interface TranscriptSegment {
+	index: number;
+	start: number;
+	end: number;
+	text: string;
+}
+
+interface TranscriptDisplayProps {
+	segments: TranscriptSegment[];
+	maxLines?: number;
+}
+
+export function formatTimestamp(seconds: number): string {
+	const total = Math.floor(seconds);
+	const hours = Math.floor(total / 3600);
+	const minutes = Math.floor((total % 3600) / 60);
+	const secs = total % 60;
+	const mmss = `${minutes.toString().padStart(2, '0')}:${secs.toString().padStart(2, '0')}`;
+	return hours > 0 ? `${hours}:${mmss}` : mmss;
+}
+
+export function TranscriptDisplay({ segments, maxLines = 6 }: TranscriptDisplayProps) {
+	// Afficher uniquement les derniers segments reçus
+	const displaySegments = segments.slice(-maxLines);
+
+	return (
+		<Box flexDirection="column" paddingX={1} marginY={1}>
+			<Box
+				borderStyle="round"
+				borderColor="magenta"
+				flexDirection="column"
+				paddingX={1}
+			>
+				<Box marginBottom={1} flexDirection="row" justifyContent="space-between">
+					<Text bold color="magenta">
+						Transcription en direct
+					</Text>
+					<Text dimColor>({segments.length} segments)</Text>
+				</Box>
+
+				{displaySegments.map((segment) => (
+					<Box key={segment.index}>
+						<Text dimColor>{`[${formatTimestamp(segment.start)}] `}</Text>
+						<Text wrap="truncate-end">{segment.text}</Text>
+					</Box>
+				))}
+			</Box>
+		</Box>
+	);
+}
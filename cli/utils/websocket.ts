@@ -10,23 +10,48 @@ export interface Task {
 	progress: number;
 	download_percent?: number;
 	download_speed?: number | null;
+	realtime_factor?: number;
+	eta_seconds?: number;
 }
 
 export interface WebSocketMessage {
-	type: 'connected' | 'init' | 'progress' | 'status' | 'error' | 'complete' | 'generation_start' | 'generation_content' | 'generation_token' | 'download_complete';
+	type: 'connected' | 'init' | 'progress' | 'status' | 'error' | 'complete' | 'generation_start' | 'generation_content' | 'generation_delta' | 'url_ready' | 'transcript_segment' | 'playlist' | 'playlist_progress';
 	task_id?: string;
 	tasks?: Task[];
 	progress?: number;
 	download_percent?: number;
 	download_speed?: number | null;
+	realtime_factor?: number;
+	eta_seconds?: number;
 	status?: TaskStatus;
 	message?: string;
 	output_path?: string;
+	output_paths?: Record<string, string>;
+	channel?: string;
 	prompt?: string;
 	content?: string;
-	token?: string;
-	video_path?: string;
+	delta?: string;
+	seq?: number;
 	title?: string;
+	duration?: number;
+	index?: number;
+	start?: number;
+	end?: number;
+	text?: string;
+	total?: number;
+	done?: number;
+	failed?: number;
+	running?: number;
+	percent?: number;
+}
+
+export interface PlaylistProgress {
+	title?: string;
+	total: number;
+	done: number;
+	failed: number;
+	running: number;
+	percent: number;
 }
 
 export class WebSocketClient extends EventEmitter {
@@ -62,7 +87,7 @@ export class WebSocketClient extends EventEmitter {
 								this.emit('tasksInitialized', message.tasks);
 								break;
 							case 'progress':
-								this.emit('progress', message.task_id, message.progress, message.download_percent, message.download_speed);
+								this.emit('progress', message.task_id, message.progress, message.download_percent, message.download_speed, message.realtime_factor, message.eta_seconds);
 								break;
 							case 'status':
 								this.emit('status', message.task_id, message.status);
@@ -71,19 +96,28 @@ export class WebSocketClient extends EventEmitter {
 								this.emit('error', message.message);
 								break;
 						case 'complete':
-							this.emit('complete', message.output_path);
+							this.emit('complete', message.output_path, message.output_paths ?? {});
 							break;
 						case 'generation_start':
-							this.emit('generation_start', { prompt: message.prompt });
+							this.emit('generation_start', { prompt: message.prompt, channel: message.channel ?? 'main' });
 							break;
-						case 'generation_token':
-							this.emit('generation_token', { token: message.token, content: message.content });
+						case 'generation_delta':
+							this.emit('generation_delta', { seq: message.seq, delta: message.delta, channel: message.channel ?? 'main' });
 							break;
 						case 'generation_content':
-							this.emit('generation_content', { content: message.content });
+							this.emit('generation_content', { seq: message.seq, content: message.content, channel: message.channel ?? 'main' });
+							break;
+						case 'transcript_segment':
+							this.emit('transcript_segment', { index: message.index, start: message.start, end: message.end, text: message.text });
+							break;
+						case 'url_ready':
+							this.emit('url_ready', { title: message.title, duration: message.duration });
+							break;
+						case 'playlist':
+							this.emit('playlist', { title: message.title, total: message.total });
 							break;
-						case 'download_complete':
-							this.emit('download_complete', { video_path: message.video_path, title: message.title });
+						case 'playlist_progress':
+							this.emit('playlist_progress', { done: message.done, failed: message.failed, running: message.running, total: message.total, percent: message.percent });
 							break;
 					}
 					} catch (error) {